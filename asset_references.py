@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Asset Reference Index
+Finds every asset reference in the site's HTML, CSS and JavaScript in a
+single scan and rewrites them in a single pass.
+
+Recognized references:
+- HTML attributes: src, href, poster, data-src, data-webm, data-mov, data-poster
+- srcset / data-srcset candidate lists
+- CSS url(...) in stylesheets and inline <style> blocks
+- Quoted string literals that look like a path and end in an asset suffix,
+  in .js files ('../assets/icon.svg'); URLs built at runtime (`${dir}/x.wav`)
+  and bare file names are skipped. Like everything else they resolve against
+  the file's own folder, which is the page's for a script kept next to it
+
+The same scan also records every <img> element in HTML documents (with the
+<picture> wrapped around it, if any), so rewrite() can replace whole
+elements and plain references together in its single pass.
+
+References are resolved to site-root-relative paths, so a mapping such as
+{'assets/profile.jpg': 'assets/profile_optimized.jpg'} applies equally to
+index.html and binaural-externalization/index.html ("../assets/...").
+
+Usage:
+    python3 asset_references.py              # summary + missing-file report for the site
+    python3 asset_references.py index.html   # specific documents
+"""
+
+import argparse
+import bisect
+import html
+import posixpath
+import re
+import sys
+from collections import namedtuple
+from pathlib import Path
+from urllib.parse import quote, unquote
+
+# Documents scanned by default (paths relative to the site root)
+SITE_DOCUMENTS = [
+    'index.html',
+    '404.html',
+    'binaural-externalization.html',
+    'binaural-externalization/index.html',
+    'css/style.css',
+    'binaural-externalization/binaural.css',
+    'js/main.js',
+    'binaural-externalization/binaural.js',
+]
+
+URL_ATTRIBUTES = ('data-poster', 'data-webm', 'data-mov', 'data-src', 'poster', 'href', 'src')
+SRCSET_ATTRIBUTES = ('data-srcset', 'srcset')
+
+REFERENCE_RE = re.compile(
+    r'(?<![\w-])(?P<attr>' + '|'.join(URL_ATTRIBUTES) + r')\s*=\s*(?P<quote>["\'])(?P<url>.*?)(?P=quote)'
+    r'|(?<![\w-])(?P<set_attr>' + '|'.join(SRCSET_ATTRIBUTES) + r')\s*=\s*(?P<set_quote>["\'])(?P<srcset>.*?)(?P=set_quote)'
+    r'|\burl\(\s*(?P<css_quote>["\']?)(?P<css_url>[^"\')]*?)(?P=css_quote)\s*\)',
+    re.IGNORECASE | re.DOTALL,
+)
+SRCSET_CANDIDATE_RE = re.compile(r'([^\s,]+)(?:\s+[^,]*)?')
+# Suffixes a JavaScript string literal (containing a '/') must end in to count as an asset URL
+SCRIPT_ASSET_SUFFIXES = (
+    'jpg', 'jpeg', 'png', 'gif', 'webp', 'avif', 'svg', 'ico', 'webm', 'mp4', 'mov',
+    'wav', 'mp3', 'm4a', 'ogg', 'css', 'js', 'json', 'woff', 'woff2', 'pdf',
+)
+SCRIPT_STRING_RE = re.compile(
+    r'(?P<quote>["\'`])(?P<url>[^"\'`\s<>{}]*/[^"\'`\s<>{}]+\.(?:' + '|'.join(SCRIPT_ASSET_SUFFIXES) + r'))(?P=quote)',
+    re.IGNORECASE,
+)
+# An <img>, optionally already wrapped in a <picture> from a previous run
+IMG_ELEMENT_PATTERN = (
+    r'(?P<element>(?P<indent>[ \t]*)'
+    r'(?P<picture><picture>\s*(?:<source\b[^>]*>\s*)*)?'
+    r'<img\b(?P<img_attrs>[^>]*?)\s*/?>'
+    r'(?(picture)\s*</picture>))'
+)
+HTML_REFERENCE_RE = re.compile(IMG_ELEMENT_PATTERN + '|' + REFERENCE_RE.pattern, REFERENCE_RE.flags)
+COMMENT_RE = re.compile(r'<!--.*?-->|/\*.*?\*/', re.DOTALL)
+EXTERNAL_RE = re.compile(r'^(?:[a-z][a-z0-9+.-]*:|//|#)', re.IGNORECASE)
+
+# start/end delimit the URL text inside the document; path is site-root
+# relative (None for external, data: and templated URLs)
+AssetReference = namedtuple('AssetReference', 'start end kind url path suffix in_comment')
+# start/end delimit the whole element (indentation included), attrs is the
+# <img> attribute text and src the AssetReference of its src (or None)
+AssetElement = namedtuple('AssetElement', 'start end indent attrs src in_comment')
+
+
+def split_suffix(url):
+    """Split 'a.css?v=2#x' into ('a.css', '?v=2#x')"""
+    cut = min((i for i in (url.find('?'), url.find('#')) if i >= 0), default=len(url))
+    return url[:cut], url[cut:]
+
+
+def resolve_url(url, document_dir):
+    """Resolve a URL found in a document to a site-root-relative path, or None"""
+    url = html.unescape(url.strip())
+    if not url or EXTERNAL_RE.match(url) or '${' in url or '{{' in url:
+        return None, ''
+    url, suffix = split_suffix(url)
+    url = unquote(url)
+    if url.startswith('/'):
+        path = posixpath.normpath(url.lstrip('/'))
+    else:
+        path = posixpath.normpath(posixpath.join(document_dir, url))
+    if path.startswith('..'):
+        return None, ''
+    return path, suffix
+
+
+def position_in(spans, starts, position):
+    """True if position falls inside one of the sorted, non-overlapping (start, end) spans"""
+    i = bisect.bisect_right(starts, position) - 1
+    return i >= 0 and position < spans[i][1]
+
+
+class AssetIndex:
+    """All asset references (and <img> elements) in one document, found in one scan"""
+
+    def __init__(self, document, root='.', text=None):
+        self.root = Path(root)
+        self.document = Path(document)
+        self.document_dir = posixpath.dirname(self.document.as_posix())
+        if text is None:
+            text = (self.root / self.document).read_text(encoding='utf-8')
+        self.text = text
+        self.elements = []
+        self.references = self._scan()
+
+    def _scan(self):
+        comments = [(m.start(), m.end()) for m in COMMENT_RE.finditer(self.text)]
+        comment_starts = [start for start, _ in comments]
+
+        def in_comment(position):
+            return position_in(comments, comment_starts, position)
+
+        references = []
+
+        def add(start, end, kind):
+            url = self.text[start:end]
+            path, suffix = resolve_url(url, self.document_dir)
+            references.append(AssetReference(start, end, kind, url, path, suffix, in_comment(start)))
+
+        def add_match(match):
+            if match.group('attr'):
+                add(match.start('url'), match.end('url'), match.group('attr').lower())
+            elif match.group('set_attr'):
+                offset = match.start('srcset')
+                for candidate in SRCSET_CANDIDATE_RE.finditer(match.group('srcset')):
+                    add(offset + candidate.start(1), offset + candidate.end(1), match.group('set_attr').lower())
+            else:
+                add(match.start('css_url'), match.end('css_url'), 'url()')
+
+        is_html = self.document.suffix in ('.html', '.htm')
+        for match in (HTML_REFERENCE_RE if is_html else REFERENCE_RE).finditer(self.text):
+            if not is_html or not match.group('element'):
+                add_match(match)
+                continue
+            # The element's own attributes: <source> srcsets, then the <img>'s
+            first = len(references)
+            for attribute in REFERENCE_RE.finditer(self.text, match.start(), match.end()):
+                add_match(attribute)
+            src = next((ref for ref in references[first:]
+                        if ref.kind == 'src' and ref.start >= match.start('img_attrs')), None)
+            self.elements.append(AssetElement(match.start(), match.end(), match.group('indent'),
+                                              match.group('img_attrs'), src, in_comment(match.end('indent'))))
+        if self.document.suffix == '.js':
+            # Strings that are also src="..." values inside template markup are already indexed
+            seen = {ref.start for ref in references}
+            for match in SCRIPT_STRING_RE.finditer(self.text):
+                if match.start('url') not in seen:
+                    add(match.start('url'), match.end('url'), 'string')
+            references.sort(key=lambda ref: ref.start)
+        return references
+
+    def by_path(self):
+        """Map each local asset path to the references pointing at it"""
+        index = {}
+        for ref in self.references:
+            if ref.path is not None:
+                index.setdefault(ref.path, []).append(ref)
+        return index
+
+    def missing(self, include_comments=False):
+        """References to local files that do not exist on disk"""
+        return [
+            ref for ref in self.references
+            if ref.path is not None
+            and (include_comments or not ref.in_comment)
+            and not (self.root / ref.path).exists()
+        ]
+
+    def format_url(self, path, ref):
+        """Render a site-root-relative path as a URL for this document"""
+        url = posixpath.relpath(path, self.document_dir) if self.document_dir else path
+        # srcset and unquoted url() cannot contain raw spaces; keep encoded
+        # URLs encoded and leave readable ones readable elsewhere
+        if ref.kind.endswith('srcset') or ref.kind == 'url()' or '%' in ref.url:
+            url = quote(url)
+        return url + ref.suffix
+
+    def rewrite(self, mapping, replace_element=None):
+        """Apply {old_path: new_path} to every reference in one pass.
+
+        replace_element(element), if given, may return new markup for a
+        whole <img>/<picture> element (None keeps it); the references inside
+        a replaced element are left to that markup.
+
+        Returns (new_text, number_of_references_and_elements_changed).
+        """
+        edits = []
+        if replace_element:
+            for element in self.elements:
+                markup = replace_element(element)
+                if markup is not None and markup != self.text[element.start:element.end]:
+                    edits.append((element.start, element.end, markup))
+        replaced = [(start, end) for start, end, _ in edits]
+        replaced_starts = [start for start, _ in replaced]
+        for ref in self.references:
+            new_path = mapping.get(ref.path)
+            if new_path is None or new_path == ref.path or position_in(replaced, replaced_starts, ref.start):
+                continue
+            edits.append((ref.start, ref.end, self.format_url(new_path, ref)))
+        edits.sort(key=lambda edit: edit[0])
+
+        parts = []
+        position = 0
+        for start, end, text in edits:
+            parts.append(self.text[position:start])
+            parts.append(text)
+            position = end
+        parts.append(self.text[position:])
+        return ''.join(parts), len(edits)
+
+
+def index_documents(documents=None, root='.'):
+    """Build an AssetIndex for every existing document"""
+    root = Path(root)
+    return [AssetIndex(doc, root) for doc in (documents or SITE_DOCUMENTS) if (root / doc).exists()]
+
+
+def rewrite_documents(mapping, documents=None, root='.'):
+    """Apply a path mapping to every document, saving the ones that change.
+
+    Returns {document: number_of_references_changed} for changed documents.
+    """
+    results = {}
+    for index in index_documents(documents, root):
+        text, changed = index.rewrite(mapping)
+        if changed:
+            (index.root / index.document).write_text(text, encoding='utf-8')
+            results[index.document.as_posix()] = changed
+    return results
+
+
+def report_missing(indexes):
+    """Print references to files that do not exist; returns how many were found"""
+    total = 0
+    for index in indexes:
+        missing = index.missing()
+        if not missing:
+            continue
+        print(f"⚠️  {index.document}: {len(missing)} reference(s) to missing files")
+        for ref in missing:
+            line = index.text.count('\n', 0, ref.start) + 1
+            print(f"   line {line}: {ref.kind} → {ref.path}")
+        total += len(missing)
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index asset references in the site's HTML/CSS")
+    parser.add_argument("documents", nargs="*", help="Documents to scan (default: the site's HTML and CSS)")
+    parser.add_argument("--root", default=".", help="Site root (default: current directory)")
+    args = parser.parse_args()
+
+    print("🔎 Asset Reference Index")
+    print("=" * 50)
+
+    indexes = index_documents(args.documents or None, args.root)
+    for index in indexes:
+        local = [ref for ref in index.references if ref.path is not None]
+        print(f"📄 {index.document}: {len(index.references)} references, "
+              f"{len(local)} local, {len(index.by_path())} unique assets")
+
+    print()
+    missing = report_missing(indexes)
+    if missing:
+        sys.exit(1)
+    print("✓ All local references resolve to files on disk")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Draft Decode Benchmark
+Compares optimize_image() with and without reduced-resolution JPEG decoding.
+
+Each run happens in a fresh process so peak RSS reflects a single image,
+including Pillow's native allocations (which tracemalloc cannot see).
+Synthetic sources are also made in a child process, because Linux carries
+the parent's peak RSS across fork/exec.
+
+Requirements:
+- Python 3.6+
+- Pillow (pip install Pillow)
+
+Usage:
+    python3 benchmark-draft-decode.py                       # synthetic 24MP and 48MP JPEGs
+    python3 benchmark-draft-decode.py assets/profile.jpg    # real sources
+    python3 benchmark-draft-decode.py --repeat 5 --box 1920 1920
+"""
+
+import argparse
+import contextlib
+import importlib.util
+import io
+import multiprocessing
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+
+# Synthetic camera-sized sources (width, height)
+SYNTHETIC_SIZES = [(6000, 4000), (8000, 6000)]
+
+
+def load_optimize_images():
+    """Import optimize-images.py (hyphenated, so not importable by name)"""
+    spec = importlib.util.spec_from_file_location("optimize_images", SCRIPT_DIR / "optimize-images.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def peak_rss_kb():
+    """Peak resident set size of this process in KB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak  # macOS reports bytes
+
+
+def make_synthetic_jpeg(path, size):
+    """Write a noisy gradient JPEG that compresses like a photo"""
+    from PIL import Image
+
+    noise = Image.effect_noise(size, 64)
+    gradient = Image.linear_gradient("L").resize(size)
+    image = Image.merge("RGB", (gradient, noise, gradient.transpose(Image.Transpose.FLIP_LEFT_RIGHT)))
+    image.save(path, "JPEG", quality=92)
+
+
+def run_once(input_path, output_dir, box, draft):
+    """Optimize one image in this (child) process and report time and memory"""
+    optimize_images = load_optimize_images()
+    baseline_kb = peak_rss_kb()
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        jpeg_path, webp_path, _ = optimize_images.optimize_image(
+            Path(input_path), Path(output_dir) / ("draft" if draft else "full"),
+            box[0], box[1], "",
+            draft=draft,
+        )
+    elapsed = time.perf_counter() - start
+
+    return {
+        "seconds": elapsed,
+        "peak_rss_kb": peak_rss_kb(),
+        "delta_rss_kb": peak_rss_kb() - baseline_kb,
+        "jpeg_bytes": jpeg_path.stat().st_size if jpeg_path else 0,
+    }
+
+
+def measure(pool_context, input_path, output_dir, box, draft, repeat):
+    """Best time and worst memory over several fresh-process runs"""
+    results = []
+    for _ in range(repeat):
+        with pool_context.Pool(1, maxtasksperchild=1) as pool:
+            results.append(pool.apply(run_once, (str(input_path), str(output_dir), box, draft)))
+    return {
+        "seconds": min(r["seconds"] for r in results),
+        "delta_rss_kb": max(r["delta_rss_kb"] for r in results),
+        "jpeg_bytes": results[-1]["jpeg_bytes"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark draft (DCT-scaled) JPEG decoding in optimize_image()")
+    parser.add_argument("inputs", nargs="*", help="JPEG sources (default: synthetic 24MP and 48MP images)")
+    parser.add_argument("--box", nargs=2, type=int, default=[1200, 900], metavar=("W", "H"),
+                        help="Target box passed to optimize_image() (default: carousel 1200 900)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per mode (default: 3)")
+    args = parser.parse_args()
+
+    pool_context = multiprocessing.get_context("spawn")
+
+    print("🧪 Draft Decode Benchmark")
+    print("=" * 78)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        inputs = [Path(p) for p in args.inputs]
+        if not inputs:
+            for size in SYNTHETIC_SIZES:
+                path = tmp / f"synthetic_{size[0]}x{size[1]}.jpg"
+                with pool_context.Pool(1) as pool:
+                    pool.apply(make_synthetic_jpeg, (str(path), size))
+                inputs.append(path)
+
+        print(f"{'Source':<32} {'Mode':<6} {'Time':>9} {'Peak ΔRSS':>12} {'JPEG':>9}")
+        print("-" * 78)
+        for input_path in inputs:
+            full = measure(pool_context, input_path, tmp, args.box, False, args.repeat)
+            draft = measure(pool_context, input_path, tmp, args.box, True, args.repeat)
+            for mode, result in (("full", full), ("draft", draft)):
+                print(f"{input_path.name[:32]:<32} {mode:<6} {result['seconds'] * 1000:>7.0f}ms "
+                      f"{result['delta_rss_kb'] / 1024:>9.1f}MB {result['jpeg_bytes'] // 1024:>7}KB")
+
+            time_saved = (1 - draft["seconds"] / full["seconds"]) * 100 if full["seconds"] else 0
+            mem_saved = (1 - draft["delta_rss_kb"] / full["delta_rss_kb"]) * 100 if full["delta_rss_kb"] else 0
+            print(f"{'':<32} saved  {time_saved:>8.1f}% {mem_saved:>11.1f}%")
+            print()
+
+
+if __name__ == "__main__":
+    main()
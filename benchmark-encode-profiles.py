@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Encode Profile Benchmark
+Runs one clip through every encode profile (draft, balanced, archival) of
+each available video encoder and prints wall time, speed, size and quality
+side by side, to pick the default profile from data.
+
+The clip is decoded once into a lossless FFV1 reference (composited over
+--background first if it has alpha, as generate-ios-videos.py does), so
+every encode reads the same frames and the timings measure the encoder
+alone. Quality is SSIM/PSNR of each encode against that reference.
+
+Requirements:
+- Python 3.6+
+- FFmpeg/FFprobe in PATH (with libvpx-vp9, libx264 and/or libx265)
+
+Usage:
+    python3 benchmark-encode-profiles.py
+    python3 benchmark-encode-profiles.py "assets/binaural-externalization/08 - Line - Transparent (Sun).webm"
+    python3 benchmark-encode-profiles.py --codec vp9 --profile balanced --profile archival --json profiles.json
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import encode_profiles
+import ffmpeg_progress
+import video_probe
+import video_quality
+
+DEFAULT_CLIP = "assets/binaural-externalization/06 - Circle - Transparent (Sun).webm"
+DEFAULT_BACKGROUND = "#F0F2F5"
+
+# Codec name -> (encoder, container suffix, rate control options)
+CODECS = {
+    "vp9": ("libvpx-vp9", ".webm", ["-crf", "30", "-b:v", "0"]),
+    "x264": ("libx264", ".mp4", ["-crf", "25"]),
+    "x265": ("libx265", ".mp4", ["-crf", "28", "-x265-params", "log-level=error"]),
+    "videotoolbox": ("hevc_videotoolbox", ".mov", ["-b:v", "4M"]),
+}
+
+
+def available_codecs():
+    cp = subprocess.run(["ffmpeg", "-hide_banner", "-encoders"], capture_output=True, text=True)
+    return [name for name, (encoder, _, _) in CODECS.items() if f" {encoder} " in cp.stdout]
+
+
+def make_reference(clip, info, background, path):
+    """Decode the clip once into a lossless yuv420p FFV1 file"""
+    inputs = [*video_probe.decoder_args(info), "-i", str(clip)]
+    if info.get('has_alpha'):
+        color = (f"color=c={background}:size={info['width']}x{info['height']}"
+                 f":duration={info['duration'] or 10.0}:rate={info['fps'] or 25.0}")
+        filters = ["-filter_complex", f"{color}[bg];[bg][0:v]overlay=shortest=1,format=yuv420p"]
+    else:
+        filters = ["-vf", "format=yuv420p"]
+    cmd = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-y", *inputs, *filters,
+           "-c:v", "ffv1", "-an", str(path)]
+    subprocess.run(cmd, capture_output=True, text=True, check=True)
+
+
+def encode(reference, info, codec, profile, workdir):
+    """Encode the reference with one codec and profile; returns a result row"""
+    encoder, suffix, rate = CODECS[codec]
+    output = Path(workdir) / f"{codec}-{profile}{suffix}"
+    passes = encode_profiles.passes(encoder, profile)
+    logfile = Path(workdir) / f"{codec}-{profile}-pass"
+    board = ffmpeg_progress.ProgressBoard()
+
+    wall_seconds = 0.0
+    for n in range(1, passes + 1):
+        pass_opts = encode_profiles.pass_args(n, logfile) if passes > 1 else []
+        target = [str(output)] if n == passes else encode_profiles.FIRST_PASS_OUTPUT
+        cmd = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-y", "-i", str(reference),
+               "-c:v", encoder, *encode_profiles.encoder_args(encoder, profile, info['width']), *rate,
+               "-pix_fmt", "yuv420p", *pass_opts, "-an", *target]
+        stats = ffmpeg_progress.run_ffmpeg(cmd, info.get('duration'), f"{codec} {profile}", board, check=True)
+        wall_seconds += stats['wall_seconds']
+    board.clear()
+
+    scores = video_quality.measure(output, reference)
+    return {
+        'codec': codec,
+        'encoder': encoder,
+        'profile': profile,
+        'passes': passes,
+        'wall_seconds': wall_seconds,
+        'speed': (info.get('duration') or 0) / wall_seconds if wall_seconds else None,
+        'bytes': output.stat().st_size,
+        'ssim': scores['ssim'],
+        'psnr': scores['psnr'],
+        'args': [*encode_profiles.encoder_args(encoder, profile, info['width']), *rate],
+    }
+
+
+def print_table(rows):
+    print(f"\n{'Codec':<13} {'Profile':<9} {'Passes':>6} {'Time':>8} {'Speed':>8} {'Size':>9} {'SSIM':>7} {'PSNR':>7}")
+    print("-" * 74)
+    for row in rows:
+        speed = f"{row['speed']:.2f}x" if row['speed'] else "-"
+        ssim = f"{row['ssim']:.4f}" if row['ssim'] is not None else "-"
+        psnr = f"{row['psnr']:.2f}" if row['psnr'] is not None else "-"
+        print(f"{row['codec']:<13} {row['profile']:<9} {row['passes']:>6} {row['wall_seconds']:>7.1f}s {speed:>8} "
+              f"{row['bytes'] // 1024:>7}KB {ssim:>7} {psnr:>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare encode profiles on one clip (time, size, quality)")
+    parser.add_argument("clip", nargs="?", default=DEFAULT_CLIP, help=f"Clip to encode (default: {DEFAULT_CLIP})")
+    parser.add_argument("--codec", action="append", choices=list(CODECS),
+                        help="Codec to benchmark (repeatable; default: every available one)")
+    parser.add_argument("--profile", action="append", choices=encode_profiles.PROFILES,
+                        help="Profile to benchmark (repeatable; default: all)")
+    parser.add_argument("--background", default=DEFAULT_BACKGROUND,
+                        help=f"Colour transparent clips are composited over (default: {DEFAULT_BACKGROUND})")
+    parser.add_argument("--json", metavar="PATH", help="Also write the results as JSON")
+    args = parser.parse_args()
+
+    clip = Path(args.clip)
+    info = video_probe.probe(clip)
+    if info is None:
+        print(f"❌ Not a readable video: {clip}")
+        sys.exit(1)
+
+    available = available_codecs()
+    codecs = [codec for codec in (args.codec or CODECS) if codec in available]
+    skipped = [codec for codec in (args.codec or CODECS) if codec not in available]
+    profiles = args.profile or list(encode_profiles.PROFILES)
+    if not codecs:
+        print("❌ Your ffmpeg has none of the requested encoders")
+        sys.exit(1)
+
+    print("⏱️  Encode Profile Benchmark")
+    print("=" * 74)
+    print(f"🎞️  {clip.name}: {info['width']}x{info['height']}, {info['duration'] or 0:.1f}s, "
+          f"alpha: {info['has_alpha']}")
+    for codec in skipped:
+        print(f"⏭️  {codec}: {CODECS[codec][0]} not available")
+
+    rows = []
+    failed = False
+    with tempfile.TemporaryDirectory(prefix="encode-profiles-") as workdir:
+        reference = Path(workdir) / "reference.mkv"
+        make_reference(clip, info, args.background, reference)
+        for codec in codecs:
+            for profile in profiles:
+                try:
+                    rows.append(encode(reference, info, codec, profile, workdir))
+                except subprocess.CalledProcessError as e:
+                    print(f"❌ {codec} {profile}: {(e.stderr or '').strip()[-200:]}")
+                    failed = True
+    video_probe.save_cache()
+
+    print_table(rows)
+    if rows:
+        fastest = min(rows, key=lambda row: row['wall_seconds'])
+        smallest = min(rows, key=lambda row: row['bytes'])
+        print(f"\n   Fastest: {fastest['codec']} {fastest['profile']} ({fastest['wall_seconds']:.1f}s)")
+        print(f"   Smallest: {smallest['codec']} {smallest['profile']} ({smallest['bytes'] // 1024}KB)")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'clip': str(clip), 'info': info, 'background': args.background, 'results': rows}, f, indent=2)
+            f.write('\n')
+        print(f"\n📁 Results written to {args.json}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
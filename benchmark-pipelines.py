@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+"""
+Pipeline Benchmark Harness
+Times the image and video build scripts against synthetic fixtures and
+records the results as JSON so runs can be compared across settings changes
+and Pillow/FFmpeg upgrades.
+
+Fixtures are generated locally (nothing is downloaded):
+- Large camera-sized JPEG
+- RGBA and palette (P-mode) PNGs
+- Short alpha and opaque VP9 WebM clips from FFmpeg's lavfi sources
+
+Each benchmark runs in a fresh process, so peak RSS covers only that
+benchmark (FFmpeg child processes are included via RUSAGE_CHILDREN).
+Fixtures are built in a child process too: Linux carries the parent's
+peak RSS across fork/exec, so the parent must stay small.
+
+Requirements:
+- Python 3.7+
+- Pillow (pip install Pillow)
+- FFmpeg/FFprobe in PATH for the video benchmarks (skipped otherwise)
+
+Usage:
+    python3 benchmark-pipelines.py                             # run all, write bench-results/<timestamp>.json
+    python3 benchmark-pipelines.py --only optimize_image       # substring filter
+    python3 benchmark-pipelines.py --compare bench-results/old.json
+"""
+
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import multiprocessing
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+DEFAULT_RESULTS_DIR = SCRIPT_DIR / "bench-results"
+
+# Fixture name -> (kind, parameters)
+FIXTURES = {
+    "large.jpg": ("jpeg", {"size": (6000, 4000)}),
+    "rgba.png": ("png", {"size": (2400, 1800), "mode": "RGBA"}),
+    "palette.png": ("png", {"size": (2400, 1800), "mode": "P"}),
+    "alpha.webm": ("webm", {"size": (640, 360), "seconds": 2, "alpha": True}),
+    "opaque.webm": ("webm", {"size": (640, 360), "seconds": 2, "alpha": False}),
+}
+
+
+def load_script(filename):
+    """Import one of the hyphenated build scripts as a module"""
+    name = Path(filename).stem.replace("-", "_")
+    spec = importlib.util.spec_from_file_location(name, SCRIPT_DIR / filename)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def peak_rss_kb():
+    """Peak RSS in KB of this process or any finished child (e.g. ffmpeg)"""
+    scale = 1024 if sys.platform == "darwin" else 1  # macOS reports bytes
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // scale
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss // scale
+    return max(own, children)
+
+
+def has_ffmpeg():
+    return bool(shutil.which("ffmpeg") and shutil.which("ffprobe"))
+
+
+def tool_versions():
+    """Versions that affect results, recorded with every run"""
+    versions = {"python": platform.python_version(), "platform": platform.platform()}
+    try:
+        import PIL
+        versions["pillow"] = PIL.__version__
+    except ImportError:
+        versions["pillow"] = None
+    if has_ffmpeg():
+        cp = subprocess.run(["ffmpeg", "-version"], capture_output=True, text=True)
+        versions["ffmpeg"] = cp.stdout.splitlines()[0] if cp.stdout else None
+    return versions
+
+
+# ---------------------------------------------------------------------------
+# Fixtures
+# ---------------------------------------------------------------------------
+
+def make_jpeg(path, size):
+    from PIL import Image
+
+    noise = Image.effect_noise(size, 64)
+    gradient = Image.linear_gradient("L").resize(size)
+    Image.merge("RGB", (gradient, noise, gradient.transpose(Image.Transpose.FLIP_LEFT_RIGHT))).save(
+        path, "JPEG", quality=92
+    )
+
+
+def make_png(path, size, mode):
+    from PIL import Image, ImageDraw
+
+    image = Image.new("RGBA", size, (0, 0, 0, 0))
+    draw = ImageDraw.Draw(image)
+    width, height = size
+    for i in range(0, width, 60):
+        draw.ellipse((i, i * height // width, i + 240, i * height // width + 240),
+                     fill=(i % 255, 128, 255 - i % 255, 200))
+    if mode == "P":
+        image = image.convert("P", palette=Image.Palette.ADAPTIVE)
+    image.save(path, "PNG")
+
+
+def make_webm(path, size, seconds, alpha):
+    """Short VP9 clip from lavfi; the alpha variant is a moving disc on transparency"""
+    width, height = size
+    source = f"testsrc2=s={width}x{height}:r=30:d={seconds}"
+    if alpha:
+        source += (
+            ",format=yuva420p,geq=lum='lum(X,Y)':cb='cb(X,Y)':cr='cr(X,Y)':"
+            "a='if(lt(hypot(X-W/2-W/4*sin(T*3),Y-H/2),H/3),255,0)'"
+        )
+    pix_fmt = "yuva420p" if alpha else "yuv420p"
+    subprocess.run(
+        ["ffmpeg", "-hide_banner", "-loglevel", "error", "-y", "-f", "lavfi", "-i", source,
+         "-c:v", "libvpx-vp9", "-pix_fmt", pix_fmt, "-auto-alt-ref", "0", "-b:v", "1M", str(path)],
+        check=True,
+    )
+
+
+def build_fixtures(directory):
+    """Create any missing fixtures; returns {name: path} for the ones available"""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    available = {}
+    for name, (kind, params) in FIXTURES.items():
+        path = directory / name
+        if not path.exists():
+            if kind == "webm" and not has_ffmpeg():
+                continue
+            print(f"🧱 Generating fixture: {name}")
+            {"jpeg": make_jpeg, "png": make_png, "webm": make_webm}[kind](path, **params)
+        available[name] = str(path)
+    return available
+
+
+# ---------------------------------------------------------------------------
+# Benchmarks: each takes (fixtures, workdir) and returns (output paths, repeat)
+# or (output paths, repeat, details) with details recorded in the results
+# ---------------------------------------------------------------------------
+
+def bench_optimize_image_jpeg(fixtures, workdir):
+    optimize_images = load_script("optimize-images.py")
+    settings = optimize_images.CAROUSEL_SETTINGS
+    _, _, variants = optimize_images.optimize_image(
+        fixtures["large.jpg"], workdir / "large", settings["max_width"], settings["max_height"], "",
+        jpeg_quality=settings["jpeg_quality"], webp_quality=settings["webp_quality"],
+        srcset_widths=settings["srcset_widths"],
+    )
+    return [v[k] for v in variants for k in ("jpeg", "webp", "avif") if v.get(k)], 1
+
+
+def bench_optimize_image_rgba_png(fixtures, workdir):
+    optimize_images = load_script("optimize-images.py")
+    jpeg_path, webp_path, _ = optimize_images.optimize_image(fixtures["rgba.png"], workdir / "rgba", 1200, 900, "")
+    return [jpeg_path, webp_path], 1
+
+
+def bench_optimize_image_palette_png(fixtures, workdir):
+    optimize_images = load_script("optimize-images.py")
+    jpeg_path, webp_path, _ = optimize_images.optimize_image(fixtures["palette.png"], workdir / "palette", 1200, 900, "")
+    return [jpeg_path, webp_path], 1
+
+
+def bench_get_optimal_size(fixtures, workdir):
+    from PIL import Image
+
+    optimize_images = load_script("optimize-images.py")
+    repeat = 100000
+    with Image.open(fixtures["large.jpg"]) as img:
+        for _ in range(repeat):
+            optimize_images.get_optimal_size(img, 1200, 900)
+    return [], repeat
+
+
+def bench_probe_stream(fixtures, workdir, cached=False):
+    import video_probe
+
+    optimize_videos = load_script("optimize-videos.py")
+    video_probe.CACHE_PATH = workdir / "probe-cache.json"  # Leave the real cache alone
+    video_probe.clear_cache()
+    repeat = 1000 if cached else 10
+    for _ in range(repeat):
+        if not cached:
+            video_probe.clear_cache()  # Time ffprobe itself, as before the probe cache
+        optimize_videos.probe_stream("ffprobe", fixtures["alpha.webm"])
+    return [], repeat
+
+
+def bench_probe_stream_cached(fixtures, workdir):
+    return bench_probe_stream(fixtures, workdir, cached=True)
+
+
+def alpha_video_backend():
+    """The backend optimize-videos.py would pick for a transparent source, or None"""
+    if not has_ffmpeg():
+        return None
+    optimize_videos = load_script("optimize-videos.py")
+    return optimize_videos.select_backend(optimize_videos.detect_backends("ffmpeg"), "auto", True)
+
+
+def convert_one_requirement():
+    backend = alpha_video_backend()
+    if backend is None or not backend.supports_alpha:
+        return "no encoder that keeps alpha (hevc_videotoolbox or libvpx-vp9)"
+    return None
+
+
+def bench_convert_one(fixtures, workdir):
+    optimize_videos = load_script("optimize-videos.py")
+    backend = alpha_video_backend()
+    output = workdir / f"alpha{backend.suffix}"
+    rc = optimize_videos.convert_one("ffmpeg", "ffprobe", fixtures["alpha.webm"], output, "8M", True,
+                                     backend=backend)
+    if rc != 0:
+        raise RuntimeError(f"ffmpeg exit {rc}")
+    return [output], 1, {"backend": backend.name}
+
+
+def bench_generate_video_with_background(fixtures, workdir):
+    generate_ios_videos = load_script("generate-ios-videos.py")
+    output = workdir / "alpha-gray.webm"
+    if not generate_ios_videos.generate_video_with_background(fixtures["alpha.webm"], output, "#F0F2F5", "benchmark"):
+        raise RuntimeError("generate_video_with_background failed")
+    return [output], 1
+
+
+# name -> (function, required fixtures, requirement check or None)
+BENCHMARKS = {
+    "optimize_image[large.jpg]": (bench_optimize_image_jpeg, ["large.jpg"], None),
+    "optimize_image[rgba.png]": (bench_optimize_image_rgba_png, ["rgba.png"], None),
+    "optimize_image[palette.png]": (bench_optimize_image_palette_png, ["palette.png"], None),
+    "get_optimal_size": (bench_get_optimal_size, ["large.jpg"], None),
+    "probe_stream[alpha.webm]": (bench_probe_stream, ["alpha.webm"], None),
+    "probe_stream[alpha.webm, cached]": (bench_probe_stream_cached, ["alpha.webm"], None),
+    "convert_one[alpha.webm]": (bench_convert_one, ["alpha.webm"], convert_one_requirement),
+    "generate_video_with_background[alpha.webm]": (bench_generate_video_with_background, ["alpha.webm"], None),
+}
+
+
+def run_benchmark(name, fixtures, workdir):
+    """Run one benchmark in this (fresh child) process"""
+    function = BENCHMARKS[name][0]
+    fixtures = {key: Path(value) for key, value in fixtures.items()}
+    workdir = Path(workdir)
+    workdir.mkdir(parents=True, exist_ok=True)
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        outputs, repeat, *details = function(fixtures, workdir)
+    seconds = time.perf_counter() - start
+
+    return {
+        **(details[0] if details else {}),
+        "seconds": seconds,
+        "seconds_per_call": seconds / repeat,
+        "repeat": repeat,
+        "peak_rss_kb": peak_rss_kb(),
+        "output_bytes": sum(Path(p).stat().st_size for p in outputs if p and Path(p).exists()),
+    }
+
+
+def compare(previous_path, results):
+    """Print per-benchmark changes against an earlier JSON run"""
+    with open(previous_path, "r", encoding="utf-8") as f:
+        previous = {r["name"]: r for r in json.load(f)["results"]}
+
+    print(f"\n📈 Compared with {previous_path}")
+    print(f"{'Benchmark':<44} {'Time':>10} {'Peak RSS':>10} {'Bytes':>10}")
+    print("-" * 78)
+
+    def change(new, old):
+        return f"{(new / old - 1) * 100:+.1f}%" if old else "n/a"
+
+    for result in results:
+        old = previous.get(result["name"])
+        if result["status"] != "ok" or not old or old.get("status") != "ok":
+            continue
+        if result.get("backend") != old.get("backend"):
+            print(f"{result['name'][:44]:<44} ⏭️  backend changed: {old.get('backend')} → {result.get('backend')}")
+            continue
+        print(f"{result['name'][:44]:<44} "
+              f"{change(result['seconds_per_call'], old['seconds_per_call']):>10} "
+              f"{change(result['peak_rss_kb'], old['peak_rss_kb']):>10} "
+              f"{change(result['output_bytes'], old['output_bytes']):>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the image and video build pipelines")
+    parser.add_argument("--only", action="append", default=[], help="Run benchmarks whose name contains this text")
+    parser.add_argument("--fixtures", help="Fixture directory to reuse between runs (default: temporary)")
+    parser.add_argument("--output", help="JSON results path (default: bench-results/<timestamp>.json)")
+    parser.add_argument("--compare", help="Earlier JSON results to compare against")
+    args = parser.parse_args()
+
+    print("⏱️  Pipeline Benchmarks")
+    print("=" * 78)
+
+    pool_context = multiprocessing.get_context("spawn")
+    results = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        with pool_context.Pool(1) as pool:
+            fixtures = pool.apply(build_fixtures, (args.fixtures or str(tmp / "fixtures"),))
+
+        print(f"\n{'Benchmark':<44} {'Time':>10} {'Peak RSS':>10} {'Output':>10}")
+        print("-" * 78)
+        for name, (_, needs, requirement) in BENCHMARKS.items():
+            if args.only and not any(text in name for text in args.only):
+                continue
+
+            result = {"name": name}
+            missing = [fixture for fixture in needs if fixture not in fixtures]
+            reason = f"missing fixture {', '.join(missing)} (FFmpeg not found?)" if missing else (
+                requirement() if requirement else None)
+            if reason:
+                result.update(status="skipped", reason=reason)
+                print(f"{name[:44]:<44} ⏭️  {reason}")
+                results.append(result)
+                continue
+
+            try:
+                with pool_context.Pool(1, maxtasksperchild=1) as pool:
+                    result.update(pool.apply(run_benchmark, (name, fixtures, str(tmp / "out" / name))))
+                result["status"] = "ok"
+                per_call = result["seconds_per_call"]
+                shown = f"{per_call * 1000:.1f}ms" if per_call >= 0.001 else f"{per_call * 1e6:.1f}µs"
+                label = f"{name} ({result['backend']})" if "backend" in result else name
+                print(f"{label[:44]:<44} {shown:>10} {result['peak_rss_kb'] / 1024:>8.1f}MB "
+                      f"{result['output_bytes'] // 1024:>8}KB")
+            except Exception as e:
+                result.update(status="failed", reason=str(e))
+                print(f"{name[:44]:<44} ❌ {e}")
+            results.append(result)
+
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "versions": tool_versions(),
+        "results": results,
+    }
+    output = Path(args.output) if args.output else DEFAULT_RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+        f.write("\n")
+    print(f"\n📁 Results written to {output}")
+
+    if args.compare:
+        compare(args.compare, results)
+
+
+if __name__ == "__main__":
+    main()
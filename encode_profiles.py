@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Encode Profiles
+Named speed/quality profiles shared by the video scripts, so VP9, H.264 and
+HEVC encodes are configured in one place:
+
+- draft: fastest settings, for checking timing and framing
+- balanced: the everyday default
+- archival: slowest settings; VP9 also runs two passes
+
+Each profile sets the encoder's speed options and its threading. VP9 gets
+-row-mt 1 and as many -tile-columns as the frame width allows (tiles are at
+least 256 pixels wide); without them libvpx-vp9 encodes on little more than
+one core. -threads is left to the caller, which knows how many encodes run
+at once.
+
+Run benchmark-encode-profiles.py to compare the profiles on a real clip.
+
+Used by optimize-videos.py, generate-ios-videos.py and
+benchmark-encode-profiles.py.
+"""
+
+import math
+
+PROFILES = ("draft", "balanced", "archival")
+DEFAULT_PROFILE = "balanced"
+
+# Names accepted from before the profiles were shared (optimize-videos.py --preset)
+ALIASES = {"fast": "draft", "quality": "archival"}
+
+# Speed options per encoder and profile
+SPEED = {
+    "libvpx-vp9": {
+        "draft": ["-deadline", "realtime", "-cpu-used", "8"],
+        "balanced": ["-deadline", "good", "-cpu-used", "4"],
+        "archival": ["-deadline", "good", "-cpu-used", "1", "-auto-alt-ref", "1", "-lag-in-frames", "25"],
+    },
+    "libx264": {
+        "draft": ["-preset", "veryfast"],
+        "balanced": ["-preset", "medium"],
+        "archival": ["-preset", "slow"],
+    },
+    "libx265": {
+        "draft": ["-preset", "veryfast"],
+        "balanced": ["-preset", "medium"],
+        "archival": ["-preset", "slow"],
+    },
+    "hevc_videotoolbox": {
+        "draft": ["-prio_speed", "1"],
+        "balanced": [],
+        "archival": ["-prio_speed", "0"],
+    },
+}
+
+# Encoders and profiles that run more than one pass (everything else is single pass)
+PASSES = {("libvpx-vp9", "archival"): 2}
+
+# Narrowest VP9 tile, and libvpx's limit of 2^6 tile columns
+VP9_MIN_TILE_WIDTH = 256
+VP9_MAX_TILE_COLUMNS_LOG2 = 6
+
+
+def resolve(name):
+    """Profile name for name or one of its ALIASES (for argparse type=)"""
+    name = ALIASES.get(name, name)
+    if name not in PROFILES:
+        raise ValueError(f"unknown encode profile: {name}")
+    return name
+
+
+def vp9_tile_columns(width):
+    """log2 of the number of tile columns a frame of this width can use"""
+    if not width or width < 2 * VP9_MIN_TILE_WIDTH:
+        return 0
+    return min(VP9_MAX_TILE_COLUMNS_LOG2, int(math.log2(width // VP9_MIN_TILE_WIDTH)))
+
+
+def encoder_args(encoder, profile, width=None):
+    """Speed and threading options for one encoder under a profile"""
+    args = list(SPEED[encoder][resolve(profile)])
+    if encoder == "libvpx-vp9":
+        args += ["-row-mt", "1"]
+        if width:
+            args += ["-tile-columns", str(vp9_tile_columns(width))]
+    return args
+
+
+def passes(encoder, profile):
+    return PASSES.get((encoder, resolve(profile)), 1)
+
+
+def pass_args(pass_number, logfile):
+    """Options for one pass of a multi-pass encode; pass 1 should write to FIRST_PASS_OUTPUT"""
+    return ["-pass", str(pass_number), "-passlogfile", str(logfile)]
+
+
+# Where a first pass writes: its only product is the pass log
+FIRST_PASS_OUTPUT = ["-f", "null", "-"]
@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+Video Poster Extraction
+Gives every <video> on the site a poster image, so the element shows a
+frame straight away instead of an empty box while the video downloads.
+
+For each video referenced by the site's HTML (src, data-webm or the first
+<source>), one frame is decoded with ffmpeg and encoded through
+optimize-images.py's optimize_image() into a posters/ folder next to the
+video: WebP and JPEG, sized to the element rather than the video. The
+widest CSS max-width the site's stylesheets give any class of the tags
+playing it, times POSTER_SETTINGS['density'] for high-DPI screens, sets
+the width; videos with no such max-width stay within max_width, and no
+poster is larger than the video itself. The <video> tag then gets a
+poster= attribute and a preload hint:
+
+- poster: the WebP for transparent videos (the JPEG would be flattened onto
+  white), the JPEG otherwise
+- preload="metadata" for autoplay videos, preload="none" for the rest, so
+  nothing beyond the poster is fetched until the video is needed
+
+The frame is the first one for autoplay videos (the poster is replaced by
+the same picture when playback starts) and ffmpeg's thumbnail filter pick
+for the others; --frame overrides both. Posters are rebuilt only when the
+video or the settings change (.image-manifest.json in each posters/ folder).
+
+Run after generate-ios-videos.py / optimize-videos.py, or as the posters
+job of run-pipeline.py.
+
+Requirements:
+- Python 3.6+
+- FFmpeg in PATH
+- Pillow (pip install Pillow)
+
+Usage:
+    python3 extract-posters.py                    # every video on the site
+    python3 extract-posters.py --dry-run          # list the videos and frame choices
+    python3 extract-posters.py --frame representative --no-html
+"""
+
+import argparse
+import importlib.util
+import posixpath
+import re
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import video_probe
+from asset_references import SITE_DOCUMENTS, resolve_url
+
+POSTERS_DIR = "posters"
+FRAME_MODES = ("auto", "first", "representative")
+
+POSTER_SETTINGS = {
+    'max_width': 1280,      # Ceiling when the layout gives no max-width
+    'max_height': 1280,
+    'density': 2,           # Device pixels per CSS pixel of the layout width
+    'jpeg_quality': 85,
+    'webp_quality': 85,
+    'thumbnail_frames': 100,    # Frames the thumbnail filter chooses from
+}
+
+VIDEO_TAG_RE = re.compile(r'<video\b(?P<attrs>[^>]*)>(?P<body>.*?)</video>', re.IGNORECASE | re.DOTALL)
+SOURCE_SRC_RE = re.compile(r'<source\b[^>]*?\bsrc\s*=\s*"([^"]*)"', re.IGNORECASE)
+AUTOPLAY_RE = re.compile(r'(?<![\w-])autoplay(?![\w-])', re.IGNORECASE)
+CSS_COMMENT_RE = re.compile(r'/\*.*?\*/', re.DOTALL)
+CSS_RULE_RE = re.compile(r'(?P<selectors>[^{}]+)\{(?P<body>[^{}]*)\}')
+CSS_MAX_WIDTH_RE = re.compile(r'(?<![\w-])max-width\s*:\s*(\d+(?:\.\d+)?)px', re.IGNORECASE)
+
+
+def load_optimize_images():
+    """Import optimize-images.py (hyphenated, so not importable by name)"""
+    spec = importlib.util.spec_from_file_location(
+        "optimize_images", Path(__file__).resolve().parent / "optimize-images.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def attr_pattern(name):
+    return re.compile(r'(?<![\w-])' + name + r'\s*=\s*"([^"]*)"', re.IGNORECASE)
+
+
+SRC_RE = attr_pattern('src')
+DATA_WEBM_RE = attr_pattern('data-webm')
+POSTER_RE = attr_pattern('poster')
+PRELOAD_RE = attr_pattern('preload')
+CLASS_RE = attr_pattern('class')
+
+
+def video_url(match):
+    """URL of the file a <video> plays: data-webm, src, or its first <source>"""
+    for pattern, text in ((DATA_WEBM_RE, match.group('attrs')), (SRC_RE, match.group('attrs')),
+                          (SOURCE_SRC_RE, match.group('body'))):
+        found = pattern.search(text)
+        if found:
+            return found.group(1)
+    return None
+
+
+def find_videos(documents=None):
+    """Site-root-relative paths of every video the HTML documents play, in page order"""
+    videos = []
+    for document in documents or SITE_DOCUMENTS:
+        if not document.endswith('.html') or not Path(document).exists():
+            continue
+        content = Path(document).read_text(encoding='utf-8')
+        for match in VIDEO_TAG_RE.finditer(content):
+            url = video_url(match)
+            path = resolve_url(url, posixpath.dirname(document))[0] if url else None
+            if path and path not in videos:
+                videos.append(path)
+    return videos
+
+
+def css_max_widths(documents=None):
+    """Largest px max-width any stylesheet rule (in any media query) gives each class"""
+    widths = {}
+    for document in documents or SITE_DOCUMENTS:
+        if not document.endswith('.css') or not Path(document).exists():
+            continue
+        content = CSS_COMMENT_RE.sub('', Path(document).read_text(encoding='utf-8'))
+        for rule in CSS_RULE_RE.finditer(content):
+            found = [float(value) for value in CSS_MAX_WIDTH_RE.findall(rule.group('body'))]
+            if not found:
+                continue
+            for selector in rule.group('selectors').split(','):
+                # Only the classes of the element the rule styles, not its ancestors
+                subject = re.split(r'[\s>+~]+', selector.strip())[-1]
+                for name in re.findall(r'\.([\w-]+)', subject):
+                    widths[name] = max(widths.get(name, 0), *found)
+    return widths
+
+
+def layout_width(video, widths, documents=None):
+    """Widest CSS width the site shows a video at, or None when a tag has no max-width"""
+    largest = None
+    for document in documents or SITE_DOCUMENTS:
+        if not document.endswith('.html') or not Path(document).exists():
+            continue
+        content = Path(document).read_text(encoding='utf-8')
+        for match in VIDEO_TAG_RE.finditer(content):
+            url = video_url(match)
+            if not url or resolve_url(url, posixpath.dirname(document))[0] != video:
+                continue
+            classes = CLASS_RE.search(match.group('attrs'))
+            known = [widths[name] for name in (classes.group(1).split() if classes else []) if name in widths]
+            if not known:
+                return None
+            largest = max(largest or 0, *known)
+    return largest
+
+
+def extract_frame(video, info, output, mode):
+    """Decode one frame of a video to a PNG (RGBA if the video has alpha)"""
+    if mode == 'representative':
+        filters = ["-vf", f"thumbnail={POSTER_SETTINGS['thumbnail_frames']}"]
+    else:
+        filters = []
+    cmd = [
+        "ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+        *video_probe.decoder_args(info), "-i", str(video),
+        *filters, "-frames:v", "1",
+        "-pix_fmt", "rgba" if info.get('has_alpha') else "rgb24",
+        str(output),
+    ]
+    subprocess.run(cmd, capture_output=True, text=True, check=True)
+
+
+def make_poster(optimize_images, video, mode, use_manifest=True, display_width=None):
+    """Extract and encode the poster of one video.
+
+    display_width is the widest CSS width the video is shown at (None if
+    unknown); the poster gets POSTER_SETTINGS['density'] times as many pixels.
+
+    Returns {'jpeg', 'webp', 'width', 'height', 'alpha'} (paths as
+    strings), or None if the video cannot be read.
+    """
+    video = Path(video)
+    info = video_probe.probe(video)
+    if info is None:
+        print(f"  ❌ Not a readable video: {video}")
+        return None
+
+    max_width = min(POSTER_SETTINGS['max_width'], info['width'])
+    if display_width:
+        max_width = min(max_width, round(display_width * POSTER_SETTINGS['density']))
+    max_height = min(POSTER_SETTINGS['max_height'], info['height'])
+    posters_dir = video.parent / POSTERS_DIR
+    posters_dir.mkdir(exist_ok=True)
+    output_path = posters_dir / video.stem
+
+    manifest = optimize_images.ImageManifest.load(posters_dir, force=not use_manifest)
+    settings = {**POSTER_SETTINGS, 'max_width': max_width, 'max_height': max_height,
+                'frame': mode, 'pillow': optimize_images.PIL.__version__}
+    source_hash = optimize_images.file_digest(video)
+    cached = manifest.lookup(video, source_hash, settings)
+    if cached is not None:
+        print(f"  ⚡ Up to date: {video.name} (manifest hit)")
+        outputs = cached['outputs']
+        return {'jpeg': outputs['jpeg'].as_posix(),
+                'webp': outputs['webp'].as_posix() if outputs.get('webp') else None,
+                'width': cached['width'], 'height': cached['height'], 'alpha': cached['alpha']}
+
+    with tempfile.TemporaryDirectory(prefix="poster-") as workdir:
+        frame = Path(workdir) / f"{video.stem}.png"
+        try:
+            extract_frame(video, info, frame, mode)
+        except subprocess.CalledProcessError as e:
+            print(f"  ❌ Frame extraction failed for {video.name}: {e.stderr.strip()[-200:]}")
+            return None
+        jpeg_path, webp_path, variants = optimize_images.optimize_image(
+            frame, output_path, max_width, max_height, f"({mode} frame)",
+            jpeg_quality=POSTER_SETTINGS['jpeg_quality'],
+            webp_quality=POSTER_SETTINGS['webp_quality'],
+            draft=False,
+        )
+    if not jpeg_path:
+        return None
+
+    poster = {'jpeg': jpeg_path.as_posix(), 'webp': webp_path.as_posix() if webp_path else None,
+              'width': variants[0]['width'], 'height': variants[0]['height'],
+              'alpha': bool(info.get('has_alpha'))}
+    manifest.record(video, source_hash, settings, {'jpeg': jpeg_path, 'webp': webp_path},
+                    width=poster['width'], height=poster['height'], alpha=poster['alpha'])
+    manifest.save()
+    return poster
+
+
+def poster_url(poster, document_dir):
+    """URL of the poster file a document should use"""
+    path = poster['webp'] if poster['alpha'] and poster['webp'] else poster['jpeg']
+    return posixpath.relpath(path, document_dir) if document_dir else path
+
+
+def set_attribute(attrs, pattern, name, value):
+    """Replace an attribute's value, or add it after the last attribute.
+
+    Tags written one attribute per line get the new attribute on its own
+    line with the same indentation.
+    """
+    if pattern.search(attrs):
+        return pattern.sub(lambda m: f'{name}="{value}"', attrs, count=1)
+    multiline = re.search(r'\n([ \t]*)\S[^\n]*\n[ \t]*$', attrs)
+    if multiline:
+        end = attrs.rstrip()
+        return f'{end}\n{multiline.group(1)}{name}="{value}"{attrs[len(end):]}'
+    return f'{attrs.rstrip()} {name}="{value}"'
+
+
+def update_document(document, posters, dry_run=False):
+    """Add poster= and preload= to every <video> in a document; returns the number changed"""
+    content = Path(document).read_text(encoding='utf-8')
+    document_dir = posixpath.dirname(document)
+    changes = 0
+
+    def rewrite(match):
+        nonlocal changes
+        if content.rfind('<!--', 0, match.start()) > content.rfind('-->', 0, match.start()):
+            return match.group(0)
+        url = video_url(match)
+        path = resolve_url(url, document_dir)[0] if url else None
+        if path not in posters:
+            return match.group(0)
+        attrs = match.group('attrs')
+        preload = 'metadata' if AUTOPLAY_RE.search(attrs) else 'none'
+        new_attrs = set_attribute(attrs, POSTER_RE, 'poster', poster_url(posters[path], document_dir))
+        new_attrs = set_attribute(new_attrs, PRELOAD_RE, 'preload', preload)
+        if new_attrs == attrs:
+            return match.group(0)
+        changes += 1
+        print(f"   ✓ {Path(path).name}: poster {Path(poster_url(posters[path], '')).name}, preload={preload}")
+        return f"<video{new_attrs}>{match.group('body')}</video>"
+
+    updated = VIDEO_TAG_RE.sub(rewrite, content)
+    if changes and not dry_run:
+        Path(document).write_text(updated, encoding='utf-8')
+    return changes
+
+
+def frame_mode(video, mode, documents=None):
+    """Resolve --frame auto: first frame when any tag autoplays the video"""
+    if mode != 'auto':
+        return mode
+    for document in documents or SITE_DOCUMENTS:
+        if not document.endswith('.html') or not Path(document).exists():
+            continue
+        content = Path(document).read_text(encoding='utf-8')
+        for match in VIDEO_TAG_RE.finditer(content):
+            url = video_url(match)
+            if url and resolve_url(url, posixpath.dirname(document))[0] == video \
+                    and AUTOPLAY_RE.search(match.group('attrs')):
+                return 'first'
+    return 'representative'
+
+
+def extract_posters(mode='auto', use_manifest=True, update_html=True, dry_run=False, documents=None):
+    """Build posters for every video on the site and reference them from the HTML.
+
+    Returns {video path: poster} for the videos that got one.
+    """
+    optimize_images = load_optimize_images()
+    documents = documents or SITE_DOCUMENTS
+
+    print("\n🖼️  Extracting Video Posters")
+    print("=" * 50)
+    videos = find_videos(documents)
+    widths = css_max_widths(documents)
+    posters = {}
+    missing = []
+    for video in videos:
+        if not Path(video).exists():
+            missing.append(video)
+            continue
+        video_mode = frame_mode(video, mode, documents)
+        display_width = layout_width(video, widths, documents)
+        shown = f"{display_width:g}px wide" if display_width else "no CSS max-width"
+        print(f"\n🎞️  {video} ({video_mode} frame, {shown})")
+        if dry_run:
+            continue
+        poster = make_poster(optimize_images, video, video_mode, use_manifest, display_width)
+        if poster:
+            posters[video] = poster
+    video_probe.save_cache()
+
+    for video in missing:
+        print(f"⚠️  Missing video, no poster: {video}")
+
+    if update_html and posters:
+        print("\n🔄 Updating <video> tags")
+        for document in documents:
+            if document.endswith('.html') and Path(document).exists():
+                changes = update_document(document, posters, dry_run)
+                if changes:
+                    print(f"   📁 Saved {document} with {changes} updates")
+
+    print(f"\n✅ {len(posters)} of {len(videos)} video(s) have posters")
+    return posters
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract poster frames for the site's videos")
+    parser.add_argument("--frame", choices=FRAME_MODES, default="auto",
+                        help="Frame to use: first, representative (ffmpeg thumbnail filter), "
+                             "or auto = first for autoplay videos (default: auto)")
+    parser.add_argument("--no-html", action="store_true", help="Only write the poster images")
+    parser.add_argument("--no-manifest", action="store_true", help="Rebuild every poster")
+    parser.add_argument("--dry-run", action="store_true", help="List the videos without writing anything")
+    args = parser.parse_args()
+
+    posters = extract_posters(args.frame, not args.no_manifest, not args.no_html, args.dry_run)
+    if not posters and not args.dry_run:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
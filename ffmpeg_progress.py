@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+FFmpeg Progress
+Runs ffmpeg with -progress pipe:1 and turns its key=value stream into live
+per-job fps, speed, ETA and output size, plus a JSON run report.
+
+ffmpeg writes a block of key=value lines roughly twice a second, ending in
+progress=continue (or progress=end). out_time_us against the source
+duration gives the completion fraction and ETA.
+
+Used by optimize-videos.py and generate-ios-videos.py.
+"""
+
+import json
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+# Seconds between progress lines when stdout is not a terminal
+LOG_INTERVAL = 10.0
+
+
+def format_eta(seconds):
+    if seconds is None:
+        return "--:--"
+    seconds = int(seconds)
+    return f"{seconds // 60}:{seconds % 60:02d}"
+
+
+def parse_number(text):
+    """'23.5', '1.2x', 'N/A' -> float or None"""
+    try:
+        return float(text.rstrip('x'))
+    except (AttributeError, ValueError):
+        return None
+
+
+class ProgressBoard:
+    """Shows the progress of every running job.
+
+    On a terminal all jobs share one status line that is redrawn in place;
+    otherwise each job prints a line every LOG_INTERVAL seconds. Call
+    clear() before printing anything else so the status line isn't mixed in.
+    """
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self.live = self.stream.isatty()
+        self.jobs = {}
+        self.last_logged = {}
+        self.lock = threading.Lock()
+        self.width = 0
+
+    def update(self, label, status):
+        with self.lock:
+            self.jobs[label] = status
+            if self.live:
+                self._draw()
+            elif time.monotonic() - self.last_logged.setdefault(label, time.monotonic()) >= LOG_INTERVAL:
+                self.last_logged[label] = time.monotonic()
+                self.stream.write(f"  ⏳ {label}: {self.describe(status)}\n")
+                self.stream.flush()
+
+    def finish(self, label):
+        with self.lock:
+            self.jobs.pop(label, None)
+            self.last_logged.pop(label, None)
+            if self.live:
+                self._draw()
+
+    def clear(self):
+        with self.lock:
+            if self.live and self.width:
+                self.stream.write("\r" + " " * self.width + "\r")
+                self.stream.flush()
+                self.width = 0
+
+    @staticmethod
+    def describe(status):
+        parts = []
+        if status.get('percent') is not None:
+            parts.append(f"{status['percent']:.0f}%")
+        if status.get('fps'):
+            parts.append(f"{status['fps']:.0f} fps")
+        if status.get('speed'):
+            parts.append(f"{status['speed']:.2f}x")
+        parts.append(f"ETA {format_eta(status.get('eta'))}")
+        parts.append(f"{status.get('size_bytes', 0) // 1024}KB")
+        return ", ".join(parts)
+
+    def _draw(self):
+        text = " | ".join(f"{label} {self.describe(status)}" for label, status in self.jobs.items())
+        text = ("⏳ " + text) if text else ""
+        self.stream.write("\r" + text.ljust(self.width) + "\r" + text)
+        self.stream.flush()
+        self.width = len(text)
+
+
+def run_ffmpeg(cmd, duration=None, label="ffmpeg", board=None, check=False):
+    """Run an ffmpeg command with live progress; returns a stats dict.
+
+    cmd must not already contain -progress. stats holds returncode, stderr,
+    wall_seconds and the final frames, fps, speed, out_seconds and
+    size_bytes reported by ffmpeg. With check=True a non-zero exit raises
+    subprocess.CalledProcessError (with stderr attached) like subprocess.run.
+    """
+    cmd = [cmd[0], "-progress", "pipe:1", "-nostats", *cmd[1:]]
+    start = time.perf_counter()
+    stderr_lines = []
+    status = {'percent': None, 'fps': None, 'speed': None, 'eta': None, 'size_bytes': 0,
+              'frames': 0, 'out_seconds': 0.0}
+
+    proc = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                            text=True, errors="replace")
+    # Drain stderr on its own thread so a chatty encoder can't fill the pipe and stall
+    reader = threading.Thread(target=lambda: stderr_lines.extend(proc.stderr), daemon=True)
+    reader.start()
+
+    block = {}
+    for line in proc.stdout:
+        key, _, value = line.strip().partition('=')
+        if key != 'progress':
+            block[key] = value
+            continue
+
+        out_us = parse_number(block.get('out_time_us') or block.get('out_time_ms'))
+        status['out_seconds'] = max(out_us or 0, 0) / 1_000_000
+        status['frames'] = int(parse_number(block.get('frame')) or 0)
+        status['fps'] = parse_number(block.get('fps'))
+        status['speed'] = parse_number(block.get('speed'))
+        status['size_bytes'] = int(parse_number(block.get('total_size')) or 0)
+        if duration:
+            status['percent'] = min(100.0, 100.0 * status['out_seconds'] / duration)
+            if status['speed']:
+                status['eta'] = max(0.0, duration - status['out_seconds']) / status['speed']
+        if board is not None and value != 'end':
+            board.update(label, status)
+        block = {}
+
+    returncode = proc.wait()
+    reader.join()
+    if board is not None:
+        board.finish(label)
+
+    wall = time.perf_counter() - start
+    stats = {
+        'returncode': returncode,
+        'stderr': "".join(stderr_lines),
+        'wall_seconds': wall,
+        'frames': status['frames'],
+        'fps': status['frames'] / wall if wall > 0 else None,
+        'speed': status['out_seconds'] / wall if wall > 0 else None,
+        'out_seconds': status['out_seconds'],
+        'size_bytes': status['size_bytes'],
+    }
+    if check and returncode != 0:
+        raise subprocess.CalledProcessError(returncode, cmd, stderr=stats['stderr'])
+    return stats
+
+
+class RunReport:
+    """Collects one record per ffmpeg job and writes them as JSON"""
+
+    def __init__(self, script):
+        self.script = script
+        self.started = datetime.now(timezone.utc)
+        self.start_time = time.perf_counter()
+        self.jobs = []
+        self.lock = threading.Lock()
+
+    def add(self, stats, **fields):
+        """Record a job; fields (input, output, variant, ...) come first in the entry"""
+        entry = {**fields, **{key: value for key, value in stats.items() if key != 'stderr'}}
+        with self.lock:
+            self.jobs.append(entry)
+
+    def write(self, path):
+        jobs = sorted(self.jobs, key=lambda job: -job.get('wall_seconds', 0))
+        report = {
+            'script': self.script,
+            'started': self.started.isoformat(timespec='seconds'),
+            'wall_seconds': time.perf_counter() - self.start_time,
+            'jobs': jobs,  # Slowest first
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, default=str)
+            f.write('\n')
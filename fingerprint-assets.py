@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Asset Fingerprinting
+Gives every asset the site's pages load a content-hashed name
+(profile_optimized.jpg -> profile_optimized.3f9c2a7b1e.jpg), rewrites the
+references to them, and marks hashed names as immutable in .htaccess, so
+browsers and CDNs can cache them for a year and repeat visits fetch only
+the HTML.
+
+Assets are the local files referenced from the site's documents (see
+asset_references.SITE_DOCUMENTS: src, srcset, href, poster, data-webm,
+data-mov, CSS url() and path strings in scripts) whose suffix is in
+FINGERPRINT_SUFFIXES. The HTML pages keep their names, and so do links to
+documents (the résumé PDF) and favicon.ico, which browsers request by name.
+Stylesheets and scripts are hashed after the references inside them are
+rewritten, so a changed image also changes the name of the CSS using it.
+
+The mapping is written to asset-manifest.json. The hashed files are copies:
+the originals stay for URLs the scan cannot see or rewrite (og:image, links
+from other sites, the audio URLs binaural.js builds at runtime). --move
+deletes them instead.
+
+This rewrites the pages in place: run it on the deploy checkout, not in a
+working copy you keep editing. --revert undoes it from the manifest.
+
+This is for Apache deploys only. GitHub Pages ignores .htaccess and serves
+everything with a short max-age, so hashed names would buy nothing there;
+the Pages workflow does not run it.
+
+Requirements:
+- Python 3.6+
+
+Usage:
+    python3 fingerprint-assets.py --dry-run    # show the hashed names
+    python3 fingerprint-assets.py
+    python3 fingerprint-assets.py --revert
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+from pathlib import Path
+
+from asset_references import index_documents, rewrite_documents
+
+MANIFEST_NAME = "asset-manifest.json"
+HTACCESS = ".htaccess"
+HASH_LENGTH = 10
+
+FINGERPRINT_SUFFIXES = {
+    '.jpg', '.jpeg', '.png', '.gif', '.webp', '.avif', '.svg',
+    '.webm', '.mp4', '.mov', '.m4a', '.mp3', '.wav',
+    '.woff', '.woff2', '.ttf', '.otf',
+    '.css', '.js', '.json',
+}
+
+HASHED_NAME_RE = re.compile(r'\.[0-9a-f]{%d}$' % HASH_LENGTH)
+
+HTACCESS_BEGIN = "# BEGIN fingerprint-assets"
+HTACCESS_END = "# END fingerprint-assets"
+HTACCESS_BLOCK_RE = re.compile(re.escape(HTACCESS_BEGIN) + r'.*?' + re.escape(HTACCESS_END) + r'\n?', re.DOTALL)
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+
+
+def hashed_path(path, data):
+    """'assets/a.jpg' + bytes -> 'assets/a.<hash>.jpg'"""
+    path = Path(path)
+    return (path.parent / f"{path.stem}.{content_hash(data)}{path.suffix}").as_posix()
+
+
+def is_hashed(path):
+    return bool(HASHED_NAME_RE.search(Path(path).stem))
+
+
+def fingerprintable(path):
+    path = Path(path)
+    return path.suffix.lower() in FINGERPRINT_SUFFIXES and path.is_file() and not is_hashed(path)
+
+
+def plan(documents=None):
+    """Work out every hashed name without touching the disk.
+
+    Returns (mapping {old path: new path}, rewritten {document: new text})
+    where rewritten holds the new contents of every document that changes.
+    Documents that are themselves assets (CSS, scripts) are hashed on their
+    rewritten text, after every asset they reference.
+    """
+    indexes = {index.document.as_posix(): index for index in index_documents(documents)}
+    assets = sorted({
+        ref.path for index in indexes.values() for ref in index.references
+        if ref.path is not None and fingerprintable(ref.path)
+    })
+
+    mapping = {}
+    for path in assets:
+        if path not in indexes:
+            mapping[path] = hashed_path(path, Path(path).read_bytes())
+
+    # Asset documents, each once every asset document it references is mapped
+    pending = [path for path in assets if path in indexes]
+    while pending:
+        ready = [path for path in pending
+                 if not any(ref.path in pending and ref.path != path for ref in indexes[path].references)]
+        if not ready:
+            raise ValueError(f"circular references between {', '.join(pending)}")
+        for path in ready:
+            text, _ = indexes[path].rewrite(mapping)
+            mapping[path] = hashed_path(path, text.encode('utf-8'))
+            pending.remove(path)
+
+    rewritten = {}
+    for document, index in indexes.items():
+        text, changed = index.rewrite(mapping)
+        if changed:
+            rewritten[document] = text
+    return mapping, rewritten
+
+
+def htaccess_block():
+    suffixes = "|".join(sorted(suffix.lstrip('.') for suffix in FINGERPRINT_SUFFIXES))
+    return "\n".join([
+        HTACCESS_BEGIN,
+        "# Generated by fingerprint-assets.py: hashed names never change content",
+        "<IfModule mod_headers.c>",
+        f'  <FilesMatch "\\.[0-9a-f]{{{HASH_LENGTH}}}\\.({suffixes})(\\.br|\\.gz)?$">',
+        '    Header set Cache-Control "public, max-age=31536000, immutable"',
+        "  </FilesMatch>",
+        '  <FilesMatch "\\.html(\\.br|\\.gz)?$">',
+        '    Header set Cache-Control "no-cache"',
+        "  </FilesMatch>",
+        "</IfModule>",
+        HTACCESS_END,
+    ]) + "\n"
+
+
+def update_htaccess(block):
+    """Replace (or append, or with block=None remove) the generated rules"""
+    path = Path(HTACCESS)
+    text = path.read_text(encoding='utf-8') if path.exists() else ""
+    text = HTACCESS_BLOCK_RE.sub("", text).rstrip("\n")
+    if block:
+        text = f"{text}\n\n{block}" if text else block
+    path.write_text(text + "\n" if text and not text.endswith("\n") else text, encoding='utf-8')
+
+
+def load_manifest():
+    try:
+        with open(MANIFEST_NAME, 'r', encoding='utf-8') as f:
+            return json.load(f).get('assets', {})
+    except (OSError, ValueError):
+        return {}
+
+
+def fingerprint(dry_run=False, move=False):
+    mapping, rewritten = plan()
+    print(f"🔐 {len(mapping)} asset(s) to fingerprint, {len(rewritten)} document(s) to rewrite")
+    for old, new in mapping.items():
+        print(f"   {old} → {Path(new).name}")
+    if dry_run or not mapping:
+        return mapping
+
+    # Rewritten asset documents (CSS, scripts) go straight to their new name
+    for document, text in rewritten.items():
+        Path(mapping.get(document, document)).write_text(text, encoding='utf-8')
+    for old, new in mapping.items():
+        if old not in rewritten:
+            shutil.copy2(old, new)
+        if move:
+            os.remove(old)
+
+    manifest = {**load_manifest(), **mapping}
+    with open(MANIFEST_NAME, 'w', encoding='utf-8') as f:
+        json.dump({'version': 1, 'assets': dict(sorted(manifest.items()))}, f, indent=2)
+        f.write('\n')
+    update_htaccess(htaccess_block())
+    print(f"📁 Wrote {MANIFEST_NAME} and the cache rules in {HTACCESS}")
+    return mapping
+
+
+def revert(dry_run=False):
+    manifest = load_manifest()
+    if not manifest:
+        print(f"ℹ️  No {MANIFEST_NAME}: nothing to revert")
+        return {}
+    print(f"↩️  Restoring {len(manifest)} original name(s)")
+    if dry_run:
+        return manifest
+    for old, new in manifest.items():
+        if Path(new).exists():
+            if Path(old).exists():
+                os.remove(new)
+            else:
+                os.replace(new, old)
+    inverse = {new: old for old, new in manifest.items()}
+    results = rewrite_documents(inverse)
+    for document, changed in results.items():
+        print(f"   📝 {document}: {changed} reference(s)")
+    Path(MANIFEST_NAME).unlink()
+    update_htaccess(None)
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Give the site's assets content-hashed names")
+    parser.add_argument("--root", default=".", help="Site root (default: current directory)")
+    parser.add_argument("--dry-run", action="store_true", help="Show the hashed names without writing anything")
+    parser.add_argument("--move", action="store_true", help="Delete the originals once their hashed copies exist")
+    parser.add_argument("--revert", action="store_true", help=f"Undo a previous run using {MANIFEST_NAME}")
+    args = parser.parse_args()
+    os.chdir(args.root)
+
+    print("🔐 Asset Fingerprinting")
+    print("=" * 50)
+    try:
+        if args.revert:
+            revert(args.dry_run)
+        else:
+            fingerprint(args.dry_run, args.move)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,8 @@ iOS Video Background Generator
 Generates videos with solid backgrounds for iOS compatibility
 by replacing transparent areas with specified colors.
 Now creates MP4 fallbacks instead of MOV for better compression.
+Each source is decoded once; all colour variants and both codecs are
+encoded from a single ffmpeg filter graph.
 
 Requirements:
 - FFmpeg installed and in PATH
@@ -11,13 +13,29 @@ Requirements:
 
 Usage:
     python3 generate-ios-videos.py
+    python3 generate-ios-videos.py --report video-report.json   # per-encode timings as JSON
+    python3 generate-ios-videos.py --target-ssim 0.98           # smallest CRF that still looks the same
+    python3 generate-ios-videos.py --compare                    # also time the old per-variant path
+    python3 generate-ios-videos.py --crop                       # encode only the visible area (needs NumPy)
+    python3 generate-ios-videos.py --profile archival           # slower, smaller (two-pass VP9)
 """
 
+import argparse
+import contextlib
+import io
 import os
 import subprocess
 import sys
+import tempfile
+import time
 from pathlib import Path
 
+import encode_profiles
+import ffmpeg_progress
+import video_crop
+import video_probe
+import video_quality
+
 # Video processing configuration
 VIDEOS_CONFIG = {
     # Source video -> [(output_name, background_color, description)]
@@ -38,6 +56,43 @@ VIDEOS_CONFIG = {
 INPUT_DIR = Path("assets/binaural-externalization")
 OUTPUT_DIR = Path("assets/binaural-externalization")
 
+# Default CRFs; with --target-ssim/--min-psnr each output searches its own
+VP9_CRF = 30
+MP4_CRF = 25
+
+# Identical inputs and settings give byte-identical files (no random
+# Matroska segment UID), so content hashes of outputs are stable
+BITEXACT = ["-fflags", "+bitexact"]
+
+# Encode profile (speed, threading, passes) from encode_profiles; set by --profile
+PROFILE = encode_profiles.DEFAULT_PROFILE
+
+def vp9_args(crf, width=None):
+    """Output options for the WebM (VP9) variants; width sets the tile columns"""
+    return [
+        "-c:v", "libvpx-vp9",
+        *encode_profiles.encoder_args("libvpx-vp9", PROFILE, width),  # Speed, row-mt and tiles
+        "-crf", str(crf), "-b:v", "0", "-pix_fmt", "yuv420p", *BITEXACT,
+    ]
+
+def vp9_passes():
+    return encode_profiles.passes("libvpx-vp9", PROFILE)
+
+def mp4_args(crf):
+    """Output options for the MP4 (H.264) fallbacks"""
+    return [
+        "-c:v", "libx264",                              # H.264 codec for MP4
+        *encode_profiles.encoder_args("libx264", PROFILE),  # Encoding speed/quality
+        "-crf", str(crf),                               # Good quality with smaller size
+        "-pix_fmt", "yuv420p",                          # Universal compatibility
+        "-movflags", "+faststart",                      # Web optimization
+        *BITEXACT,
+    ]
+
+# Live progress for the running encode, and per-encode timings for --report
+PROGRESS = ffmpeg_progress.ProgressBoard()
+REPORT = ffmpeg_progress.RunReport("generate-ios-videos.py")
+
 def check_ffmpeg():
     """Check if FFmpeg and FFprobe are installed and accessible"""
     try:
@@ -63,58 +118,72 @@ def hex_to_rgb(hex_color):
     return tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
 
 def get_video_info(input_path):
-    """Get comprehensive video information"""
-    cmd = [
-        "ffprobe", 
-        "-v", "quiet",
-        "-print_format", "json",
-        "-show_format",
-        "-show_streams",
-        str(input_path)
-    ]
-    
-    try:
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-        import json
-        info = json.loads(result.stdout)
-        
-        # Find video stream
-        for stream in info['streams']:
-            if stream['codec_type'] == 'video':
-                width = stream['width']
-                height = stream['height']
-                
-                # Get duration from stream or format
-                duration = None
-                if 'duration' in stream:
-                    duration = float(stream['duration'])
-                elif 'duration' in info['format']:
-                    duration = float(info['format']['duration'])
-                
-                # Get frame rate
-                fps = None
-                if 'r_frame_rate' in stream:
-                    fps_str = stream['r_frame_rate']
-                    if '/' in fps_str and fps_str != '0/0':
-                        num, den = fps_str.split('/')
-                        if int(den) != 0:
-                            fps = float(num) / float(den)
-                
-                return {
-                    'width': width,
-                    'height': height, 
-                    'duration': duration,
-                    'fps': fps,
-                    'has_alpha': stream.get('pix_fmt', '').endswith('a')
-                }
-        
-        return None
-    except Exception as e:
-        print(f"❌ Error parsing video info: {e}")
-        return None
+    """Get video information (width, height, duration, fps, alpha) via the shared probe cache"""
+    info = video_probe.probe(input_path)
+    if info is None:
+        print(f"❌ Error reading video info: {input_path}")
+    return info
+
+def run_encode(cmd, duration, input_path, output_path, variant, **fields):
+    """Run one ffmpeg encode with live progress and record it in the run report.
 
-def generate_video_with_background(input_path, output_path, bg_color, description):
-    """Generate a video with solid background using FFmpeg"""
+    Extra fields (e.g. the CRF used) are stored on the report entry. Raises
+    subprocess.CalledProcessError (with stderr) on failure, like
+    subprocess.run(..., check=True).
+    """
+    stats = ffmpeg_progress.run_ffmpeg(cmd, duration, output_path.name, PROGRESS)
+    REPORT.add(stats, input=str(input_path), output=str(output_path), variant=variant, **fields)
+    if stats['returncode'] != 0:
+        raise subprocess.CalledProcessError(stats['returncode'], cmd, stderr=stats['stderr'])
+    return stats
+
+def run_passes(build_cmd, passes, output, duration, input_path, output_path, variant, **fields):
+    """Run a (possibly multi-pass) encode through run_encode; returns the combined stats.
+
+    build_cmd(pass options, output options) returns the ffmpeg command for
+    one pass. First passes write only their pass log (in a temporary
+    folder); the last pass writes output.
+    """
+    if passes == 1:
+        return run_encode(build_cmd([], output), duration, input_path, output_path, variant, **fields)
+    wall_seconds = 0.0
+    with tempfile.TemporaryDirectory(prefix="vp9-passlog-") as passdir:
+        logfile = Path(passdir) / "pass"
+        for n in range(1, passes + 1):
+            last = n == passes
+            stats = run_encode(build_cmd(encode_profiles.pass_args(n, logfile),
+                                         output if last else encode_profiles.FIRST_PASS_OUTPUT),
+                               duration, input_path, output_path, f"{variant} (pass {n}/{passes})", **fields)
+            wall_seconds += stats['wall_seconds']
+    return {**stats, 'wall_seconds': wall_seconds}
+
+def describe_run(stats):
+    """'4.2s, 1.4x realtime, 812KB' for an encode's stats"""
+    text = f"{stats['wall_seconds']:.1f}s"
+    if stats.get('speed'):
+        text += f", {stats['speed']:.2f}x realtime"
+    return text + f", {stats['size_bytes'] // 1024}KB"
+
+def search_crf(source, encode, quality_floor, input_args, filter_args, duration, encoder_args, encoder, suffix):
+    """Pick the smallest CRF meeting quality_floor on sample segments (cached across runs)"""
+    crf, info = video_quality.choose_setting(
+        source, encode, quality_floor, input_args, filter_args, duration,
+        encoder_args, video_quality.crf_candidates(encoder), suffix,
+    )
+    scores = info['scores']
+    measured = ", ".join(f"{key.upper()} {scores[key]:.4g}" for key in ('ssim', 'psnr') if scores.get(key) is not None)
+    origin = "cached" if info['cached'] else "searched"
+    warning = "" if info['met_floor'] else " ⚠️ floor not reached, using best quality tried"
+    print(f"   🎯 CRF {crf} ({origin}; {measured}){warning}")
+    return crf
+
+def generate_video_with_background(input_path, output_path, bg_color, description, quality_floor=None, crop=None):
+    """Generate a video with solid background using FFmpeg.
+
+    With a quality_floor ({'ssim': x} and/or {'psnr': y}) the VP9 CRF is
+    searched per output instead of using VP9_CRF. With a crop (a video_crop
+    box) only that part of the frame is composited and encoded.
+    """
     
     if not input_path.exists():
         print(f"❌ Input video not found: {input_path}")
@@ -126,8 +195,8 @@ def generate_video_with_background(input_path, output_path, bg_color, descriptio
         print(f"❌ Could not get video information for {input_path}")
         return False
     
-    width = video_info['width']
-    height = video_info['height']
+    width = crop['width'] if crop else video_info['width']
+    height = crop['height'] if crop else video_info['height']
     duration = video_info['duration'] or 10.0  # Fallback to 10s if unknown
     fps = video_info['fps'] or 25.0  # Fallback to 25fps if unknown
     has_alpha = video_info['has_alpha']
@@ -138,26 +207,40 @@ def generate_video_with_background(input_path, output_path, bg_color, descriptio
     print(f"🎬 Generating: {output_path.name} ({description})")
     print(f"   Background: {bg_color} (RGB: {r},{g},{b})")
     print(f"   Properties: {width}x{height}, {duration:.1f}s, {fps:.1f}fps, Alpha: {has_alpha}")
-    
-    # Method 1: Simple and reliable - create background, then overlay transparent video
-    cmd_simple = [
-        "ffmpeg",
+    if crop:
+        print(f"   Crop: {video_crop.describe_crop(crop)}")
+
+    input_args = [
         "-f", "lavfi", "-i", f"color=c={bg_color}:size={width}x{height}:duration={duration}:rate={fps}",
+        *video_probe.decoder_args(video_info),
         "-i", str(input_path),
-        "-filter_complex", "[0:v][1:v]overlay",
-        "-c:v", "libvpx-vp9",
-        "-crf", "30",
-        "-b:v", "0",
-        "-pix_fmt", "yuv420p",
-        "-an",
-        "-shortest",
-        "-y",
-        str(output_path)
     ]
+    filter_args = ["-filter_complex", f"[1:v]{video_crop.crop_filter(crop)}[fg];[0:v][fg]overlay" if crop
+                   else "[0:v][1:v]overlay"]
+    crf = VP9_CRF
+    if quality_floor:
+        crf = search_crf(input_path, {'background': bg_color, 'args': vp9_args('CRF', width), 'crop': crop},
+                         quality_floor, input_args, filter_args, duration, lambda value: vp9_args(value, width),
+                         'libvpx-vp9', '.webm')
+
+    # Method 1: Simple and reliable - create background, then overlay transparent video
+    def cmd_simple(pass_opts, output):
+        return [
+            "ffmpeg",
+            *input_args,
+            *filter_args,
+            *vp9_args(crf, width),
+            *pass_opts,
+            "-an",
+            "-shortest",
+            "-y",
+            *output,
+        ]
     
     try:
-        result = subprocess.run(cmd_simple, capture_output=True, text=True, check=True)
-        print(f"✓ Generated with simple overlay: {output_path}")
+        stats = run_passes(cmd_simple, vp9_passes(), [str(output_path)], duration, input_path, output_path,
+                           description, crf=crf)
+        print(f"✓ Generated with simple overlay: {output_path} ({describe_run(stats)})")
         return True
     except subprocess.CalledProcessError as e:
         print(f"⚠️  Simple overlay failed, trying alternative method...")
@@ -166,22 +249,21 @@ def generate_video_with_background(input_path, output_path, bg_color, descriptio
         # Method 2: Force alpha channel handling
         cmd_alpha = [
             "ffmpeg",
+            *video_probe.decoder_args(video_info),
             "-i", str(input_path),
-            "-vf", f"format=rgba,colorkey=0x000000:0.1:0.1,format=yuva420p",
+            "-vf", ",".join(filter(None, [video_crop.crop_filter(crop),
+                                          "format=rgba,colorkey=0x000000:0.1:0.1,format=yuva420p"])),
             "-f", "lavfi", "-i", f"color=c={bg_color}:size={width}x{height}:duration={duration}:rate={fps}",
             "-filter_complex", "[1:v][0:v]overlay",
-            "-c:v", "libvpx-vp9",
-            "-crf", "30",
-            "-b:v", "0", 
-            "-pix_fmt", "yuv420p",
+            *vp9_args(crf, width),
             "-an",
             "-y",
             str(output_path)
         ]
         
         try:
-            result = subprocess.run(cmd_alpha, capture_output=True, text=True, check=True)
-            print(f"✓ Generated with alpha handling: {output_path}")
+            stats = run_encode(cmd_alpha, duration, input_path, output_path, f"{description} (alpha fallback)", crf=crf)
+            print(f"✓ Generated with alpha handling: {output_path} ({describe_run(stats)})")
             return True
         except subprocess.CalledProcessError as e2:
             print(f"❌ Both methods failed for {output_path}")
@@ -189,42 +271,167 @@ def generate_video_with_background(input_path, output_path, bg_color, descriptio
             print(f"   Alpha error: {e2.stderr[-200:]}")
             return False
 
-def create_mp4_version(webm_path):
+def create_mp4_version(webm_path, duration=None, quality_floor=None):
     """Create MP4 version from WebM for legacy browser compatibility"""
     mp4_path = webm_path.with_suffix('.mp4')
-    
+
+    print(f"📱 Creating MP4 version: {mp4_path.name}")
+
+    crf = MP4_CRF
+    if quality_floor:
+        crf = search_crf(webm_path, {'args': mp4_args('CRF')}, quality_floor,
+                         ["-i", str(webm_path)], [], duration, mp4_args, 'libx264', '.mp4')
+
     cmd = [
         "ffmpeg",
         "-i", str(webm_path),
-        "-c:v", "libx264",                              # H.264 codec for MP4
-        "-preset", "medium",                            # Encoding speed/quality
-        "-crf", "25",                                   # Good quality with smaller size
-        "-pix_fmt", "yuv420p",                         # Universal compatibility
+        *mp4_args(crf),
         "-an",                                          # Remove audio (since originals have none)
-        "-movflags", "+faststart",                      # Web optimization
         "-y",                                           # Overwrite
         str(mp4_path)
     ]
-    
-    print(f"📱 Creating MP4 version: {mp4_path.name}")
-    
+
     try:
-        subprocess.run(cmd, capture_output=True, check=True)
-        print(f"✓ MP4 created: {mp4_path}")
+        stats = run_encode(cmd, duration, webm_path, mp4_path, "MP4 fallback", crf=crf)
+        print(f"✓ MP4 created: {mp4_path} ({describe_run(stats)})")
         return True
     except subprocess.CalledProcessError as e:
         print(f"❌ Failed to create MP4 version: {e}")
         return False
 
+def background_source(bg_color, video_info, crop=None):
+    """lavfi colour source matching the video's (or crop's) size, rate and length"""
+    width, height = (crop['width'], crop['height']) if crop else (video_info['width'], video_info['height'])
+    duration = video_info['duration'] or 10.0  # Fallback to 10s if unknown
+    fps = video_info['fps'] or 25.0  # Fallback to 25fps if unknown
+    return f"color=c={bg_color}:size={width}x{height}:duration={duration}:rate={fps}"
+
+def generate_source_variants(input_path, outputs, output_dir, quality_floor=None, crop=None):
+    """Generate every background variant of one source, WebM and MP4, in one ffmpeg process.
+
+    The source is decoded once (and cropped, given a video_crop box) and
+    split to one overlay per background colour; each composited stream is
+    split again and encoded straight to VP9 (WebM) and H.264 (MP4), so the
+    MP4 is no longer a second-generation re-encode of the lossy WebM.
+    Returns the number of variants written.
+    """
+    if not input_path.exists():
+        print(f"❌ Input video not found: {input_path}")
+        return 0
+
+    video_info = get_video_info(input_path)
+    if not video_info:
+        print(f"❌ Could not get video information for {input_path}")
+        return 0
+
+    duration = video_info['duration'] or 10.0
+    input_args = [*video_probe.decoder_args(video_info), "-i", str(input_path)]
+    print(f"🎬 Single-decode graph: {len(outputs)} background(s) x WebM/MP4")
+    print(f"   Properties: {video_info['width']}x{video_info['height']}, {duration:.1f}s, "
+          f"{video_info['fps'] or 25.0:.1f}fps, Alpha: {video_info['has_alpha']}")
+    if crop:
+        print(f"   Crop: {video_crop.describe_crop(crop)}")
+
+    source = f"[0:v]{video_crop.crop_filter(crop)}," if crop else "[0:v]"
+    width = crop['width'] if crop else video_info['width']
+    backgrounds = []
+    crfs = []
+    for i, (output_name, bg_color, description) in enumerate(outputs):
+        background = background_source(bg_color, video_info, crop)
+        webm_path = output_dir / output_name
+        mp4_path = webm_path.with_suffix('.mp4')
+        print(f"   • {output_name} + .mp4 ({description}, {bg_color})")
+
+        vp9_crf, mp4_crf = VP9_CRF, MP4_CRF
+        if quality_floor:
+            # Both codecs are scored against the same composited frames
+            reference_graph = ["-filter_complex", f"{background}[bg];{source}null[fg];[bg][fg]overlay=shortest=1"]
+            vp9_crf = search_crf(input_path, {'background': bg_color, 'args': vp9_args('CRF', width), 'crop': crop},
+                                 quality_floor, input_args, reference_graph, duration,
+                                 lambda value: vp9_args(value, width), 'libvpx-vp9', '.webm')
+            mp4_crf = search_crf(input_path, {'background': bg_color, 'args': mp4_args('CRF'), 'crop': crop},
+                                 quality_floor, input_args, reference_graph, duration, mp4_args, 'libx264', '.mp4')
+        crfs.append({'webm': vp9_crf, 'mp4': mp4_crf})
+        backgrounds.append(background)
+
+    def build_cmd(pass_opts, output):
+        """One pass over every variant. First passes (output is the null muxer) only
+        encode VP9; the MP4 streams are still mapped, to null, so the output
+        stream numbering that names ffmpeg's pass logs is the same in every pass."""
+        first_pass = output == encode_profiles.FIRST_PASS_OUTPUT
+        graph = [f"{source}split={len(outputs)}" + "".join(f"[src{i}]" for i in range(len(outputs)))]
+        output_args = []
+        for i, (output_name, _, _) in enumerate(outputs):
+            webm_path = output_dir / output_name
+            graph.append(f"{backgrounds[i]}[bg{i}];[bg{i}][src{i}]overlay=shortest=1,split=2[webm{i}][mp4{i}]")
+            vp9_pass = pass_opts and [*pass_opts[:-1], f"{pass_opts[-1]}-{i}"]  # One pass log per output
+            output_args += ["-map", f"[webm{i}]", *vp9_args(crfs[i]['webm'], width), *vp9_pass, "-an",
+                            *(output if first_pass else [str(webm_path)])]
+            output_args += ["-map", f"[mp4{i}]", "-an"]
+            output_args += output if first_pass else [*mp4_args(crfs[i]['mp4']), str(webm_path.with_suffix('.mp4'))]
+        return ["ffmpeg", "-y", *input_args, "-filter_complex", ";".join(graph), *output_args]
+
+    try:
+        stats = run_passes(build_cmd, vp9_passes(), [], duration, input_path,
+                           output_dir / f"{input_path.stem} (all variants)",
+                           f"{len(outputs)} background(s), WebM + MP4", crf=crfs)
+    except subprocess.CalledProcessError as e:
+        print(f"❌ Single-decode graph failed: {e.stderr[-300:]}")
+        return 0
+    print(f"✓ Generated {len(outputs) * 2} files from one filter graph ({describe_run(stats)})")
+    return len(outputs)
+
+def generate_source_per_variant(input_path, outputs, output_dir, quality_floor=None, crop=None):
+    """The per-variant path: one overlay encode per background, then an MP4 from each WebM.
+
+    Decodes the source once per background and each WebM once more. Used
+    as the fallback when the single-decode graph fails, and by --compare.
+    Returns the number of variants written.
+    """
+    successful = 0
+    for output_name, bg_color, description in outputs:
+        output_path = output_dir / output_name
+        if generate_video_with_background(input_path, output_path, bg_color, description, quality_floor, crop):
+            successful += 1
+
+            # Also create MP4 version
+            if output_path.suffix == '.webm':
+                create_mp4_version(output_path, (get_video_info(input_path) or {}).get('duration'), quality_floor)
+    return successful
+
 def main():
     """Main function to process all videos"""
-    
+    parser = argparse.ArgumentParser(description="Generate solid-background video variants for iOS")
+    parser.add_argument("--report", metavar="PATH", help="Write a JSON run report (per-encode wall time, fps, speed, size)")
+    parser.add_argument("--target-ssim", type=float, metavar="SSIM",
+                        help="Search each output's CRF for the smallest file whose samples reach this SSIM (e.g. 0.98)")
+    parser.add_argument("--min-psnr", type=float, metavar="DB",
+                        help="Search each output's CRF for the smallest file whose samples reach this PSNR")
+    parser.add_argument("--compare", action="store_true",
+                        help="Also time the per-variant path (into a temporary folder) and report the time saved")
+    parser.add_argument("--profile", default=encode_profiles.DEFAULT_PROFILE, choices=encode_profiles.PROFILES,
+                        help=f"Encode profile for speed, threading and passes (default: {encode_profiles.DEFAULT_PROFILE})")
+    parser.add_argument("--crop", action="store_true",
+                        help="Encode only the area that is ever visible (plus --crop-margin) and write the offsets "
+                             f"to {video_crop.OFFSETS_NAME}")
+    parser.add_argument("--crop-margin", type=int, default=video_crop.CROP_MARGIN,
+                        help=f"Pixels kept around the visible area with --crop (default: {video_crop.CROP_MARGIN})")
+    args = parser.parse_args()
+    global PROFILE
+    PROFILE = args.profile
+    quality_floor = None
+    if args.target_ssim is not None or args.min_psnr is not None:
+        quality_floor = {'ssim': args.target_ssim, 'psnr': args.min_psnr}
+
     print("🎥 iOS Video Background Generator")
     print("=" * 50)
     
     # Check dependencies
     if not check_ffmpeg():
         sys.exit(1)
+    if args.crop and video_crop.np is None:
+        print("❌ NumPy not found (needed for --crop). Install with: pip install numpy")
+        sys.exit(1)
     
     # Verify input directory
     if not INPUT_DIR.exists():
@@ -239,33 +446,72 @@ def main():
     processed = 0
     successful = 0
     
+    if quality_floor:
+        print(f"🎯 Quality floor: {video_quality.describe_floor(quality_floor)} "
+              f"({video_quality.SAMPLE_COUNT} x {video_quality.SAMPLE_SECONDS:g}s samples per clip)")
+    print(f"⚙️  Encode profile: {PROFILE} (VP9 {vp9_passes()} pass{'es' if vp9_passes() > 1 else ''})")
     print(f"\n📊 Processing {total_videos} video variants...")
     print("-" * 50)
+
+    # Probe each source once up front; every variant reuses the cached result
+    video_probe.probe_many(INPUT_DIR / source_name for source_name in VIDEOS_CONFIG)
     
+    timings = []
+    crops = {}
+
     # Process each source video
     for source_name, outputs in VIDEOS_CONFIG.items():
         input_path = INPUT_DIR / source_name
         
         print(f"\n🎯 Source: {source_name}")
-        
-        # Generate each output variant
-        for output_name, bg_color, description in outputs:
-            output_path = OUTPUT_DIR / output_name
-            
-            processed += 1
-            
-            if generate_video_with_background(input_path, output_path, bg_color, description):
-                successful += 1
-                
-                # Also create MP4 version
-                if output_path.suffix == '.webm':
-                    create_mp4_version(output_path)
+        processed += len(outputs)
+
+        crop = None
+        if args.crop:
+            try:
+                crop = video_crop.find_crop(input_path, args.crop_margin)
+            except subprocess.CalledProcessError as e:
+                print(f"⚠️  Crop analysis failed, using the full frame: {e.stderr[-200:]}")
+
+        start = time.perf_counter()
+        done = generate_source_variants(input_path, outputs, OUTPUT_DIR, quality_floor, crop)
+        single_seconds = time.perf_counter() - start
+        if done < len(outputs):
+            print("⚠️  Falling back to per-variant encodes...")
+            done = generate_source_per_variant(input_path, outputs, OUTPUT_DIR, quality_floor, crop)
+        successful += done
+        if done:
+            for output_name, _, _ in outputs:
+                crops[output_name] = crops[str(Path(output_name).with_suffix('.mp4'))] = crop
+
+        if args.compare and done:
+            print("⏱️  Timing the per-variant path for comparison...")
+            with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                generate_source_per_variant(input_path, outputs, Path(tmp), quality_floor, crop)
+                per_variant_seconds = time.perf_counter() - start
+            timings.append((source_name, single_seconds, per_variant_seconds))
+            print(f"   Single decode {single_seconds:.1f}s vs per-variant {per_variant_seconds:.1f}s")
     
+    video_probe.save_cache()
+    offsets = video_crop.write_offsets(OUTPUT_DIR, crops)
+    if offsets and args.crop:
+        print(f"\n✂️  Crop offsets written to {offsets}")
+    if args.report:
+        REPORT.write(args.report)
+        print(f"\n📁 Run report written to {args.report}")
+
     # Summary
     print("\n" + "=" * 50)
     print(f"🏁 Processing Complete!")
     print(f"   Processed: {processed}/{total_videos}")
     print(f"   Successful: {successful}/{total_videos}")
+    if timings:
+        single = sum(t[1] for t in timings)
+        per_variant = sum(t[2] for t in timings)
+        saved = (1 - single / per_variant) * 100 if per_variant else 0
+        print(f"   ⏱️  Single decode: {single:.1f}s vs per-variant: {per_variant:.1f}s "
+              f"({per_variant - single:.1f}s / {saved:.0f}% saved)")
     
     if successful == total_videos:
         print("✅ All videos generated successfully!")
@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+"""
+Audio Optimizer
+Transcodes the binaural demo's WAV library to Opus/WebM with an AAC/M4A
+fallback, written next to each WAV, and points the page at them.
+
+The demo is about spatial cues, so both encoders run with their joint
+stereo tools off: libopus without intensity-stereo phase inversion, and
+the AAC encoder without M/S, intensity stereo and noise substitution. Each
+output keeps the source's channel count and layout, and is checked after
+encoding: the level difference between the channels (ILD, from ffmpeg's
+astats) must stay within ILD_TOLERANCE_DB of the source's. Opus also
+falls back to intensity stereo on its own below about 134 kb/s per stereo
+pair, so stereo bitrates under OPUS_STEREO_MIN_BITRATE are raised to it.
+
+Encodes run in parallel (one ffmpeg per output) and are incremental: a
+.audio-manifest.json in each folder records the source hash and settings
+behind every output, so only changed WAVs are re-encoded.
+
+Once every WAV has both outputs, <source src="....wav" type="audio/wav">
+elements in AUDIO_DOCUMENTS (the page and the script that builds the
+comparison grid) become a WebM/Opus source followed by an M4A/AAC one.
+Template-built URLs are only switched for WAVs that were converted; the
+grid's 'rotating' files are not in the tree, so they keep their WAV URLs.
+
+Requirements:
+- Python 3.6+
+- FFmpeg/FFprobe in PATH (with libopus and aac)
+
+Usage:
+    python3 optimize-audio.py
+    python3 optimize-audio.py --bitrate 256k -j 4
+    python3 optimize-audio.py --no-references --overwrite
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from urllib.parse import unquote
+
+DEFAULT_IN = "assets/binaural-externalization/audio"
+DEFAULT_BITRATE = "192k"
+AUDIO_EXTS = {".wav"}
+MANIFEST_NAME = ".audio-manifest.json"
+
+# Documents whose <source> elements are pointed at the encoded files
+AUDIO_DOCUMENTS = [
+    "binaural-externalization/index.html",
+    "binaural-externalization/binaural.js",
+]
+
+# Output format -> (suffix, MIME type for <source type>, encoder options)
+AUDIO_FORMATS = {
+    "opus": (".webm", "audio/webm; codecs=opus", [
+        "-c:a", "libopus", "-vbr", "on", "-compression_level", "10", "-application", "audio",
+        "-apply_phase_inv", "0",
+    ]),
+    "aac": (".m4a", "audio/mp4", [
+        "-c:a", "aac", "-aac_coder", "twoloop", "-aac_ms", "0", "-aac_is", "0", "-aac_pns", "0",
+        "-movflags", "+faststart",
+    ]),
+}
+
+# libopus codes stereo bands as intensity stereo below roughly this rate
+OPUS_STEREO_MIN_BITRATE = 160_000
+# Largest allowed change in inter-channel level difference (dB)
+ILD_TOLERANCE_DB = 0.5
+
+SOURCE_RUN_RE = re.compile(
+    r'(?P<indent>[ \t]*)<source src="(?P<src>[^"]+)" type="audio/(?:wav|x-wav|mpeg)">'
+    r'(?:\s*<source src="(?P=src)" type="audio/(?:wav|x-wav|mpeg)">)*'
+)
+# A template literal ending in .wav; only its file name (after the last /) is used
+TEMPLATE_WAV_RE = re.compile(r'(?P<name>[^`/]*)\.wav(?=`)')
+TEMPLATE_EXPR_RE = re.compile(r'\$\{[^}]*\}')
+ASTATS_RMS_RE = re.compile(r"Channel: (\d+).*?RMS level dB: (-?[\d.]+|-inf)", re.DOTALL)
+
+def which(tool: str) -> str:
+    p = shutil.which(tool)
+    if not p:
+        sys.stderr.write(f"Error: {tool} not found. Install with Homebrew: brew install ffmpeg\n")
+        sys.exit(1)
+    return p
+
+def parse_bitrate(text: str) -> int:
+    """'192k' -> 192000"""
+    text = text.strip().lower()
+    scale = {"k": 1_000, "m": 1_000_000}.get(text[-1:], 1)
+    return int(float(text.rstrip("km")) * scale)
+
+def probe_audio(ffprobe: str, path: Path) -> dict:
+    """Channels, layout, sample rate and duration of the first audio stream (None if there is none)"""
+    cmd = [ffprobe, "-v", "error", "-select_streams", "a:0",
+           "-show_entries", "stream=codec_name,channels,channel_layout,sample_rate:format=duration",
+           "-of", "json", str(path)]
+    cp = subprocess.run(cmd, capture_output=True, text=True)
+    if cp.returncode != 0:
+        return None
+    data = json.loads(cp.stdout or "{}")
+    if not data.get("streams"):
+        return None
+    stream = data["streams"][0]
+    return {
+        "codec": stream.get("codec_name"),
+        "channels": stream.get("channels"),
+        "channel_layout": stream.get("channel_layout"),
+        "sample_rate": int(stream.get("sample_rate") or 0),
+        "duration": float(data.get("format", {}).get("duration") or 0),
+    }
+
+def channel_rms(ffmpeg: str, path: Path) -> list:
+    """RMS level (dB) of each channel over the whole file"""
+    cmd = [ffmpeg, "-hide_banner", "-nostats", "-i", str(path),
+           "-af", "astats=measure_overall=none:measure_perchannel=RMS_level", "-f", "null", "-"]
+    cp = subprocess.run(cmd, capture_output=True, text=True, check=True)
+    levels = {}
+    for channel, level in ASTATS_RMS_RE.findall(cp.stderr):
+        levels[int(channel)] = float("-inf") if level == "-inf" else float(level)
+    return [levels[c] for c in sorted(levels)]
+
+def channel_differences(levels: list) -> list:
+    """Level of every channel relative to the first (ILD for a stereo pair)"""
+    return [level - levels[0] for level in levels[1:]]
+
+def encoder_bitrate(fmt: str, info: dict, bitrate: str) -> str:
+    if fmt == "opus" and info["channels"] >= 2 and parse_bitrate(bitrate) < OPUS_STEREO_MIN_BITRATE:
+        return f"{OPUS_STEREO_MIN_BITRATE // 1000}k"
+    return bitrate
+
+def encode_params(fmt: str, info: dict, bitrate: str) -> dict:
+    """Everything that decides an output's bytes, for the manifest"""
+    suffix, _, options = AUDIO_FORMATS[fmt]
+    return {
+        "format": fmt,
+        "bitrate": encoder_bitrate(fmt, info, bitrate),
+        "options": options,
+        "channels": info["channels"],
+        "channel_layout": info["channel_layout"],
+    }
+
+def file_digest(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def file_stamp(path: Path) -> dict:
+    st = path.stat()
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+class AudioManifest:
+    """Record (in each source folder) of the source hash and parameters behind each output"""
+
+    def __init__(self, directory: Path):
+        self.path = directory / MANIFEST_NAME
+        self.entries = {}
+        if self.path.exists():
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self.entries = json.load(f).get("entries", {})
+            except (OSError, ValueError) as e:
+                print(f"Ignoring unreadable manifest {self.path}: {e}")
+
+    def save(self) -> None:
+        if not self.entries and not self.path.exists():
+            return
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "entries": self.entries}, f, indent=2, sort_keys=True)
+            f.write("\n")
+
+    def stale_reason(self, src: Path, dst: Path, params: dict):
+        """Why dst must be (re)built, or None if it is up to date"""
+        entry = self.entries.get(dst.name)
+        if not dst.exists():
+            return "new output" if entry is None else "output missing"
+        if entry is None:
+            return "no manifest entry for existing output"
+        if entry.get("output") != file_stamp(dst):
+            return "output modified since it was encoded"
+        source = entry["source"]
+        if {k: source.get(k) for k in ("size", "mtime_ns")} != file_stamp(src):
+            if source.get("sha256") != file_digest(src):
+                return "source changed"
+            source.update(file_stamp(src))  # Touched but identical: avoid re-hashing next run
+        if entry.get("params") != params:
+            changed = sorted(k for k in set(params) | set(entry.get("params", {}))
+                             if params.get(k) != entry["params"].get(k))
+            return "parameters changed: " + ", ".join(changed)
+        return None
+
+    def record(self, src: Path, dst: Path, params: dict) -> None:
+        self.entries[dst.name] = {
+            "source": {"name": src.name, "sha256": file_digest(src), **file_stamp(src)},
+            "params": params,
+            "output": file_stamp(dst),
+        }
+
+def encode_job(ffmpeg: str, ffprobe: str, src: Path, dst: Path, info: dict, params: dict, threads: int):
+    """Encode one output and check its channels survived; returns (ok, log lines)"""
+    tmp = dst.with_name(f".{dst.stem}.tmp{dst.suffix}")
+    cmd = [ffmpeg, "-hide_banner", "-loglevel", "error", "-y", "-threads", str(threads), "-i", str(src),
+           "-map", "0:a:0", "-map_metadata", "-1", "-fflags", "+bitexact", "-vn",
+           *params["options"], "-b:a", params["bitrate"], str(tmp)]
+    lines = [f"Encoding: <{src.name}> -> {dst.suffix} ({params['format']}, {params['bitrate']})"]
+    cp = subprocess.run(cmd, capture_output=True, text=True)
+    if cp.returncode != 0:
+        tmp.unlink(missing_ok=True)
+        lines.append(f"FAILED (ffmpeg exit {cp.returncode}): {cp.stderr.strip()[-300:]}")
+        return False, lines
+
+    out = probe_audio(ffprobe, tmp)
+    if not out or out["channels"] != info["channels"]:
+        tmp.unlink(missing_ok=True)
+        lines.append(f"FAILED: channel count changed ({info['channels']} -> {out and out['channels']})")
+        return False, lines
+    if info["channels"] >= 2:
+        before = channel_differences(channel_rms(ffmpeg, src))
+        after = channel_differences(channel_rms(ffmpeg, tmp))
+        drift = max((abs(a - b) for a, b in zip(before, after) if abs(a) != float("inf")), default=0.0)
+        if drift > ILD_TOLERANCE_DB:
+            tmp.unlink(missing_ok=True)
+            lines.append(f"FAILED: inter-channel level changed by {drift:.2f} dB (limit {ILD_TOLERANCE_DB} dB)")
+            return False, lines
+        lines[-1] += f", ILD drift {drift:.2f} dB"
+    os.replace(tmp, dst)
+    size = dst.stat().st_size
+    lines.append(f"OK: {dst.name} ({size // 1024}KB, {size / src.stat().st_size:.1%} of the WAV)")
+    return True, lines
+
+def source_markup(indent: str, src: str) -> str:
+    """WebM/Opus then M4A/AAC <source> elements for one WAV URL (or ${...} template)"""
+    base = src[:-len(".wav")] if src.lower().endswith(".wav") else src
+    return "\n".join(f'{indent}<source src="{base}{suffix}" type="{mime}">'
+                     for suffix, mime, _ in AUDIO_FORMATS.values())
+
+def template_converted(name: str, converted_names: set) -> bool:
+    """Whether a template literal's file name (${...} matching anything) names a converted WAV"""
+    pattern = re.compile(".+".join(re.escape(part) for part in TEMPLATE_EXPR_RE.split(name)) + r"\.wav")
+    return any(pattern.fullmatch(converted_name) for converted_name in converted_names)
+
+def update_references(documents: list, converted: set, templates: bool) -> int:
+    """Point WAV <source> elements at the encoded files; returns the number of documents changed.
+
+    Literal URLs are rewritten when that WAV has both outputs. Template
+    sources (src="${url}") are rewritten only when templates is True (every
+    WAV was converted), and the .wav is dropped only from the template
+    literals that name a converted WAV. If any .wav literal is left (its
+    WAV is not in the tree), the template's WAV sources stay as the last
+    fallback, so those URLs still resolve as before.
+    """
+    converted_names = {path.name for path in converted}
+    last_suffix, last_mime, _ = list(AUDIO_FORMATS.values())[-1]
+    changed = 0
+    for document in documents:
+        path = Path(document)
+        if not path.exists():
+            continue
+        content = path.read_text(encoding="utf-8")
+        document_dir = path.parent
+
+        literals = list(TEMPLATE_WAV_RE.finditer(content))
+        kept_wav = any(not template_converted(match.group("name"), converted_names) for match in literals)
+
+        def rewrite(match):
+            src = match.group("src")
+            if "${" in src:
+                if not templates:
+                    return match.group(0)
+                # Already rewritten: the WAV sources kept as a fallback after ours
+                if content[:match.start()].rstrip().endswith(f'<source src="{src}{last_suffix}" type="{last_mime}">'):
+                    return match.group(0)
+                markup = source_markup(match.group("indent"), src)
+                return f"{markup}\n{match.group(0)}" if kept_wav else markup
+            target = (document_dir / unquote(src)).resolve()
+            if target not in converted:
+                return match.group(0)
+            return source_markup(match.group("indent"), src)
+
+        updated = SOURCE_RUN_RE.sub(rewrite, content)
+        if templates and literals:
+            updated = TEMPLATE_WAV_RE.sub(
+                lambda m: m.group("name") if template_converted(m.group("name"), converted_names) else m.group(0),
+                updated)
+        if updated != content:
+            path.write_text(updated, encoding="utf-8")
+            print(f"Updated references: {document}")
+            changed += 1
+    return changed
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(description="Transcode WAVs to Opus/WebM and AAC/M4A next to each source, "
+                                                 "keeping the stereo image intact.")
+    parser.add_argument("-i", "--input", default=DEFAULT_IN, help=f"Folder of WAVs, searched recursively (default: {DEFAULT_IN})")
+    parser.add_argument("--bitrate", default=DEFAULT_BITRATE,
+                        help=f"Audio bitrate for both formats (default: {DEFAULT_BITRATE}; stereo Opus is never "
+                             f"below {OPUS_STEREO_MIN_BITRATE // 1000}k)")
+    parser.add_argument("--format", action="append", choices=list(AUDIO_FORMATS),
+                        help="Output format (repeatable; default: all)")
+    parser.add_argument("--overwrite", action="store_true", help="Re-encode every output, even if the manifest says it is up to date")
+    parser.add_argument("--no-references", action="store_true", help=f"Do not rewrite {', '.join(AUDIO_DOCUMENTS)}")
+    parser.add_argument("-j", "--jobs", type=int, default=0, help="Number of encodes to run at once (0 = all CPU cores, default: 0)")
+    args = parser.parse_args(argv)
+    if args.jobs < 0:
+        parser.error("--jobs must be >= 0")
+    try:
+        parse_bitrate(args.bitrate)
+    except ValueError:
+        parser.error(f"invalid --bitrate: {args.bitrate}")
+    formats = args.format or list(AUDIO_FORMATS)
+
+    in_dir = Path(args.input).expanduser().resolve()
+    if not in_dir.is_dir():
+        sys.stderr.write(f"Error: input directory not found: {in_dir}\n")
+        sys.exit(1)
+    ffmpeg = which("ffmpeg")
+    ffprobe = which("ffprobe")
+    workers = args.jobs or os.cpu_count() or 1
+
+    sources = sorted((p for p in in_dir.rglob("*") if p.is_file() and p.suffix.lower() in AUDIO_EXTS),
+                     key=lambda p: str(p).lower())
+    print(f"Input dir:  {in_dir}")
+    print(f"Formats:    {', '.join(f'{fmt} ({AUDIO_FORMATS[fmt][0]})' for fmt in formats)}")
+    print(f"Bitrate:    {args.bitrate}")
+    print(f"Jobs:       {workers}")
+    print()
+    if not sources:
+        print("No WAV files found. Nothing to do.")
+        return
+
+    manifests = {}
+    pending = []
+    skipped = failed = done = 0
+    for src in sources:
+        info = probe_audio(ffprobe, src)
+        if info is None:
+            print(f"Not a readable audio file: <{src.name}>")
+            failed += len(formats)
+            continue
+        manifest = manifests.setdefault(src.parent, AudioManifest(src.parent))
+        for fmt in formats:
+            dst = src.with_suffix(AUDIO_FORMATS[fmt][0])
+            params = encode_params(fmt, info, args.bitrate)
+            reason = "--overwrite" if args.overwrite else manifest.stale_reason(src, dst, params)
+            if reason is None:
+                skipped += 1
+                continue
+            print(f"Queued: {dst.name} ({reason})")
+            pending.append((src, dst, info, params))
+    if skipped:
+        print(f"Up to date: {skipped} output(s)")
+
+    # Cores are divided between the running encodes; each job's lines print as one block
+    threads = 0 if workers == 1 else max(1, (os.cpu_count() or 1) // workers)
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(pending) or 1))) as executor:
+            futures = {executor.submit(encode_job, ffmpeg, ffprobe, src, dst, info, params, threads): (src, dst, params)
+                       for src, dst, info, params in pending}
+            for future in as_completed(futures):
+                src, dst, params = futures[future]
+                try:
+                    ok, lines = future.result()
+                except subprocess.CalledProcessError as e:
+                    ok, lines = False, [f"FAILED: <{src.name}> level check: {(e.stderr or '').strip()[-200:]}"]
+                print("\n".join(lines), flush=True)
+                if ok:
+                    manifests[src.parent].record(src, dst, params)
+                    done += 1
+                else:
+                    failed += 1
+    finally:
+        for manifest in manifests.values():
+            manifest.save()
+
+    if not args.no_references:
+        converted = {src.resolve() for src in sources
+                     if all(src.with_suffix(AUDIO_FORMATS[fmt][0]).exists() for fmt in AUDIO_FORMATS)}
+        update_references(AUDIO_DOCUMENTS, converted, templates=not failed and len(converted) == len(sources))
+
+    print()
+    print("Done.")
+    print(f"Encoded: {done}")
+    print(f"Skipped: {skipped}")
+    print(f"Failed:  {failed}")
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
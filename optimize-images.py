@@ -5,26 +5,61 @@ Optimizes carousel images and profile photo for modern web viewing.
 
 Features:
 - Resizes images to appropriate web dimensions
-- Creates WebP versions with JPEG fallbacks
+- Creates AVIF and WebP versions with JPEG fallbacks
+- Optional per-image quality search against an SSIM target or byte budget
+- Generates a srcset width ladder and <picture> markup
+- Inlines a tiny blurred placeholder so images show their colours on first paint
 - Maintains quality while reducing file sizes
 - Updates HTML references automatically
+- Skips unchanged images using a content-hash build manifest
+- Optionally minifies SVG icons and recompresses PNG icons in place (--icons)
 
 Requirements:
 - Python 3.6+
 - Pillow (pip install Pillow)
 - (Optional) cwebp for WebP conversion
+- (Optional) pillow-avif-plugin for AVIF on Pillow < 11.2
+- (Optional) NumPy for --target-ssim
 
 Usage:
     python3 optimize-images.py
+    python3 optimize-images.py --jobs 8    # encode carousel images in parallel
+    python3 optimize-images.py --force     # ignore the incremental build manifest
+    python3 optimize-images.py --icons     # also optimize the committed icons in place
+    python3 optimize-images.py --target-ssim 0.985   # smallest files that still look the same
 """
 
 import os
+import io
 import sys
+import json
+import hashlib
 import argparse
+import base64
+import contextlib
+import functools
+import math
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from PIL import Image, ImageOps
+from urllib.parse import quote
+import xml.etree.ElementTree as ET
+import PIL
+from PIL import Image, ImageChops, ImageOps, ImageStat
 import shutil
 import re
+import posixpath
+
+from asset_references import SITE_DOCUMENTS, AssetIndex, index_documents, report_missing
+
+try:
+    import pillow_avif  # noqa: F401 - registers the AVIF codec on Pillow < 11.2
+except ImportError:
+    pass
+
+try:
+    import numpy as np  # Needed for --target-ssim; gamma-correct placeholders otherwise
+except ImportError:
+    np = None
 
 # Configuration
 CAROUSEL_INPUT_DIR = Path("assets/photos/carousel/new")
@@ -32,8 +67,31 @@ CAROUSEL_OUTPUT_DIR = Path("assets/photos/carousel_optimized/new")
 PROFILE_INPUT = Path("assets/profile.jpg")
 PROFILE_OUTPUT_DIR = Path("assets")
 PROFILE_OUTPUT_NAME = "profile_optimized"
+ICON_DIRS = [Path("assets/icons"), Path("assets/site-icons"), Path("assets/project-icons")]
 CAROUSEL_OPTIMIZATION_ENABLED = False
 PROFILE_OPTIMIZATION_ENABLED = True
+ICON_OPTIMIZATION_ENABLED = False  # Rewrites the committed icons: opt in with --icons
+
+# Reduced-resolution JPEG decode: libjpeg can scale by 1/2, 1/4 or 1/8 while
+# decoding. The draft size is kept at least this many times the target box so
+# the final LANCZOS pass still has enough pixels to work with.
+DRAFT_DECODE_MIN_RATIO = 2
+
+# Target-quality mode: per-format quality range searched for each image
+QUALITY_SEARCH_RANGE = {
+    'jpeg': (40, 95),
+    'webp': (40, 95),
+    'avif': (30, 90),
+}
+
+# Low-quality image placeholders: a tiny WebP of the resized image, inlined as
+# a data URI background so the <img> shows its colours before the file loads
+PLACEHOLDER_SIZE = 16       # Longest side in pixels
+PLACEHOLDER_QUALITY = 40
+
+# Incremental builds: one manifest per output directory records the source
+# hash and settings each output was built from.
+MANIFEST_NAME = ".image-manifest.json"
 
 # Image optimization settings - Higher quality for better visual fidelity
 CAROUSEL_SETTINGS = {
@@ -41,7 +99,10 @@ CAROUSEL_SETTINGS = {
     'max_height': 900,      # Increased from 600 for better detail
     'jpeg_quality': 90,     # Increased from 85 for better quality
     'webp_quality': 90,     # Increased from 85 for better quality
-    'png_optimize': True
+    'avif_quality': 65,     # AVIF needs far lower numbers for the same look
+    'png_optimize': True,
+    'srcset_widths': [480, 800],            # Extra sizes below max_width for srcset
+    'sizes': '(max-width: 768px) 333px, 400px',  # Carousel items are 250-300px tall
 }
 
 PROFILE_SETTINGS = {
@@ -49,7 +110,18 @@ PROFILE_SETTINGS = {
     'max_height': 1920,     # No size limit - keep original resolution  
     'jpeg_quality': 95,     # High quality for main profile image
     'webp_quality': 95,     # High quality WebP
-    'png_optimize': True
+    'avif_quality': 75,     # High quality AVIF
+    'png_optimize': True,
+    'srcset_widths': [480, 800, 1200],      # Extra sizes below max_width for srcset
+    'sizes': '(max-width: 768px) 90vw, 350px',   # .about-image img max-width
+}
+
+# Icons are optimized in place; a file is only replaced when the result is smaller.
+# PNGs are re-encoded losslessly unless png_colors allows palette quantization.
+ICON_SETTINGS = {
+    'svg_precision': 3,      # Decimal places kept in coordinates
+    'png_colors': None,      # Palette size when quantizing PNGs (lossy), None = lossless only
+    'png_min_psnr': 40.0,    # Quantized PNGs must stay at or above this PSNR (dB)
 }
 
 def setup_directories():
@@ -69,70 +141,499 @@ def get_optimal_size(image, max_width, max_height):
     new_height = int(height * ratio)
     return new_width, new_height
 
-def optimize_image(input_path, output_path, max_width, max_height, size_info, jpeg_quality=90, webp_quality=90):
-    """Optimize a single image with specified dimensions and quality settings"""
+def file_digest(path):
+    """Return the SHA-256 hex digest of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class ImageManifest:
+    """Persistent record of which sources and settings produced each output.
+
+    Entries are keyed by source path and hold the source content hash, the
+    effective settings and the hash of every output written. An output is
+    reused only when all three still match. A forced manifest never reuses
+    anything but still records, so a forced rebuild leaves it up to date.
+    """
+
+    def __init__(self, path=None, entries=None, enabled=True, force=False):
+        self.path = Path(path) if path else None
+        self.entries = entries if entries is not None else {}
+        self.enabled = enabled
+        self.force = force
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def load(cls, directory, enabled=True, force=False):
+        """Load the manifest stored in an output directory (empty if missing)"""
+        path = Path(directory) / MANIFEST_NAME
+        entries = {}
+        if enabled and path.exists():
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    entries = json.load(f).get('entries', {})
+            except (OSError, ValueError) as e:
+                print(f"⚠️  Ignoring unreadable manifest {path}: {e}")
+        return cls(path, entries, enabled, force)
+
+    def save(self):
+        """Write the manifest back next to the outputs it describes"""
+        if not self.enabled or not self.path:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump({'version': 1, 'entries': self.entries}, f, indent=2, sort_keys=True)
+            f.write('\n')
+
+    def subset(self, input_path):
+        """Return a detached manifest holding only one source's entry.
+
+        Worker processes receive a subset and hand it back for merge(), so the
+        parent process stays the only writer of the manifest file.
+        """
+        key = self.key(input_path)
+        entries = {key: self.entries[key]} if key in self.entries else {}
+        return ImageManifest(None, entries, self.enabled, self.force)
+
+    def merge(self, other):
+        """Fold entries and hit/miss counts from a worker subset back in"""
+        self.entries.update(other.entries)
+        self.hits += other.hits
+        self.misses += other.misses
+
+    @staticmethod
+    def key(input_path):
+        return Path(input_path).as_posix()
+
+    def lookup(self, input_path, source_hash, settings):
+        """Return the recorded entry if its outputs are still up to date, else None.
+
+        Output and variant paths in the returned entry are Path objects.
+        """
+        if not self.enabled:
+            return None
+        if self.force:
+            self.misses += 1
+            return None
+        entry = self.entries.get(self.key(input_path))
+        fresh = (
+            entry is not None
+            and entry.get('source_sha256') == source_hash
+            and entry.get('settings') == settings
+            and all(
+                Path(output['path']).exists() and file_digest(output['path']) == output['sha256']
+                for output in entry.get('outputs', {}).values()
+            )
+        )
+        if not fresh:
+            self.misses += 1
+            return None
+        self.hits += 1
+        output_keys = {key for key, _, _, _ in OUTPUT_FORMATS}
+        cached = dict(entry)
+        cached['outputs'] = {name: Path(output['path']) for name, output in entry['outputs'].items()}
+        cached['variants'] = [
+            {key: Path(value) if key in output_keys and value else value for key, value in variant.items()}
+            for variant in entry.get('variants', [])
+        ]
+        return cached
+
+    def record(self, input_path, source_hash, settings, outputs, **extra):
+        """Remember the outputs just written for a source.
+
+        Extra keyword arguments (JSON-serializable) are stored on the entry
+        and handed back by lookup() on a hit.
+        """
+        if not self.enabled:
+            return
+        self.entries[self.key(input_path)] = {
+            'source_sha256': source_hash,
+            'settings': settings,
+            'outputs': {
+                name: {'path': Path(path).as_posix(), 'sha256': file_digest(path)}
+                for name, path in outputs.items() if path
+            },
+            **extra,
+        }
+
+    def report(self, label):
+        if self.enabled:
+            print(f"🗂️  {label} manifest: {self.hits} up to date, {self.misses} rebuilt")
+
+def prepare_jpeg_image(img):
+    """Return an RGB copy suitable for JPEG (transparency flattened onto white)"""
+    img_for_jpeg = img
+    if img_for_jpeg.mode in ('RGBA', 'LA', 'P'):
+        background = Image.new('RGB', img_for_jpeg.size, (255, 255, 255))
+        if img_for_jpeg.mode == 'P':
+            img_for_jpeg = img_for_jpeg.convert('RGBA')
+        background.paste(
+            img_for_jpeg,
+            mask=img_for_jpeg.split()[-1] if img_for_jpeg.mode in ('RGBA', 'LA') else None,
+        )
+        img_for_jpeg = background
+
+    if img_for_jpeg.mode != 'RGB':
+        img_for_jpeg = img_for_jpeg.convert('RGB')
+    return img_for_jpeg
+
+def prepare_webp_image(img):
+    """Return a copy in a mode WebP can encode (RGB, or RGBA when transparent)"""
+    if img.mode in ('P', 'LA'):
+        return img.convert('RGBA')
+    if img.mode not in ('RGB', 'RGBA'):
+        return img.convert('RGB')
+    return img
+
+# Output formats in preference order: (key, Pillow format, suffix, label)
+OUTPUT_FORMATS = [
+    ('avif', 'AVIF', '.avif', 'AVIF'),
+    ('webp', 'WEBP', '.webp', 'WebP'),
+    ('jpeg', 'JPEG', '.jpg', 'JPEG'),
+]
+
+def avif_supported():
+    """True if Pillow can write AVIF (Pillow 11.2+ or pillow-avif-plugin)"""
+    Image.init()
+    return 'AVIF' in Image.SAVE
+
+def encode_image(img, fmt, quality):
+    """Encode an image in memory and return the bytes"""
+    buffer = io.BytesIO()
+    if fmt == 'JPEG':
+        prepare_jpeg_image(img).save(buffer, 'JPEG', quality=quality, optimize=True)
+    else:
+        prepare_webp_image(img).save(buffer, fmt, quality=quality, optimize=True)
+    return buffer.getvalue()
+
+def luma_array(img):
+    """Luma plane as float64, with transparency flattened onto white like the JPEG path"""
+    return np.asarray(prepare_jpeg_image(img).convert('L'), dtype=np.float64)
+
+def box_mean(values, window):
+    """Mean over every window x window block, via an integral image"""
+    integral = np.pad(values, ((1, 0), (1, 0))).cumsum(axis=0).cumsum(axis=1)
+    total = (
+        integral[window:, window:] - integral[:-window, window:]
+        - integral[window:, :-window] + integral[:-window, :-window]
+    )
+    return total / (window * window)
+
+def ssim(reference, candidate, window=7):
+    """Mean structural similarity of two equally sized luma arrays (1.0 = identical)"""
+    c1 = (0.01 * 255) ** 2
+    c2 = (0.03 * 255) ** 2
+    window = min(window, *reference.shape)
+
+    mu_x = box_mean(reference, window)
+    mu_y = box_mean(candidate, window)
+    var_x = box_mean(reference * reference, window) - mu_x * mu_x
+    var_y = box_mean(candidate * candidate, window) - mu_y * mu_y
+    cov_xy = box_mean(reference * candidate, window) - mu_x * mu_y
+
+    ssim_map = ((2 * mu_x * mu_y + c1) * (2 * cov_xy + c2)) / (
+        (mu_x * mu_x + mu_y * mu_y + c1) * (var_x + var_y + c2)
+    )
+    return float(ssim_map.mean())
+
+def search_quality(img, key, fmt, target, reference=None):
+    """Binary-search the quality setting for one format.
+
+    target is {'ssim': threshold} (lowest quality whose decode reaches the
+    threshold) or {'max_bytes': budget} (highest quality that fits). Every
+    probe encodes the same in-memory image. Returns (quality, data, score).
+    """
+    low, high = QUALITY_SEARCH_RANGE[key]
+    probes = {}
+
+    def probe(quality):
+        if quality not in probes:
+            data = encode_image(img, fmt, quality)
+            score = None
+            if 'ssim' in target:
+                with Image.open(io.BytesIO(data)) as decoded:
+                    score = ssim(reference, luma_array(decoded))
+            probes[quality] = (data, score)
+        return probes[quality]
+
+    if 'ssim' in target:
+        best = high  # Fall back to the top of the range if nothing reaches the threshold
+        while low <= high:
+            mid = (low + high) // 2
+            if probe(mid)[1] >= target['ssim']:
+                best, high = mid, mid - 1
+            else:
+                low = mid + 1
+    else:
+        best = low  # Fall back to the bottom of the range if nothing fits
+        while low <= high:
+            mid = (low + high) // 2
+            if len(probe(mid)[0]) <= target['max_bytes']:
+                best, low = mid, mid + 1
+            else:
+                high = mid - 1
+
+    data, score = probe(best)
+    return best, data, score
+
+def save_encoded_formats(img, output_path, input_path, size_info, original_size, qualities, target=None):
+    """Encode one already-resized image in every enabled format next to output_path.
+
+    qualities maps format keys ('jpeg', 'webp', 'avif') to a fixed quality;
+    formats mapped to None are skipped. With a target, each format's quality
+    is searched instead (see search_quality()). Returns {key: path or None}.
+    """
+    label = f"{input_path.name} {size_info}"
+    if output_path.name != input_path.stem:
+        label = f"{input_path.name} [{img.width}w] {size_info}"
+
+    reference = luma_array(img) if target and 'ssim' in target else None
+    paths = {}
+    for key, fmt, suffix, name in reversed(OUTPUT_FORMATS):
+        if qualities.get(key) is None:
+            continue
+        path = output_path.with_suffix(suffix)
+        try:
+            if target:
+                quality, data, score = search_quality(img, key, fmt, target, reference)
+                detail = f", q={quality}" + (f", SSIM {score:.4f}" if score is not None else "")
+            else:
+                data, detail = encode_image(img, fmt, qualities[key]), ""
+            path.write_bytes(data)
+        except Exception as e:
+            if key == 'jpeg':
+                raise  # The JPEG fallback is required
+            print(f"  ⚠️ {name} creation failed for {input_path.name}: {e}")
+            paths[key] = None
+            continue
+
+        reduction = (1 - len(data) / original_size) * 100
+        print(f"  {name}: {label} → {len(data)//1024}KB ({reduction:.1f}% reduction{detail})")
+        paths[key] = path
+
+    return paths
+
+def apply_draft_decode(img, max_width, max_height):
+    """Ask the JPEG decoder for a reduced-resolution (DCT-scaled) image.
+
+    Only JPEG sources support this. The requested size is the target box times
+    DRAFT_DECODE_MIN_RATIO (swapped for EXIF-rotated images), and libjpeg never
+    decodes smaller than requested, so quality is preserved. Must be called
+    before the pixel data is loaded. Returns the (before, after) sizes, or None
+    if no reduction was applied.
+    """
+    if img.format != 'JPEG':
+        return None
+
+    box_width = max_width * DRAFT_DECODE_MIN_RATIO
+    box_height = max_height * DRAFT_DECODE_MIN_RATIO
+    # Orientations 5-8 swap width and height when exif_transpose() runs
+    if img.getexif().get(0x0112) in (5, 6, 7, 8):
+        box_width, box_height = box_height, box_width
+
+    before = img.size
+    img.draft(img.mode, (box_width, box_height))
+    if img.size == before:
+        return None
+    return before, img.size
+
+def variant_path(output_path, width):
+    """Output path (without suffix) for one rung of the srcset width ladder"""
+    return output_path.with_name(f"{output_path.name}-{width}w")
+
+def area_downsample(img, size):
+    """Average each output pixel's source area in linear light.
+
+    Plain sRGB averaging (what Image.resize does) darkens high-contrast
+    detail, which is most of what a 16px placeholder is. Rows and columns are
+    assigned to output bins and summed with np.add.reduceat, so no Python
+    loop touches the pixels.
+    """
+    srgb = np.arange(256) / 255.0
+    to_linear = np.where(srgb <= 0.04045, srgb / 12.92, ((srgb + 0.055) / 1.055) ** 2.4)
+    linear = to_linear[np.asarray(img.convert('RGB'))]
+
+    (width, height), (out_width, out_height) = img.size, size
+    row_starts = np.searchsorted(np.arange(height) * out_height // height, np.arange(out_height))
+    col_starts = np.searchsorted(np.arange(width) * out_width // width, np.arange(out_width))
+    sums = np.add.reduceat(np.add.reduceat(linear, row_starts, axis=0), col_starts, axis=1)
+    counts = np.outer(np.diff(row_starts, append=height), np.diff(col_starts, append=width))
+    mean = sums / counts[:, :, None]
+
+    encoded = np.where(mean <= 0.0031308, mean * 12.92, 1.055 * mean ** (1 / 2.4) - 0.055)
+    return Image.fromarray(np.clip(np.rint(encoded * 255), 0, 255).astype(np.uint8), 'RGB')
+
+def placeholder_data_uri(img):
+    """Tiny WebP of an already-resized image as a data: URI (about 200 bytes)"""
+    scale = PLACEHOLDER_SIZE / max(img.size)
+    size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+    flat = prepare_jpeg_image(img)
+    small = area_downsample(flat, size) if np is not None else flat.resize(size, Image.Resampling.BOX)
+
+    buffer = io.BytesIO()
+    small.save(buffer, 'WEBP', quality=PLACEHOLDER_QUALITY, method=6)
+    return "data:image/webp;base64," + base64.b64encode(buffer.getvalue()).decode('ascii')
+
+def optimize_image(input_path, output_path, max_width, max_height, size_info, jpeg_quality=90, webp_quality=90,
+                   manifest=None, srcset_widths=(), draft=True, avif_quality=None, target=None):
+    """Optimize a single image with specified dimensions and quality settings.
+
+    Besides the full-size output, one smaller JPEG/WebP pair is written for
+    every width in srcset_widths that is narrower than the resized image.
+    The ladder is built from the single decoded image by stepping down from
+    the widest rung to the narrowest, so the source is only decoded once.
+
+    With draft=True, oversized JPEG sources are decoded at a reduced
+    resolution (see apply_draft_decode()). An AVIF file is written too when
+    avif_quality is set, and target switches every format to a per-image
+    quality search (see search_quality()).
+
+    When a manifest is given, the encode is skipped if the recorded outputs
+    were built from the same source bytes and settings.
+
+    Returns (jpeg_path, webp_path, variants) where variants lists
+    {'width', 'height', 'jpeg', 'webp', 'avif'} for every size written,
+    widest first. The full-size entry also carries a 'placeholder' data URI
+    (see placeholder_data_uri()).
+    """
+    settings = {
+        'max_width': max_width,
+        'max_height': max_height,
+        'jpeg_quality': jpeg_quality,
+        'webp_quality': webp_quality,
+        'avif_quality': avif_quality,
+        'target': target,
+        'srcset_widths': sorted(srcset_widths),
+        'draft_decode': DRAFT_DECODE_MIN_RATIO if draft else None,
+        'placeholder': [PLACEHOLDER_SIZE, PLACEHOLDER_QUALITY, np is not None],
+        'pillow': PIL.__version__,
+    }
+    source_hash = None
+    if manifest is not None and manifest.enabled:
+        source_hash = file_digest(input_path)
+        cached = manifest.lookup(input_path, source_hash, settings)
+        if cached is not None:
+            print(f"  ⚡ Up to date: {input_path.name} (manifest hit)")
+            return cached['outputs'].get('jpeg'), cached['outputs'].get('webp'), cached.get('variants', [])
+
     try:
         with Image.open(input_path) as img:
+            if draft:
+                scaled = apply_draft_decode(img, max_width, max_height)
+                if scaled:
+                    (src_w, src_h), (draft_w, draft_h) = scaled
+                    print(f"  Draft decode: {input_path.name} {src_w}x{src_h} → {draft_w}x{draft_h}")
+
             # Auto-rotate based on EXIF data if present
             img = ImageOps.exif_transpose(img)
             original_size = input_path.stat().st_size
             
             # Calculate new size maintaining aspect ratio
             img.thumbnail((max_width, max_height), Image.Resampling.LANCZOS)
-            img_for_webp = img.copy()
-
-            # Prepare JPEG version (flatten transparency onto white background)
-            img_for_jpeg = img
-            if img_for_jpeg.mode in ('RGBA', 'LA', 'P'):
-                background = Image.new('RGB', img_for_jpeg.size, (255, 255, 255))
-                if img_for_jpeg.mode == 'P':
-                    img_for_jpeg = img_for_jpeg.convert('RGBA')
-                background.paste(
-                    img_for_jpeg,
-                    mask=img_for_jpeg.split()[-1] if img_for_jpeg.mode in ('RGBA', 'LA') else None,
-                )
-                img_for_jpeg = background
 
-            if img_for_jpeg.mode != 'RGB':
-                img_for_jpeg = img_for_jpeg.convert('RGB')
+            qualities = {'jpeg': jpeg_quality, 'webp': webp_quality, 'avif': avif_quality}
+            paths = save_encoded_formats(img, output_path, input_path, size_info, original_size, qualities, target)
+            jpeg_path, webp_path = paths['jpeg'], paths.get('webp')
+            outputs = dict(paths)
+            variants = [{'width': img.width, 'height': img.height, **paths,
+                         'placeholder': placeholder_data_uri(img)}]
 
-            # Save optimized JPEG
-            jpeg_path = output_path.with_suffix('.jpg')
-            img_for_jpeg.save(jpeg_path, 'JPEG', quality=jpeg_quality, optimize=True)
-            
-            # Get file sizes
-            jpeg_size = jpeg_path.stat().st_size
-            jpeg_reduction = (1 - jpeg_size / original_size) * 100
-            
-            print(f"  JPEG: {input_path.name} {size_info} → {jpeg_size//1024}KB ({jpeg_reduction:.1f}% reduction)")
-            
-            # Create WebP version
-            try:
-                webp_path = output_path.with_suffix('.webp')
-                webp_image = img_for_webp
-                if webp_image.mode == 'P':
-                    webp_image = webp_image.convert('RGBA')
-                elif webp_image.mode == 'LA':
-                    webp_image = webp_image.convert('RGBA')
-                elif webp_image.mode not in ('RGB', 'RGBA'):
-                    webp_image = webp_image.convert('RGB')
-
-                webp_image.save(webp_path, 'WEBP', quality=webp_quality, optimize=True)
-                webp_size = webp_path.stat().st_size
-                webp_reduction = (1 - webp_size / original_size) * 100
-                print(f"  WebP: {input_path.name} {size_info} → {webp_size//1024}KB ({webp_reduction:.1f}% reduction)")
-            except Exception as e:
-                print(f"  ⚠️ WebP creation failed for {input_path.name}: {e}")
-                webp_path = None
+            # Width ladder: each rung is resized from the previous (larger) one
+            step = img
+            for width in sorted(srcset_widths, reverse=True):
+                if width >= step.width:
+                    continue
+                height = max(1, round(step.height * width / step.width))
+                step = step.resize((width, height), Image.Resampling.LANCZOS)
+                rung = save_encoded_formats(
+                    step, variant_path(output_path, width), input_path, size_info,
+                    original_size, qualities, target
+                )
+                outputs.update({f'{key}@{width}': path for key, path in rung.items()})
+                variants.append({'width': width, 'height': height, **rung})
+
+            if source_hash is not None:
+                manifest.record(
+                    input_path, source_hash, settings, outputs,
+                    variants=[
+                        {key: value.as_posix() if isinstance(value, Path) else value for key, value in v.items()}
+                        for v in variants
+                    ],
+                )
                 
-            return jpeg_path, webp_path
+            return jpeg_path, webp_path, variants
             
     except Exception as e:
         print(f"  ❌ Error optimizing {input_path.name}: {e}")
-        return None, None
+        return None, None, []
+
+def srcset_mapping(variants):
+    """Convert optimize_image() variants into the string form used by the mapping"""
+    return [
+        {
+            'width': v['width'],
+            **{
+                key: str(Path(v[key]).relative_to(Path('.'))) if v.get(key) else None
+                for key, _, _, _ in OUTPUT_FORMATS
+            },
+        }
+        for v in variants
+    ]
+
+def full_size_attributes(variants):
+    """Intrinsic size and placeholder of the full-size output, for the mapping"""
+    full = variants[0] if variants else {}
+    return {key: full.get(key) for key in ('width', 'height', 'placeholder')}
+
+def run_parallel(function, jobs, *iterables):
+    """Map function over iterables, across worker processes when jobs > 1.
+
+    Results are yielded in submission order, so logs and mappings are
+    identical regardless of the number of workers.
+    """
+    items = list(zip(*iterables))
+    jobs = max(1, min(jobs, len(items)))
+    if jobs == 1:
+        for args in items:
+            yield function(*args)
+        return
 
-def optimize_carousel_images():
-    """Optimize all carousel images"""
+    print(f"⚙️  Using {jobs} worker processes")
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        yield from executor.map(function, *zip(*items))
+
+def optimize_carousel_entry(img_path, manifest=None, avif=True, target=None):
+    """Optimize one carousel image, capturing its progress output.
+
+    Runs inside a worker process when --jobs > 1, so everything printed is
+    buffered and handed back to the parent to keep per-image logs together.
+    """
+    buffer = io.StringIO()
+    with contextlib.redirect_stdout(buffer):
+        output_path = CAROUSEL_OUTPUT_DIR / img_path.stem
+        original_size = img_path.stat().st_size
+
+        print(f"🖼️  Optimizing: {img_path.name} ({original_size // 1024}KB)")
+
+        jpeg_path, webp_path, variants = optimize_image(
+            img_path, output_path,
+            CAROUSEL_SETTINGS['max_width'], CAROUSEL_SETTINGS['max_height'],
+            f"({original_size // 1024}KB)",
+            jpeg_quality=CAROUSEL_SETTINGS['jpeg_quality'],
+            webp_quality=CAROUSEL_SETTINGS['webp_quality'],
+            manifest=manifest,
+            srcset_widths=CAROUSEL_SETTINGS['srcset_widths'],
+            avif_quality=CAROUSEL_SETTINGS['avif_quality'] if avif else None,
+            target=target
+        )
+
+    return img_path, jpeg_path, webp_path, variants, buffer.getvalue(), manifest
+
+def optimize_carousel_images(jobs=1, use_manifest=True, avif=True, target=None):
+    """Optimize all carousel images, optionally across a process pool"""
     print("\n📸 Optimizing Carousel Images")
     print("=" * 50)
     
@@ -144,39 +645,43 @@ def optimize_carousel_images():
         print("❌ No image files found in carousel directory")
         return {}
     
+    image_files = sorted(image_files)
+
     optimized_files = {}
     total_original = 0
     total_optimized = 0
+    manifest = ImageManifest.load(CAROUSEL_OUTPUT_DIR, force=not use_manifest)
+    subsets = [manifest.subset(f) for f in image_files]
+    entry = functools.partial(optimize_carousel_entry, avif=avif, target=target)
+
+    try:
+        for img_path, jpeg_path, webp_path, variants, log, subset in run_parallel(entry, jobs, image_files, subsets):
+            print(log, end="")
+            manifest.merge(subset)
+
+            if jpeg_path:
+                optimized_files[img_path.name] = {
+                    'original': str(img_path),
+                    'jpeg': str(jpeg_path.relative_to(Path('.'))),
+                    'webp': str(webp_path.relative_to(Path('.'))) if webp_path else None,
+                    'avif': srcset_mapping(variants)[0]['avif'] if variants else None,
+                    'srcset': srcset_mapping(variants),
+                    'sizes': CAROUSEL_SETTINGS['sizes'],
+                    **full_size_attributes(variants),
+                }
+                
+                total_original += img_path.stat().st_size
+                total_optimized += jpeg_path.stat().st_size
+    finally:
+        manifest.save()
     
-    for img_path in sorted(image_files):
-        output_path = CAROUSEL_OUTPUT_DIR / img_path.stem
-        
-        print(f"🖼️  Optimizing: {img_path.name} ({img_path.stat().st_size // 1024}KB)")
-        
-        jpeg_path, webp_path = optimize_image(
-            img_path, output_path, 
-            CAROUSEL_SETTINGS['max_width'], CAROUSEL_SETTINGS['max_height'],
-            f"({img_path.stat().st_size // 1024}KB)",
-            jpeg_quality=CAROUSEL_SETTINGS['jpeg_quality'],
-            webp_quality=CAROUSEL_SETTINGS['webp_quality']
-        )
-        
-        if jpeg_path:
-            optimized_files[img_path.name] = {
-                'original': str(img_path),
-                'jpeg': str(jpeg_path.relative_to(Path('.'))),
-                'webp': str(webp_path.relative_to(Path('.'))) if webp_path else None
-            }
-            
-            total_original += img_path.stat().st_size
-            total_optimized += jpeg_path.stat().st_size
-    
+    manifest.report("Carousel")
     total_reduction = (1 - total_optimized / total_original) * 100 if total_original > 0 else 0
     print(f"\n📊 Carousel Summary: {total_original//1024}KB → {total_optimized//1024}KB ({total_reduction:.1f}% reduction)")
     
     return optimized_files
 
-def optimize_profile_image():
+def optimize_profile_image(use_manifest=True, avif=True, target=None):
     """Optimize the profile image"""
     print("\n👤 Optimizing Profile Image")
     print("=" * 50)
@@ -188,77 +693,405 @@ def optimize_profile_image():
     print(f"\n📷 Optimizing profile image: {PROFILE_INPUT.name} ({PROFILE_INPUT.stat().st_size // (1024*1024)}MB)")
     
     output_path = PROFILE_OUTPUT_DIR / PROFILE_OUTPUT_NAME
+    manifest = ImageManifest.load(PROFILE_OUTPUT_DIR, force=not use_manifest)
     
-    jpeg_path, webp_path = optimize_image(
+    jpeg_path, webp_path, variants = optimize_image(
         PROFILE_INPUT, output_path,
         PROFILE_SETTINGS['max_width'], PROFILE_SETTINGS['max_height'],
         f"({PROFILE_INPUT.stat().st_size // (1024*1024)}MB)",
         jpeg_quality=PROFILE_SETTINGS['jpeg_quality'],
-        webp_quality=PROFILE_SETTINGS['webp_quality']
+        webp_quality=PROFILE_SETTINGS['webp_quality'],
+        manifest=manifest,
+        srcset_widths=PROFILE_SETTINGS['srcset_widths'],
+        avif_quality=PROFILE_SETTINGS['avif_quality'] if avif else None,
+        target=target
     )
+    manifest.save()
+    manifest.report("Profile")
     
     if jpeg_path:
         return {
             'original': str(PROFILE_INPUT),
             'jpeg': str(jpeg_path.relative_to(Path('.'))),
-            'webp': str(webp_path.relative_to(Path('.'))) if webp_path else None
+            'webp': str(webp_path.relative_to(Path('.'))) if webp_path else None,
+            'avif': srcset_mapping(variants)[0]['avif'] if variants else None,
+            'srcset': srcset_mapping(variants),
+            'sizes': PROFILE_SETTINGS['sizes'],
+            **full_size_attributes(variants),
         }
     
     return None
 
+SVG_NS = 'http://www.w3.org/2000/svg'
+XLINK_NS = 'http://www.w3.org/1999/xlink'
+
+# Namespaces written by editors (Inkscape, Sodipodi, Sketch, Illustrator,
+# Affinity) and RDF/Dublin Core metadata; browsers ignore all of them
+SVG_EDITOR_NAMESPACES = {
+    'http://www.inkscape.org/namespaces/inkscape',
+    'http://sodipodi.sourceforge.net/DTD/sodipodi-0.dtd',
+    'http://www.bohemiancoding.com/sketch/ns',
+    'http://ns.adobe.com/AdobeIllustrator/10.0/',
+    'http://ns.adobe.com/Extensibility/1.0/',
+    'http://ns.adobe.com/Graphs/1.0/',
+    'http://ns.adobe.com/Variables/1.0/',
+    'http://ns.adobe.com/ImageReplacement/1.0/',
+    'http://ns.adobe.com/SaveForWeb/1.0/',
+    'http://ns.adobe.com/xap/1.0/',
+    'http://www.serif.com/',
+    'http://www.w3.org/1999/02/22-rdf-syntax-ns#',
+    'http://purl.org/dc/elements/1.1/',
+    'http://creativecommons.org/ns#',
+}
+
+# Attributes holding coordinates or lengths whose precision can be rounded
+SVG_NUMERIC_ATTRIBUTES = {
+    'd', 'points', 'viewBox', 'transform', 'x', 'y', 'x1', 'y1', 'x2', 'y2',
+    'cx', 'cy', 'r', 'rx', 'ry', 'width', 'height', 'stroke-width',
+}
+SVG_NUMBER_RE = re.compile(r'[-+]?(?:\d+\.\d*|\.\d+|\d+)(?:[eE][-+]?\d+)?')
+
+# Path data is tokenized rather than matched number by number: arc flags are
+# single characters, so 'a1 1 0 011 1' has flags 0, 1 and ends at 1,1
+PATH_COMMAND_RE = re.compile(r'[MmZzLlHhVvCcSsQqTtAa]')
+PATH_SEPARATOR_RE = re.compile(r'[\s,]*')
+ARC_FLAG_POSITIONS = (3, 4)     # Of an arc's 7 arguments
+
+ET.register_namespace('', SVG_NS)
+ET.register_namespace('xlink', XLINK_NS)
+
+def split_tag(name):
+    """Split '{namespace}local' into (namespace, local)"""
+    if name.startswith('{'):
+        namespace, _, local = name[1:].partition('}')
+        return namespace, local
+    return None, name
+
+def format_svg_number(number, precision):
+    value = round(float(number), precision)
+    text = f"{value:.{precision}f}".rstrip('0').rstrip('.')
+    if text in ('-0', ''):
+        text = '0'
+    if text.startswith('0.'):
+        text = text[1:]
+    elif text.startswith('-0.'):
+        text = '-' + text[2:]
+    return text
+
+def tokenize_path(d):
+    """Split path data into [(command, [argument text, ...])].
+
+    Follows the SVG path grammar, so compact arc flags ('011') are read one
+    character at a time. Raises ValueError on malformed data.
+    """
+    commands = []
+    pos = PATH_SEPARATOR_RE.match(d).end()
+    while pos < len(d):
+        if PATH_COMMAND_RE.match(d, pos):
+            commands.append((d[pos], []))
+            pos += 1
+        elif not commands:
+            raise ValueError(f"path data must start with a command: {d[:20]!r}")
+        else:
+            command, args = commands[-1]
+            if command in 'Aa' and len(args) % 7 in ARC_FLAG_POSITIONS:
+                if d[pos] not in '01':
+                    raise ValueError(f"bad arc flag {d[pos]!r} in path data")
+                args.append(d[pos])
+                pos += 1
+            else:
+                match = SVG_NUMBER_RE.match(d, pos)
+                if not match:
+                    raise ValueError(f"unexpected {d[pos]!r} in path data")
+                args.append(match.group(0))
+                pos = match.end()
+        pos = PATH_SEPARATOR_RE.match(d, pos).end()
+    return commands
+
+def format_path(commands, precision):
+    """Serialize tokenize_path() output compactly, rounding every number but the arc flags"""
+    parts = []
+    for command, args in commands:
+        parts.append(command)
+        for i, arg in enumerate(args):
+            flag = command in 'Aa' and i % 7 in ARC_FLAG_POSITIONS
+            text = arg if flag else format_svg_number(arg, precision)
+            if i and not text.startswith('-'):
+                parts.append(' ')
+            parts.append(text)
+    return ''.join(parts)
+
+def minify_path(d, precision):
+    """Rounded, compact path data; malformed data is returned unchanged"""
+    try:
+        return format_path(tokenize_path(d), precision)
+    except ValueError:
+        return d
+
+def minify_svg(data, precision=3):
+    """Return minified SVG bytes.
+
+    Drops comments, <metadata>, editor-namespace elements and attributes and
+    whitespace between elements, and rounds coordinates to precision decimal
+    places.
+    """
+    root = ET.fromstring(data)
+
+    def clean(element):
+        for child in list(element):
+            namespace, local = split_tag(child.tag) if isinstance(child.tag, str) else (None, None)
+            if namespace in SVG_EDITOR_NAMESPACES or local == 'metadata':
+                element.remove(child)
+                continue
+            clean(child)
+
+        for name in list(element.attrib):
+            namespace, local = split_tag(name)
+            if namespace in SVG_EDITOR_NAMESPACES:
+                del element.attrib[name]
+            elif namespace is None and local == 'd':
+                element.attrib[name] = minify_path(element.attrib[name], precision)
+            elif namespace is None and local in SVG_NUMERIC_ATTRIBUTES:
+                value = SVG_NUMBER_RE.sub(lambda m: format_svg_number(m.group(0), precision), element.attrib[name])
+                value = re.sub(r'\s+', ' ', value).strip()
+                if local == 'points':
+                    value = re.sub(r'\s*,\s*', ',', value)
+                    value = re.sub(r'\s+-', '-', value)
+                element.attrib[name] = value
+
+        # Whitespace-only text between elements is insignificant outside <text>
+        if split_tag(element.tag)[1] not in ('text', 'tspan', 'textPath', 'style'):
+            if element.text and not element.text.strip():
+                element.text = None
+            for child in element:
+                if child.tail and not child.tail.strip():
+                    child.tail = None
+
+    clean(root)
+    return ET.tostring(root, encoding='utf-8', xml_declaration=False)
+
+def png_psnr(original, candidate):
+    """PSNR in dB between two images, compared as RGBA"""
+    diff = ImageChops.difference(original.convert('RGBA'), candidate.convert('RGBA'))
+    mse = sum(rms * rms for rms in ImageStat.Stat(diff).rms) / 4
+    if mse == 0:
+        return float('inf')
+    return 20 * math.log10(255 / math.sqrt(mse))
+
+def optimize_png_bytes(path, colors, min_psnr):
+    """Smallest of a lossless re-encode and (if it passes the PSNR check) a palette version"""
+    with Image.open(path) as img:
+        if getattr(img, 'is_animated', False):
+            return None, "animated PNG left as is"
+        img.load()
+        extra = {'icc_profile': img.info['icc_profile']} if 'icc_profile' in img.info else {}
+
+        candidates = []
+        buffer = io.BytesIO()
+        img.save(buffer, 'PNG', optimize=True, **extra)
+        candidates.append((buffer.getvalue(), "lossless"))
+
+        if img.mode != 'P' and colors:
+            rgba = img.convert('RGBA')
+            quantized = rgba.quantize(colors=colors, method=Image.Quantize.FASTOCTREE)
+            psnr = png_psnr(rgba, quantized)
+            if psnr >= min_psnr:
+                buffer = io.BytesIO()
+                quantized.save(buffer, 'PNG', optimize=True, **extra)
+                candidates.append((buffer.getvalue(), f"{colors}-colour palette, PSNR {psnr:.1f}dB"))
+
+    return min(candidates, key=lambda candidate: len(candidate[0]))
+
+def optimize_icon_entry(icon_path, manifest=None, settings=None):
+    """Optimize one SVG or PNG icon in place, capturing its progress output"""
+    buffer = io.StringIO()
+    settings = settings or ICON_SETTINGS
+    original_size = icon_path.stat().st_size
+    optimized_size = original_size
+
+    with contextlib.redirect_stdout(buffer):
+        source_hash = file_digest(icon_path) if manifest is not None and manifest.enabled else None
+        if source_hash is not None and manifest.lookup(icon_path, source_hash, settings) is not None:
+            return icon_path, original_size, optimized_size, buffer.getvalue(), manifest
+
+        try:
+            if icon_path.suffix.lower() == '.svg':
+                data = minify_svg(icon_path.read_bytes(), settings['svg_precision'])
+                ET.fromstring(data)  # Must still parse
+                detail = "minified"
+            else:
+                data, detail = optimize_png_bytes(icon_path, settings['png_colors'], settings['png_min_psnr'])
+
+            if data is not None and len(data) < original_size:
+                icon_path.write_bytes(data)
+                optimized_size = len(data)
+                print(f"  ✓ {icon_path}: {original_size//1024}KB → {optimized_size//1024}KB ({detail})")
+        except Exception as e:
+            print(f"  ⚠️ Could not optimize {icon_path}: {e}")
+
+        # The file on disk is now the optimized version, so it is also the
+        # "source" the next run compares against
+        if source_hash is not None:
+            manifest.record(icon_path, file_digest(icon_path), settings, {'icon': icon_path})
+
+    return icon_path, original_size, optimized_size, buffer.getvalue(), manifest
+
+def optimize_icons(jobs=1, use_manifest=True):
+    """Minify SVG and recompress PNG icons in place, per icon directory"""
+    print("\n🔣 Optimizing Icons")
+    print("=" * 50)
+
+    grand_original = 0
+    grand_optimized = 0
+    for icon_dir in ICON_DIRS:
+        if not icon_dir.is_dir():
+            print(f"⏭️  Icon directory not found: {icon_dir}")
+            continue
+
+        icon_files = sorted(
+            f for f in icon_dir.rglob('*')
+            if f.is_file() and f.suffix.lower() in ('.svg', '.png')
+        )
+        manifest = ImageManifest.load(icon_dir, force=not use_manifest)
+        subsets = [manifest.subset(f) for f in icon_files]
+
+        dir_original = 0
+        dir_optimized = 0
+        try:
+            for _, original_size, optimized_size, log, subset in run_parallel(
+                optimize_icon_entry, jobs, icon_files, subsets
+            ):
+                print(log, end="")
+                manifest.merge(subset)
+                dir_original += original_size
+                dir_optimized += optimized_size
+        finally:
+            manifest.save()
+
+        saved = dir_original - dir_optimized
+        reduction = saved / dir_original * 100 if dir_original else 0
+        print(f"📁 {icon_dir}: {len(icon_files)} icons, {dir_original//1024}KB → {dir_optimized//1024}KB "
+              f"(saved {saved//1024}KB, {reduction:.1f}%)")
+        manifest.report(str(icon_dir))
+        grand_original += dir_original
+        grand_optimized += dir_optimized
+
+    saved = grand_original - grand_optimized
+    print(f"\n📊 Icon Summary: {grand_original//1024}KB → {grand_optimized//1024}KB (saved {saved//1024}KB)")
+
+# Attributes regenerated on every run, including a previous run's placeholder style
+RESPONSIVE_ATTRS_RE = re.compile(
+    r'\s+(?:src|srcset|sizes|width|height)="[^"]*"'
+    r'|\s+style="background:url\(data:image/webp;base64,[^"]*"'
+)
+
+def document_url(path, document_dir):
+    """URL of a site-root-relative path as seen from a document's directory"""
+    path = Path(path).as_posix()
+    return posixpath.relpath(path, document_dir) if document_dir else path
+
+def build_srcset(variants, kind, document_dir=''):
+    """Build a srcset value; URLs are percent-encoded since names may contain spaces"""
+    return ", ".join(
+        f"{quote(document_url(v[kind], document_dir))} {v['width']}w"
+        for v in sorted(variants, key=lambda v: v['width'])
+        if v.get(kind)
+    )
+
+def placeholder_attrs(mapping, style=True):
+    """width/height (so the box is reserved before load) and the inline placeholder"""
+    attrs = ''
+    if mapping.get('width') and mapping.get('height'):
+        attrs += f' width="{mapping["width"]}" height="{mapping["height"]}"'
+    if style and mapping.get('placeholder'):
+        attrs += f' style="background:url({mapping["placeholder"]}) center/cover no-repeat"'
+    return attrs
+
+def build_picture_markup(indent, attrs, mapping, document_dir=''):
+    """Render <picture> markup with AVIF, WebP and JPEG srcsets for one mapped image"""
+    attrs = RESPONSIVE_ATTRS_RE.sub('', attrs)
+    # A hand-written style attribute wins over the generated placeholder
+    attrs += placeholder_attrs(mapping, style='style=' not in attrs)
+    # Encoded like the srcset URLs, so a name with spaces is one valid URL in both
+    src = quote(document_url(mapping['jpeg'], document_dir))
+    variants = mapping.get('srcset')
+    if not variants:
+        return f'{indent}<img{attrs} src="{src}">'
+
+    sizes = mapping.get('sizes')
+    sizes_attr = f' sizes="{sizes}"' if sizes else ''
+
+    lines = [f'{indent}<picture>']
+    for key in ('avif', 'webp'):
+        srcset = build_srcset(variants, key, document_dir)
+        if srcset:
+            lines.append(f'{indent}  <source type="image/{key}" srcset="{srcset}"{sizes_attr}>')
+    lines.append(
+        f'{indent}  <img{attrs} src="{src}" srcset="{build_srcset(variants, "jpeg", document_dir)}"{sizes_attr}>'
+    )
+    lines.append(f'{indent}</picture>')
+    return "\n".join(lines)
+
 def update_html_references(carousel_mapping, profile_mapping):
-    """Update HTML files to use optimized images"""
+    """Update the site's HTML and CSS to use optimized images.
+
+    Each document is scanned once into an AssetIndex (src, srcset, href,
+    poster and CSS url() references, and <img> elements) and every
+    original → optimized mapping is applied in a single pass over that
+    index. In the same pass, every <img> in the HTML that points at an
+    original or optimized image is rewritten to a <picture> with
+    AVIF/WebP <source>s and a JPEG srcset/sizes fallback, with width/height
+    and an inline data URI placeholder on the <img>; re-running replaces
+    the previously generated markup. References to missing files are
+    reported at the end.
+    """
     print("\n🔄 Updating HTML References")
     print("=" * 50)
+
+    # Site-root-relative original path → optimized JPEG path, and both of
+    # those paths → (display name, full mapping) for the <picture> pass
+    path_mapping = {}
+    images = {}
+    named_mappings = list(carousel_mapping.items())
+    if profile_mapping:
+        named_mappings.append((Path(profile_mapping['original']).name, profile_mapping))
+    for name, mapping in named_mappings:
+        original = Path(mapping['original']).as_posix()
+        jpeg = Path(mapping['jpeg']).as_posix()
+        path_mapping[original] = jpeg
+        images[original] = images[jpeg] = (name, mapping)
     
-    html_files = ['index.html', 'binaural-externalization/index.html']
-    
-    for html_file in html_files:
-        if not Path(html_file).exists():
+    for document in SITE_DOCUMENTS:
+        if not Path(document).exists():
             continue
             
-        print(f"📝 Updating {html_file}")
-        
-        with open(html_file, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        original_content = content
-        changes_made = 0
-        
-        # Update carousel image references
-        for original_name, mapping in carousel_mapping.items():
-            old_path = mapping['original']
-            new_path = mapping['jpeg']
-            
-            # Replace src attributes
-            old_pattern = f'src="{old_path}"'
-            new_pattern = f'src="{new_path}"'
-            
-            if old_pattern in content:
-                content = content.replace(old_pattern, new_pattern)
-                changes_made += 1
-                print(f"   ✓ Updated: {original_name} → {Path(new_path).name}")
+        print(f"📝 Updating {document}")
         
-        # Update profile image reference
-        if profile_mapping:
-            old_profile = profile_mapping['original']
-            new_profile = profile_mapping['jpeg']
-            
-            old_pattern = f'src="{old_profile}"'
-            new_pattern = f'src="{new_profile}"'
-            
-            if old_pattern in content:
-                content = content.replace(old_pattern, new_pattern)
-                changes_made += 1
-                print(f"   ✓ Updated profile: {Path(old_profile).name} → {Path(new_profile).name}")
+        index = AssetIndex(document)
+        document_dir = posixpath.dirname(document)
+
+        def picture(element):
+            if element.src is None or element.in_comment or element.src.path not in images:
+                return None
+            name, mapping = images[element.src.path]
+            replacement = build_picture_markup(element.indent, element.attrs, mapping, document_dir)
+            if replacement != index.text[element.start:element.end]:
+                print(f"   ✓ Updated: {name} → {Path(mapping['jpeg']).name} ({len(mapping.get('srcset') or [])} sizes)")
+            return replacement
+
+        content, changes_made = index.rewrite(path_mapping, picture)
         
         # Save updated file
         if changes_made > 0:
-            with open(html_file, 'w', encoding='utf-8') as f:
+            with open(document, 'w', encoding='utf-8') as f:
                 f.write(content)
-            print(f"   📁 Saved {html_file} with {changes_made} updates")
+            print(f"   📁 Saved {document} with {changes_made} updates")
         else:
-            print(f"   ℹ️  No references found in {html_file}")
+            print(f"   ℹ️  No references found in {document}")
+
+    print()
+    if not report_missing(index_documents()):
+        print("✓ All local asset references resolve to files on disk")
 
 def parse_args():
     """Parse command-line arguments"""
@@ -273,7 +1106,51 @@ def parse_args():
         action="store_true",
         help="Skip optimizing the carousel images",
     )
-    return parser.parse_args()
+    parser.add_argument(
+        "--icons",
+        action="store_true",
+        help="Also optimize the SVG/PNG icons (rewrites them in place)",
+    )
+    parser.add_argument(
+        "--skip-icons",
+        action="store_true",
+        help="Skip optimizing the SVG/PNG icons",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Re-encode everything, ignoring (and then rewriting) the incremental build manifest",
+    )
+    parser.add_argument(
+        "-j", "--jobs",
+        type=int,
+        default=1,
+        help="Number of worker processes for carousel images and icons (0 = all CPU cores, default: 1)",
+    )
+    parser.add_argument(
+        "--no-avif",
+        action="store_true",
+        help="Skip the AVIF output tier",
+    )
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument(
+        "--target-ssim",
+        type=float,
+        metavar="SSIM",
+        help="Search each format's quality per image for the smallest file reaching this SSIM (e.g. 0.985)",
+    )
+    target.add_argument(
+        "--max-kb",
+        type=int,
+        metavar="KB",
+        help="Search each format's quality per image for the best file within this byte budget",
+    )
+    args = parser.parse_args()
+    if args.jobs < 0:
+        parser.error("--jobs must be >= 0")
+    if args.jobs == 0:
+        args.jobs = os.cpu_count() or 1
+    return args
 
 
 def main():
@@ -290,10 +1167,27 @@ def main():
     except ImportError:
         print("❌ Pillow library not found. Install with: pip install Pillow")
         sys.exit(1)
+
+    if args.target_ssim is not None and np is None:
+        print("❌ NumPy not found (needed for --target-ssim). Install with: pip install numpy")
+        sys.exit(1)
+
+    avif = not args.no_avif and avif_supported()
+    if not args.no_avif and not avif:
+        print("ℹ️  AVIF encoder not available (needs Pillow 11.2+ or pip install pillow-avif-plugin) - skipping AVIF")
+
+    target = None
+    if args.target_ssim is not None:
+        target = {'ssim': args.target_ssim}
+        print(f"🎯 Target quality: SSIM ≥ {args.target_ssim}")
+    elif args.max_kb is not None:
+        target = {'max_bytes': args.max_kb * 1024}
+        print(f"🎯 Target size: ≤ {args.max_kb}KB per file")
     
     # Determine which optimizations to run
     carousel_enabled = CAROUSEL_OPTIMIZATION_ENABLED and not args.skip_carousel
     profile_enabled = PROFILE_OPTIMIZATION_ENABLED and not args.skip_profile
+    icons_enabled = (ICON_OPTIMIZATION_ENABLED or args.icons) and not args.skip_icons
 
     # Setup (only if carousel optimization is enabled)
     if carousel_enabled:
@@ -304,16 +1198,24 @@ def main():
     profile_mapping = None
 
     if carousel_enabled:
-        carousel_mapping = optimize_carousel_images()
+        carousel_mapping = optimize_carousel_images(
+            jobs=args.jobs, use_manifest=not args.force, avif=avif, target=target
+        )
     else:
         reason = "per --skip-carousel" if args.skip_carousel else "per CAROUSEL_OPTIMIZATION_ENABLED = False"
         print(f"\n⏭️  Skipping carousel image optimization ({reason})")
 
     if profile_enabled:
-        profile_mapping = optimize_profile_image()
+        profile_mapping = optimize_profile_image(use_manifest=not args.force, avif=avif, target=target)
     else:
         reason = "per --skip-profile" if args.skip_profile else "per PROFILE_OPTIMIZATION_ENABLED = False"
         print(f"\n⏭️  Skipping profile image optimization ({reason})")
+
+    if icons_enabled:
+        optimize_icons(jobs=args.jobs, use_manifest=not args.force)
+    else:
+        reason = "per --skip-icons" if args.skip_icons else "they are rewritten in place; opt in with --icons"
+        print(f"\n⏭️  Skipping icon optimization ({reason})")
     
     # Update HTML references
     if carousel_mapping or profile_mapping:
@@ -335,7 +1237,7 @@ def main():
     
     print(f"\n📋 Next Steps:")
     print("   1. Test your website to ensure images look good")
-    print("   2. Consider adding WebP support with <picture> elements")
+    print("   2. Check the generated <picture>/srcset markup in DevTools (Network → Img)")
     print("   3. Monitor performance improvements")
 
 if __name__ == "__main__":
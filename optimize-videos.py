@@ -1,13 +1,23 @@
 #!/usr/bin/env python3
 import argparse
+import hashlib
 import json
 import os
 import shutil
 import subprocess
 import sys
+import tempfile
+import time
 import unicodedata as u
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
+import encode_profiles
+import ffmpeg_progress
+import video_crop
+import video_probe
+import video_quality
+
 # Defaults you requested
 DEFAULT_IN  = "/Users/chris/Desktop/Whitebalance/website/assets/binaural-externalization/test"
 DEFAULT_OUT = "/Users/chris/Desktop/Whitebalance/website/assets/binaural-externalization/rendered"
@@ -28,21 +38,76 @@ def which_ffprobe() -> str:
         sys.exit(1)
     return p
 
-def ensure_videotoolbox(ffmpeg_path: str) -> None:
-    try:
-        cp = subprocess.run(
-            [ffmpeg_path, "-hide_banner", "-encoders"],
-            capture_output=True, text=True, check=False
-        )
-    except Exception as e:
-        sys.stderr.write(f"Error: failed to run ffmpeg: {e}\n")
-        sys.exit(1)
-    if "hevc_videotoolbox" not in cp.stdout:
-        sys.stderr.write(
-            "Error: Your ffmpeg is missing the hevc_videotoolbox encoder (needed for HEVC with alpha on macOS).\n"
-            "Fix: brew reinstall ffmpeg  (Homebrew builds include VideoToolbox).\n"
-        )
-        sys.exit(1)
+class EncoderBackend:
+    """One ffmpeg encoder and the container it writes; speed presets come from encode_profiles"""
+
+    def __init__(self, name: str, encoder: str, suffix: str,
+                 alpha_opts: list = (), extra_opts: list = (), hardware: bool = False):
+        self.name = name
+        self.encoder = encoder
+        self.suffix = suffix
+        self.alpha_opts = list(alpha_opts)
+        self.extra_opts = list(extra_opts)
+        self.hardware = hardware
+        self.supports_alpha = False  # Filled in by detect_backends() from the encoder's pixel formats
+
+    def encoder_args(self, alpha: bool, preset: str, bitrate: str, width: int = None) -> list:
+        args = ["-c:v", self.encoder, *encode_profiles.encoder_args(self.encoder, preset, width), *self.extra_opts]
+        if alpha:
+            args += self.alpha_opts
+        args += ["-b:v", bitrate]
+        if self.suffix in (".mov", ".mp4"):
+            args += ["-movflags", "+faststart"]
+        return args
+
+# In order of preference for --encoder auto
+BACKENDS = {
+    "videotoolbox": EncoderBackend(
+        "videotoolbox", "hevc_videotoolbox", ".mov",
+        alpha_opts=["-alpha_quality", "1", "-allow_sw", "1"],
+        extra_opts=["-tag:v", "hvc1"],
+        hardware=True,
+    ),
+    "x265": EncoderBackend(
+        "x265", "libx265", ".mp4",
+        extra_opts=["-tag:v", "hvc1", "-x265-params", "log-level=error"],
+    ),
+    "vp9": EncoderBackend("vp9", "libvpx-vp9", ".webm"),
+}
+PRESETS = encode_profiles.PROFILES
+
+def ffmpeg_version_string(ffmpeg_path: str) -> str:
+    cp = subprocess.run([ffmpeg_path, "-version"], capture_output=True, text=True, check=False)
+    return (cp.stdout.splitlines() or ["unknown"])[0]
+
+def detect_backends(ffmpeg_path: str) -> dict:
+    """Return the backends this ffmpeg build can encode with, noting which keep alpha"""
+    available = {}
+    for name, backend in BACKENDS.items():
+        try:
+            cp = subprocess.run(
+                [ffmpeg_path, "-hide_banner", "-h", f"encoder={backend.encoder}"],
+                capture_output=True, text=True, check=False
+            )
+        except Exception as e:
+            sys.stderr.write(f"Error: failed to run ffmpeg: {e}\n")
+            sys.exit(1)
+        if "is not recognized" in cp.stdout + cp.stderr or cp.returncode != 0:
+            continue
+        formats = next((line for line in cp.stdout.splitlines() if "pixel formats" in line), "")
+        # VideoToolbox lists its formats loosely; its alpha support comes from the encoder options
+        backend.supports_alpha = "yuva420p" in formats.split() or "alpha_quality" in cp.stdout
+        available[name] = backend
+    return available
+
+def select_backend(available: dict, requested: str, has_alpha: bool):
+    """Pick the backend for one source: the requested one, or the first suitable one for auto"""
+    if requested != "auto":
+        return available.get(requested)
+    for backend in available.values():
+        if backend.supports_alpha or not has_alpha:
+            return backend
+    return None
 
 def clean_name(name: str) -> str:
     # Normalize and remove ASCII control chars (<0x20) and Unicode format chars (Cf, e.g., bidi marks)
@@ -71,40 +136,94 @@ def sanitize_filenames(in_dir: Path) -> int:
     return renamed
 
 def probe_stream(ffprobe: str, path: Path) -> dict:
-    cmd = [
-        ffprobe,
-        "-v", "error",
-        "-select_streams", "v:0",
-        "-show_entries", "stream=pix_fmt,alpha_mode",
-        "-of", "json",
-        str(path)
-    ]
-    proc = subprocess.run(cmd, capture_output=True, text=True)
-    if proc.returncode != 0:
-        return {"pix_fmt": None, "alpha_mode": None, "has_alpha": False}
-    try:
-        data = json.loads(proc.stdout)
-        stream = data.get("streams", [{}])[0]
-    except (json.JSONDecodeError, IndexError):
-        return {"pix_fmt": None, "alpha_mode": None, "has_alpha": False}
-
-    pix_fmt = stream.get("pix_fmt")
-    alpha_mode = stream.get("alpha_mode")
-    has_alpha = False
-    if isinstance(pix_fmt, str) and "a" in pix_fmt.lower():
-        has_alpha = True
-    if isinstance(alpha_mode, str):
-        try:
-            has_alpha = has_alpha or int(alpha_mode) == 1
-        except ValueError:
-            pass
-    return {"pix_fmt": pix_fmt, "alpha_mode": alpha_mode, "has_alpha": has_alpha}
+    # Cached: each file is probed at most once per run (and not at all if unchanged since the last run)
+    info = video_probe.probe(path, ffprobe)
+    if info is None:
+        return {"pix_fmt": None, "has_alpha": False}
+    return info
 
 
-def convert_one(ffmpeg: str, ffprobe: str, infile: Path, outfile: Path, bitrate: str, overwrite: bool) -> int:
-    outfile.parent.mkdir(parents=True, exist_ok=True)
-    ow_flag = "-y" if overwrite else "-n"
-    info = probe_stream(ffprobe, infile)
+MANIFEST_NAME = ".video-manifest.json"
+
+def file_digest(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def file_stamp(path: Path) -> dict:
+    st = path.stat()
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+class EncodeManifest:
+    """Sidecar record (in the output folder) of the source and parameters behind each output.
+
+    Entries are keyed by output file name and hold the source's SHA-256 and
+    the full encode parameters. A source is only re-hashed when its size or
+    mtime changed since it was recorded.
+    """
+
+    def __init__(self, out_dir: Path):
+        self.path = out_dir / MANIFEST_NAME
+        self.entries = {}
+        self.hashes = {}  # Hashes computed this run, keyed by (path, size, mtime)
+        if self.path.exists():
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self.entries = json.load(f).get("entries", {})
+            except (OSError, ValueError) as e:
+                print(f"Ignoring unreadable manifest {self.path}: {e}")
+
+    def save(self) -> None:
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "entries": self.entries}, f, indent=2, sort_keys=True)
+            f.write("\n")
+
+    def source_hash(self, src: Path, entry: dict) -> str:
+        recorded = (entry or {}).get("source", {})
+        stamp = file_stamp(src)
+        if recorded.get("path") == str(src) and {k: recorded.get(k) for k in ("size", "mtime_ns")} == stamp:
+            return recorded["sha256"]
+        key = (str(src), stamp["size"], stamp["mtime_ns"])
+        if key not in self.hashes:
+            self.hashes[key] = file_digest(src)
+        return self.hashes[key]
+
+    def stale_reason(self, src: Path, dst: Path, params: dict):
+        """Why dst must be (re)built, or None if it is up to date"""
+        entry = self.entries.get(dst.name)
+        if not dst.exists():
+            return "new output" if entry is None else "output missing"
+        if entry is None:
+            return "no manifest entry for existing output"
+        if entry.get("output") != file_stamp(dst):
+            return "output modified since it was encoded"
+        if entry["source"].get("sha256") != self.source_hash(src, entry):
+            return "source changed"
+        entry["source"].update(file_stamp(src))  # Touched but identical: avoid re-hashing next run
+        if entry["source"].get("path") != str(src):
+            return f"source moved from <{Path(entry['source'].get('path', '?')).name}>"
+        changed = sorted(k for k in set(params) | set(entry.get("params", {}))
+                         if params.get(k) != entry["params"].get(k))
+        if changed:
+            details = [f"{k} {entry['params'].get(k)} -> {params.get(k)}"
+                       for k in changed if not isinstance(params.get(k) or entry["params"].get(k), (list, dict))]
+            return "parameters changed: " + (", ".join(details) or ", ".join(changed))
+        return None
+
+    def record(self, src: Path, dst: Path, params: dict) -> None:
+        self.entries[dst.name] = {
+            "source": {"path": str(src), "sha256": self.source_hash(src, self.entries.get(dst.name)), **file_stamp(src)},
+            "params": params,
+            "output": file_stamp(dst),
+        }
+
+def encode_params(info: dict, backend: EncoderBackend, preset: str, bitrate: str, crop: dict = None) -> dict:
+    """Everything that determines an encode's output, as recorded in the manifest.
+
+    crop is a video_crop box; the frame is cropped to it before padding.
+    """
     expect_alpha = info.get("has_alpha", False)
     if expect_alpha:
         filter_chain = (
@@ -112,38 +231,220 @@ def convert_one(ffmpeg: str, ffprobe: str, infile: Path, outfile: Path, bitrate:
             "format=yuva420p"
         )
         pix_fmt = "yuva420p"
-        encoder_opts = ["-alpha_quality", "1", "-allow_sw", "1"]
     else:
         filter_chain = "pad=ceil(iw/2)*2:ceil(ih/2)*2:color=#00000000,format=yuv420p"
         pix_fmt = "yuv420p"
-        encoder_opts = []
-
-    cmd = [
-        ffmpeg, "-hide_banner", "-loglevel", "error", ow_flag,
-        "-i", str(infile),
-        "-vf", filter_chain,
-        "-pix_fmt", pix_fmt,
-        "-c:v", "hevc_videotoolbox",
-        *encoder_opts,
-        "-tag:v", "hvc1",
-        "-b:v", bitrate, "-movflags", "+faststart",
-        "-an",
-        str(outfile),
-    ]
-    # Remove empty args (if any)
-    cmd = [a for a in cmd if a]
-    proc = subprocess.run(cmd)
-    return proc.returncode
-
-def main():
-    parser = argparse.ArgumentParser(description="Batch convert WebM/MOV assets to HEVC-with-Alpha .mov for iOS/Safari.")
+    width = info.get("width")
+    if crop:
+        filter_chain = f"{video_crop.crop_filter(crop)},{filter_chain}"
+        width = crop["width"]
+    return {
+        "encoder": backend.encoder,
+        "preset": preset,
+        "bitrate": bitrate,
+        "pix_fmt": pix_fmt,
+        "filter": filter_chain,
+        "crop": crop,
+        "decoder_args": video_probe.decoder_args(info),
+        "encoder_args": backend.encoder_args(expect_alpha, preset, bitrate, width),
+        "passes": encode_profiles.passes(backend.encoder, preset),
+    }
+
+def convert_one(ffmpeg: str, ffprobe: str, infile: Path, outfile: Path, bitrate: str, overwrite: bool,
+                threads: int = 0, log: list = None, backend: EncoderBackend = None, preset: str = "balanced",
+                board: ffmpeg_progress.ProgressBoard = None, stats: dict = None, crop: dict = None) -> int:
+    # threads=0 lets ffmpeg pick; with a log list, ffmpeg's stderr is captured into it instead of the terminal.
+    # Progress is parsed from ffmpeg -progress and shown on board; the final numbers go into stats.
+    # crop (a video_crop box) limits the encode to the visible area of a transparent source.
+    # Multi-pass presets run their first passes into a temporary pass log; stats then cover all passes.
+    backend = backend or BACKENDS["videotoolbox"]
+    outfile.parent.mkdir(parents=True, exist_ok=True)
+    ow_flag = "-y" if overwrite else "-n"
+    info = probe_stream(ffprobe, infile)
+    params = encode_params(info, backend, preset, bitrate, crop)
+
+    def build(pass_opts: list, output: list) -> list:
+        cmd = [
+            ffmpeg, "-hide_banner", "-loglevel", "error", ow_flag,
+            "-threads", str(threads),
+            *params["decoder_args"],
+            "-i", str(infile),
+            "-vf", params["filter"],
+            "-pix_fmt", params["pix_fmt"],
+            *params["encoder_args"],
+            *pass_opts,
+            "-threads", str(threads),
+            "-an",
+            *output,
+        ]
+        # Remove empty args (if any)
+        return [a for a in cmd if a]
+
+    with tempfile.TemporaryDirectory(prefix="ffmpeg-passlog-") as passdir:
+        passes = params["passes"]
+        logfile = Path(passdir) / "pass"
+        commands = [(build(encode_profiles.pass_args(n, logfile), encode_profiles.FIRST_PASS_OUTPUT), f" (pass {n})")
+                    for n in range(1, passes)]
+        commands.append((build(encode_profiles.pass_args(passes, logfile) if passes > 1 else [], [str(outfile)]), ""))
+
+        wall_seconds = 0.0
+        for cmd, label in commands:
+            if log is None and board is None and stats is None:
+                rc = subprocess.run(cmd).returncode
+                if rc != 0:
+                    return rc
+                continue
+            result = ffmpeg_progress.run_ffmpeg(cmd, info.get("duration"), outfile.name + label, board)
+            wall_seconds += result["wall_seconds"]
+            if log is not None:
+                log.extend(line for line in result["stderr"].splitlines() if line.strip())
+            if result["returncode"] != 0:
+                break
+    if log is None and board is None and stats is None:
+        return 0
+    if stats is not None:
+        stats.update(result, wall_seconds=wall_seconds, passes=passes)
+    return result["returncode"]
+
+def search_bitrate(src: Path, info: dict, backend: EncoderBackend, preset: str, max_bitrate: str, quality_floor: dict,
+                   crop: dict = None):
+    """Smallest bitrate up to max_bitrate whose sample encodes meet quality_floor; returns (bitrate, note)"""
+    params = encode_params(info, backend, preset, max_bitrate, crop)
+    alpha = info.get("has_alpha", False)
+    bitrate, result = video_quality.choose_setting(
+        src,
+        {"encoder": backend.encoder, "preset": preset, "filter": params["filter"], "max_bitrate": max_bitrate},
+        quality_floor,
+        [*params["decoder_args"], "-i", str(src)],
+        ["-vf", params["filter"]],
+        info.get("duration"),
+        lambda rate: [*backend.encoder_args(alpha, preset, rate), "-pix_fmt", params["pix_fmt"]],
+        video_quality.bitrate_candidates(max_bitrate),
+        backend.suffix,
+        pix_fmt=params["pix_fmt"],
+    )
+    scores = result["scores"]
+    measured = ", ".join(f"{key.upper()} {scores[key]:.4g}" for key in ("ssim", "psnr") if scores.get(key) is not None)
+    note = f"  Bitrate {bitrate} ({'cached' if result['cached'] else 'searched'}; {measured})"
+    if not result["met_floor"]:
+        note += " - floor not reached, using the maximum"
+    return bitrate, note
+
+def encode_job(ffmpeg: str, ffprobe: str, src: Path, dst: Path, backend: EncoderBackend, preset: str,
+               bitrate: str, overwrite: bool, threads: int, board: ffmpeg_progress.ProgressBoard = None,
+               quality_floor: dict = None, crop: dict = None):
+    """Encode one source and verify alpha survived; returns (ok, log lines, stats).
+
+    Runs on a scheduler thread, so nothing is printed here apart from live
+    progress on the board; the caller prints each job's lines in one block
+    once the job finishes. stats holds the backend name, wall time, seconds
+    of video encoded and ffmpeg's final progress numbers. With a
+    quality_floor, bitrate is the ceiling of a per-clip bitrate search.
+    """
+    lines = ["Encoding:", f"  IN : <{src.name}>", f"  OUT: <{dst.name}> ({backend.name}, {preset})"]
+    if crop:
+        lines.append(f"  Crop: {video_crop.describe_crop(crop)}")
+    if quality_floor:
+        try:
+            bitrate, note = search_bitrate(src, probe_stream(ffprobe, src), backend, preset, bitrate, quality_floor,
+                                           crop)
+            lines.append(note)
+        except subprocess.CalledProcessError as e:
+            lines.append(f"  Bitrate search failed, using {bitrate}: {(e.stderr or '').strip()[-200:]}")
+    ffmpeg_log = []
+    ffmpeg_stats = {}
+    start = time.perf_counter()
+    rc = convert_one(ffmpeg, ffprobe, src, dst, bitrate, overwrite, threads=threads, log=ffmpeg_log,
+                     backend=backend, preset=preset, board=board, stats=ffmpeg_stats, crop=crop)
+    elapsed = time.perf_counter() - start
+    lines.extend(f"  ffmpeg: {line}" for line in ffmpeg_log)
+    src_info = probe_stream(ffprobe, src)
+    stats = {"output": dst, "backend": backend.name, "bitrate": bitrate, "seconds": elapsed,
+             "media_seconds": src_info.get("duration") or 0.0, "ffmpeg": ffmpeg_stats}
+    if rc != 0:
+        lines.append(f"FAILED (ffmpeg exit {rc}): {src.name}\n")
+        return False, lines, stats
+
+    out_info = probe_stream(ffprobe, dst)
+    has_alpha = out_info.get("has_alpha", False)
+    frames = ffmpeg_stats.get("frames") or stats["media_seconds"] * (src_info.get("fps") or 0)
+    throughput = f"{elapsed:.1f}s"
+    if elapsed > 0 and frames:
+        throughput += f", {frames / elapsed:.1f} fps, {stats['media_seconds'] / elapsed:.2f}x realtime"
+    if ffmpeg_stats.get("size_bytes"):
+        throughput += f", {ffmpeg_stats['size_bytes'] // 1024}KB"
+    if has_alpha or not src_info.get("has_alpha", False):
+        lines.append(f"OK: {dst.name} ({throughput})\n")
+        return True, lines, stats
+    lines.append(f"WARNING: {dst.name} appears to have lost alpha (pix_fmt={out_info.get('pix_fmt')}).\n")
+    return False, lines, stats
+
+def run_jobs(jobs: list, workers: int, ffmpeg: str, ffprobe: str, preset: str, bitrate: str, overwrite: bool,
+             board: ffmpeg_progress.ProgressBoard = None, quality_floor: dict = None):
+    """Run encode jobs [(src, dst, backend, crop)] with at most `workers` ffmpeg processes at once.
+
+    The machine's cores are divided between the running encodes via ffmpeg
+    -threads so they don't oversubscribe the CPU. Yields (ok, log lines,
+    stats) as jobs finish; a job that raises is yielded as a failure, so
+    the rest of the batch still runs and gets recorded.
+    """
+    workers = max(1, min(workers, len(jobs)))
+    threads = 0 if workers == 1 else max(1, (os.cpu_count() or 1) // workers)
+    if workers > 1:
+        print(f"Running {workers} encodes at a time, {threads} ffmpeg thread(s) each\n")
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(encode_job, ffmpeg, ffprobe, src, dst, backend, preset, bitrate, overwrite, threads, board,
+                            quality_floor, crop): (src, dst, backend)
+            for src, dst, backend, crop in jobs
+        }
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                src, dst, backend = futures[future]
+                stats = {"output": dst, "backend": backend.name, "bitrate": bitrate, "seconds": 0.0,
+                         "media_seconds": 0.0, "ffmpeg": {}}
+                result = False, [f"FAILED ({type(e).__name__}: {e}): {src.name}\n"], stats
+            yield result
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(description="Batch convert WebM/MOV assets to HEVC-with-Alpha .mov for iOS/Safari "
+                                                 "(or software HEVC/VP9 where VideoToolbox is unavailable).")
     parser.add_argument("-i", "--input",  default=DEFAULT_IN,  help="Input folder containing source files (default: provided path)")
-    parser.add_argument("-o", "--output", default=DEFAULT_OUT, help="Output folder for .mov files (default: provided path)")
-    parser.add_argument("--bitrate", default="8M", help="Target video bitrate (default: 8M)")
-    parser.add_argument("--overwrite", action="store_true", help="Overwrite existing outputs")
+    parser.add_argument("-o", "--output", default=DEFAULT_OUT, help="Output folder for encoded files (default: provided path)")
+    parser.add_argument("--encoder", default="auto", choices=["auto", *BACKENDS],
+                        help="Encoder backend (default: auto = VideoToolbox if present, else the first "
+                             "software backend that keeps the source's alpha)")
+    parser.add_argument("--profile", "--preset", dest="preset", default=encode_profiles.DEFAULT_PROFILE,
+                        type=encode_profiles.resolve, choices=PRESETS,
+                        help=f"Encode profile: {', '.join(PRESETS)} (default: {encode_profiles.DEFAULT_PROFILE}; "
+                             "fast/quality are accepted for draft/archival)")
+    parser.add_argument("--bitrate", default="8M", help="Target video bitrate, or the ceiling with --target-ssim/--min-psnr (default: 8M)")
+    parser.add_argument("--target-ssim", type=float, metavar="SSIM",
+                        help="Search each clip's bitrate for the smallest encode whose samples reach this SSIM (e.g. 0.98)")
+    parser.add_argument("--min-psnr", type=float, metavar="DB",
+                        help="Search each clip's bitrate for the smallest encode whose samples reach this PSNR")
+    parser.add_argument("--crop", action="store_true",
+                        help="Crop transparent sources to their visible area (plus --crop-margin) and write the offsets "
+                             f"to {video_crop.OFFSETS_NAME} in the output folder")
+    parser.add_argument("--crop-margin", type=int, default=video_crop.CROP_MARGIN,
+                        help=f"Pixels kept around the visible area with --crop (default: {video_crop.CROP_MARGIN})")
+    parser.add_argument("--overwrite", action="store_true", help="Re-encode every output, even if the manifest says it is up to date")
     parser.add_argument("--recursive", action="store_true", help="Recurse into subfolders (default: off)")
     parser.add_argument("--no-sanitize", action="store_true", help="Skip filename sanitation step")
-    args = parser.parse_args()
+    parser.add_argument("--report", metavar="PATH", help="Write a JSON run report (per-job wall time, fps, speed, size)")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="Number of encodes to run at once (0 = all CPU cores, default: 1)")
+    args = parser.parse_args(argv)
+    if args.jobs < 0:
+        parser.error("--jobs must be >= 0")
+    if args.crop and video_crop.np is None:
+        sys.stderr.write("Error: --crop needs NumPy (pip install numpy).\n")
+        sys.exit(1)
+    jobs = args.jobs or os.cpu_count() or 1
+    quality_floor = None
+    if args.target_ssim is not None or args.min_psnr is not None:
+        quality_floor = {"ssim": args.target_ssim, "psnr": args.min_psnr}
 
     in_dir  = Path(args.input).expanduser().resolve()
     out_dir = Path(args.output).expanduser().resolve()
@@ -155,13 +456,29 @@ def main():
 
     ffmpeg = which_ffmpeg()
     ffprobe = which_ffprobe()
-    ensure_videotoolbox(ffmpeg)
+    available = detect_backends(ffmpeg)
+    if not available:
+        sys.stderr.write("Error: your ffmpeg has none of the supported encoders "
+                         f"({', '.join(b.encoder for b in BACKENDS.values())}).\n")
+        sys.exit(1)
+    if args.encoder != "auto" and args.encoder not in available:
+        sys.stderr.write(f"Error: your ffmpeg is missing {BACKENDS[args.encoder].encoder} (--encoder {args.encoder}).\n")
+        if args.encoder == "videotoolbox":
+            sys.stderr.write("Fix: brew reinstall ffmpeg  (Homebrew builds include VideoToolbox), "
+                             "or use --encoder x265/vp9 on Linux.\n")
+        sys.exit(1)
 
     print(f"Input dir:  {in_dir}")
     print(f"Output dir: {out_dir}")
-    print(f"Bitrate:    {args.bitrate}")
+    backend_names = [name + (" (alpha)" if backend.supports_alpha else "") for name, backend in available.items()]
+    print(f"Backends:   {', '.join(backend_names)}")
+    print(f"Encoder:    {args.encoder} ({args.preset})")
+    print(f"Bitrate:    {args.bitrate}" + (f" max, searched for {video_quality.describe_floor(quality_floor)}"
+                                              if quality_floor else ""))
+    print(f"Crop:       {f'visible area + {args.crop_margin}px' if args.crop else 'off'}")
     print(f"Overwrite:  {bool(args.overwrite)}")
     print(f"Recursive:  {bool(args.recursive)}")
+    print(f"Jobs:       {jobs}")
     print()
 
     # Sanitize odd filenames so subprocess/ffmpeg never sees control or bidi characters
@@ -180,18 +497,34 @@ def main():
         print("No source files found. Nothing to do.")
         return
 
+    # Probe every source up front (concurrently, through the shared cache)
+    video_probe.probe_many(sources, ffprobe)
+
     count_total = 0
     count_done = 0
     count_skipped = 0
     count_failed = 0
+    pending = []
+    throughput = {}
+    manifest = EncodeManifest(out_dir)
+    queued_params = {}
+    ffmpeg_version = ffmpeg_version_string(ffmpeg)
+    board = ffmpeg_progress.ProgressBoard()
+    report = ffmpeg_progress.RunReport("optimize-videos.py")
+    crops = {}
 
     for src in sorted(sources, key=lambda x: x.name.lower()):
         count_total += 1
-        dst = out_dir / (src.stem + ".mov")
-
-        if not args.overwrite and dst.exists():
-            print(f"Skipping (exists): {dst.name}")
-            count_skipped += 1
+        has_alpha = probe_stream(ffprobe, src).get("has_alpha", False)
+        backend = select_backend(available, args.encoder, has_alpha)
+        if backend is None or (has_alpha and not backend.supports_alpha):
+            print(f"No available encoder keeps alpha for <{src.name}> (try --encoder vp9)")
+            count_failed += 1
+            continue
+        dst = out_dir / (src.stem + backend.suffix)
+        if dst.resolve() == src.resolve():
+            print(f"Output would overwrite its source: <{src.name}> (use a different --output)")
+            count_failed += 1
             continue
 
         if not os.access(src, os.R_OK):
@@ -199,29 +532,68 @@ def main():
             count_failed += 1
             continue
 
-        print("Encoding:")
-        print(f"  IN : <{src.name}>")
-        print(f"  OUT: <{dst.name}>")
+        crop = None
+        if args.crop:
+            try:
+                crop = video_crop.find_crop(src, args.crop_margin, ffmpeg=ffmpeg)
+            except subprocess.CalledProcessError as e:
+                print(f"Crop analysis failed, encoding the full frame: <{src.name}> ({(e.stderr or '').strip()[-200:]})")
+
+        params = encode_params(probe_stream(ffprobe, src), backend, args.preset, args.bitrate, crop)
+        params["ffmpeg"] = ffmpeg_version
+        params["quality_floor"] = quality_floor
+        reason = "--overwrite" if args.overwrite else manifest.stale_reason(src, dst, params)
+        if reason is None:
+            print(f"Skipping (up to date): {dst.name}")
+            crops[dst.name] = crop
+            count_skipped += 1
+            continue
 
-        rc = convert_one(ffmpeg, ffprobe, src, dst, args.bitrate, args.overwrite)
-        if rc == 0:
-            out_info = probe_stream(ffprobe, dst)
-            has_alpha = out_info.get("has_alpha", False)
-            if has_alpha or not probe_stream(ffprobe, src).get("has_alpha", False):
-                print(f"OK: {dst.name}\n")
+        print(f"Queued: {dst.name} ({reason})")
+        pending.append((src, dst, backend, crop))
+        queued_params[dst] = (src, params)
+
+    if pending:
+        print()
+    # Each job's output is printed as one block, so parallel encodes never interleave.
+    # Queued outputs are stale by definition, so ffmpeg may always replace them.
+    try:
+        for ok, lines, stats in run_jobs(pending, jobs, ffmpeg, ffprobe, args.preset, args.bitrate, True, board,
+                                         quality_floor):
+            board.clear()
+            print("\n".join(lines), flush=True)
+            src, params = queued_params[stats["output"]]
+            report.add(stats["ffmpeg"], input=str(src), output=str(stats["output"]), backend=stats["backend"],
+                       preset=args.preset, bitrate=stats["bitrate"], ok=ok, media_seconds=stats["media_seconds"])
+            totals = throughput.setdefault(stats["backend"], [0, 0.0, 0.0])
+            totals[0] += 1
+            totals[1] += stats["seconds"]
+            totals[2] += stats["media_seconds"]
+            if ok:
+                manifest.record(src, stats["output"], params)
+                crops[stats["output"].name] = params["crop"]
                 count_done += 1
             else:
-                print(f"WARNING: {dst.name} appears to have lost alpha (pix_fmt={out_info.get('pix_fmt')}).\n")
                 count_failed += 1
-        else:
-            print(f"FAILED (ffmpeg exit {rc}): {src.name}\n")
-            count_failed += 1
+    finally:
+        board.clear()
+        manifest.save()
+        video_probe.save_cache()
+        offsets = video_crop.write_offsets(out_dir, crops)
+        if offsets and args.crop:
+            print(f"Crop offsets: {offsets}")
+        if args.report:
+            report.write(args.report)
+            print(f"Run report: {args.report}")
 
     print("Done.")
     print(f"Total:   {count_total}")
     print(f"Encoded: {count_done}")
     print(f"Skipped: {count_skipped}")
     print(f"Failed:  {count_failed}")
+    for name, (files, seconds, media_seconds) in throughput.items():
+        speed = f", {media_seconds / seconds:.2f}x realtime" if seconds else ""
+        print(f"Backend {name}: {files} file(s), {media_seconds:.1f}s of video in {seconds:.1f}s of encoding{speed}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
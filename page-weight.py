@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Page Weight Analyzer
+Measures how many bytes each page of the site loads and checks them against
+performance budgets, so deploys can be gated on page weight.
+
+Every asset reference in the page (and in the stylesheets it links) is
+resolved to a file on disk and classified as:
+- above the fold: in <head> or within the first --fold-sections <section>s
+- eager: fetched during page load (autoplay video, plain <img>, scripts...)
+- lazy: loading="lazy" images, preload="none"/"metadata" media
+- alternate: srcset candidates and data-mov fallbacks the browser may pick
+  instead of the counted src (reported, not totalled)
+- on demand: links and downloads (<a href>), only fetched on click
+
+Assets added at runtime by JavaScript (e.g. the binaural audio grid) are not
+visible to a static scan.
+
+Requirements:
+- Python 3.6+
+
+Usage:
+    python3 page-weight.py
+    python3 page-weight.py --budget eager=8MB --budget above_fold=1.5MB
+    python3 page-weight.py --json page-weight.json
+"""
+
+import argparse
+import json
+import re
+import sys
+from pathlib import Path
+
+from asset_references import AssetIndex
+
+PAGES = ['index.html', 'binaural-externalization/index.html']
+
+# Default budgets per page; keys are 'above_fold', 'eager', 'lazy' or an
+# asset type ('image', 'video', ...) which is checked against eager bytes
+DEFAULT_BUDGETS = {
+    'above_fold': int(2.5 * 1024 * 1024),
+    'eager': 10 * 1024 * 1024,
+    'font': 768 * 1024,
+}
+
+DEFAULT_FOLD_SECTIONS = 2
+
+ASSET_TYPES = {
+    'image': {'.jpg', '.jpeg', '.png', '.gif', '.webp', '.avif', '.svg', '.ico'},
+    'video': {'.webm', '.mp4', '.mov'},
+    'audio': {'.wav', '.mp3', '.m4a', '.opus', '.ogg', '.flac'},
+    'font': {'.otf', '.ttf', '.woff', '.woff2'},
+    'css': {'.css'},
+    'js': {'.js', '.mjs'},
+    'document': {'.pdf', '.html'},
+}
+
+LOADED_LINK_RELS = {'stylesheet', 'icon', 'apple-touch-icon', 'preload', 'modulepreload', 'manifest'}
+
+TAG_RE = re.compile(r'<(?P<name>[a-zA-Z][\w-]*)(?P<attrs>[^>]*)>', re.DOTALL)
+ATTR_RE = re.compile(r'([\w-]+)\s*=\s*(["\'])(.*?)\2|([\w-]+)', re.DOTALL)
+SIZE_RE = re.compile(r'^\s*([\d.]+)\s*([KMG]?B?)\s*$', re.IGNORECASE)
+
+
+def parse_size(text):
+    """Parse '1.5MB', '800KB' or a plain byte count"""
+    match = SIZE_RE.match(text)
+    if not match:
+        raise argparse.ArgumentTypeError(f"invalid size: {text}")
+    value, unit = match.groups()
+    multiplier = {'': 1, 'B': 1, 'K': 1024, 'KB': 1024, 'M': 1024 ** 2, 'MB': 1024 ** 2,
+                  'G': 1024 ** 3, 'GB': 1024 ** 3}[unit.upper()]
+    return int(float(value) * multiplier)
+
+
+def format_size(size):
+    if size >= 1024 * 1024:
+        return f"{size / (1024 * 1024):.1f}MB"
+    return f"{size // 1024}KB"
+
+
+def asset_type(path):
+    suffix = Path(path).suffix.lower()
+    for name, suffixes in ASSET_TYPES.items():
+        if suffix in suffixes:
+            return name
+    return 'other'
+
+
+def parse_attrs(text):
+    return {
+        (m.group(1) or m.group(4)).lower(): m.group(3) if m.group(1) else ''
+        for m in ATTR_RE.finditer(text)
+    }
+
+
+def enclosing_tag(text, position):
+    """Tag name and attributes of the HTML tag containing position"""
+    start = text.rfind('<', 0, position)
+    match = TAG_RE.match(text, start) if start >= 0 else None
+    if not match or match.end() < position:
+        return None, {}
+    return match.group('name').lower(), parse_attrs(match.group('attrs'))
+
+
+def media_parent(text, position):
+    """Attributes of the <video>/<audio> a <source> belongs to"""
+    start = max(text.rfind('<video', 0, position), text.rfind('<audio', 0, position))
+    if start < 0:
+        return None, {}
+    return enclosing_tag(text, start + 1)
+
+
+def fold_position(text, fold_sections):
+    """Offset where the first fold_sections <section> elements end"""
+    ends = [m.end() for m in re.finditer(r'</section\s*>', text, re.IGNORECASE)]
+    if not ends:
+        return len(text)
+    return ends[min(fold_sections, len(ends)) - 1] if fold_sections > 0 else 0
+
+
+def classify(index, ref):
+    """Loading class of one reference: eager, lazy, alternate or on_demand"""
+    if index.document.suffix == '.css':
+        return 'eager'
+    tag, attrs = enclosing_tag(index.text, ref.start)
+    if ref.kind.endswith('srcset') or ref.kind == 'data-mov':
+        return 'alternate'
+    if tag == 'a':
+        return 'on_demand'
+    if tag == 'link' and not LOADED_LINK_RELS & set(attrs.get('rel', '').lower().split()):
+        return 'on_demand'
+    if tag in ('img', 'iframe') and attrs.get('loading', '').lower() == 'lazy':
+        return 'lazy'
+    if tag == 'source':
+        tag, attrs = media_parent(index.text, ref.start)
+    if tag in ('video', 'audio'):
+        if 'autoplay' in attrs:
+            return 'eager'
+        if attrs.get('preload', '').lower() in ('none', 'metadata'):
+            return 'lazy'
+    return 'eager'
+
+
+def analyze_page(page, root, fold_sections):
+    """Weigh one page; returns a report dict"""
+    root = Path(root)
+    page_index = AssetIndex(page, root)
+    head_end = page_index.text.lower().find('</head>')
+    fold = fold_position(page_index.text, fold_sections)
+
+    seen = {}
+    missing = set()
+    external = 0
+
+    def visit(index, ref, above_fold):
+        nonlocal external
+        if ref.in_comment:
+            return
+        if ref.path is None:
+            external += ref.url.startswith(('http:', 'https:', '//'))
+            return
+        loading = classify(index, ref)
+        file_path = root / ref.path
+        if not file_path.is_file():
+            if loading != 'on_demand' and not file_path.is_dir():
+                missing.add(ref.path)
+            return
+
+        # A path counts once per page, in its most expensive class
+        rank = ['on_demand', 'alternate', 'lazy', 'eager']
+        entry = seen.get(ref.path)
+        if entry is None or rank.index(loading) > rank.index(entry['loading']):
+            seen[ref.path] = entry = {
+                'path': ref.path,
+                'type': asset_type(ref.path),
+                'bytes': file_path.stat().st_size,
+                'loading': loading,
+                'above_fold': False,
+            }
+        entry['above_fold'] = entry['above_fold'] or (above_fold and loading == 'eager')
+
+        # Follow linked stylesheets into their url() references
+        if ref.path.endswith('.css') and loading == 'eager' and index is page_index:
+            stylesheet = AssetIndex(ref.path, root)
+            for css_ref in stylesheet.references:
+                visit(stylesheet, css_ref, above_fold)
+
+    for ref in page_index.references:
+        visit(page_index, ref, ref.start < head_end or ref.start < fold)
+
+    assets = sorted(seen.values(), key=lambda a: -a['bytes'])
+    html_bytes = (root / page).stat().st_size
+    totals = {'above_fold': html_bytes, 'eager': html_bytes, 'lazy': 0, 'alternate': 0, 'on_demand': 0}
+    by_type = {}
+    for asset in assets:
+        totals[asset['loading']] += asset['bytes']
+        if asset['above_fold']:
+            totals['above_fold'] += asset['bytes']
+        type_totals = by_type.setdefault(asset['type'], {'eager': 0, 'lazy': 0, 'count': 0})
+        type_totals['count'] += 1
+        if asset['loading'] in ('eager', 'lazy'):
+            type_totals[asset['loading']] += asset['bytes']
+    by_type.setdefault('document', {'eager': 0, 'lazy': 0, 'count': 0})
+    by_type['document']['eager'] += html_bytes
+    by_type['document']['count'] += 1
+
+    return {
+        'page': page,
+        'html_bytes': html_bytes,
+        'totals': totals,
+        'by_type': by_type,
+        'assets': assets,
+        'missing': sorted(missing),
+        'external_references': external,
+    }
+
+
+def check_budgets(report, budgets):
+    """List of (name, actual, budget) for every exceeded budget"""
+    failures = []
+    for name, budget in budgets.items():
+        if name in report['totals']:
+            actual = report['totals'][name]
+        else:
+            actual = report['by_type'].get(name, {}).get('eager', 0)
+        if actual > budget:
+            failures.append((name, actual, budget))
+    return failures
+
+
+def print_report(report, top):
+    totals = report['totals']
+    print(f"\n📄 {report['page']}")
+    print("-" * 60)
+    print(f"   Above the fold: {format_size(totals['above_fold'])}")
+    print(f"   Eager (page load): {format_size(totals['eager'])}")
+    print(f"   Lazy: {format_size(totals['lazy'])}")
+    print(f"   Alternates (not counted): {format_size(totals['alternate'])}")
+    print(f"   On demand (links/downloads): {format_size(totals['on_demand'])}")
+    if report['external_references']:
+        print(f"   External references (not weighed): {report['external_references']}")
+
+    print(f"\n   {'Type':<10} {'Files':>6} {'Eager':>10} {'Lazy':>10}")
+    for name, type_totals in sorted(report['by_type'].items(), key=lambda item: -item[1]['eager']):
+        print(f"   {name:<10} {type_totals['count']:>6} {format_size(type_totals['eager']):>10} "
+              f"{format_size(type_totals['lazy']):>10}")
+
+    heaviest = [a for a in report['assets'] if a['loading'] in ('eager', 'lazy')][:top]
+    if heaviest:
+        print(f"\n   Heaviest assets:")
+        for asset in heaviest:
+            fold = " (above fold)" if asset['above_fold'] else ""
+            print(f"   {format_size(asset['bytes']):>9}  {asset['loading']:<5} {asset['path']}{fold}")
+
+    for path in report['missing']:
+        print(f"   ⚠️  Missing: {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report page weight and enforce performance budgets")
+    parser.add_argument("pages", nargs="*", default=PAGES, help="Pages to analyze (default: site pages)")
+    parser.add_argument("--root", default=".", help="Site root (default: current directory)")
+    parser.add_argument("--fold-sections", type=int, default=DEFAULT_FOLD_SECTIONS,
+                        help=f"Number of <section>s counted as above the fold (default: {DEFAULT_FOLD_SECTIONS})")
+    parser.add_argument("--budget", action="append", default=[], metavar="NAME=SIZE",
+                        help="Override a budget, e.g. eager=8MB, above_fold=1.5MB, video=4MB (repeatable)")
+    parser.add_argument("--no-default-budgets", action="store_true", help="Only check budgets given with --budget")
+    parser.add_argument("--top", type=int, default=10, help="Number of heaviest assets to list (default: 10)")
+    parser.add_argument("--json", metavar="PATH", help="Also write the full report as JSON")
+    args = parser.parse_args()
+
+    budgets = {} if args.no_default_budgets else dict(DEFAULT_BUDGETS)
+    for item in args.budget:
+        name, _, size = item.partition('=')
+        if not size:
+            parser.error(f"--budget expects NAME=SIZE, got {item!r}")
+        budgets[name] = parse_size(size)
+
+    print("⚖️  Page Weight Analysis")
+    print("=" * 60)
+
+    reports = []
+    failed = False
+    for page in args.pages:
+        if not (Path(args.root) / page).exists():
+            print(f"❌ Page not found: {page}")
+            failed = True
+            continue
+        report = analyze_page(page, args.root, args.fold_sections)
+        report['budget_failures'] = [
+            {'budget': name, 'bytes': actual, 'limit': limit}
+            for name, actual, limit in check_budgets(report, budgets)
+        ]
+        reports.append(report)
+        print_report(report, args.top)
+
+    print("\n🎯 Budgets")
+    print("-" * 60)
+    for report in reports:
+        for failure in report['budget_failures']:
+            failed = True
+            print(f"   ❌ {report['page']}: {failure['budget']} {format_size(failure['bytes'])} "
+                  f"> {format_size(failure['limit'])}")
+        if not report['budget_failures']:
+            print(f"   ✓ {report['page']}: within budget")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'budgets': budgets, 'pages': reports}, f, indent=2)
+            f.write('\n')
+        print(f"\n📁 Report written to {args.json}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Asset Precompression
+Writes Brotli (.br) and gzip (.gz) siblings next to the site's text assets
+(HTML, CSS, JavaScript, SVG, JSON, uncompressed fonts...) at the highest
+compression levels, and adds .htaccess rules that serve them to browsers
+which accept the encoding. The server then sends bytes compressed once at
+deploy time instead of compressing (at a low level) on every request.
+
+- Files smaller than --min-size, or whose compressed copy would not save at
+  least --min-saving of the original, get no sibling (a stale one is
+  removed), so the server never sends a larger or barely smaller file
+- Siblings newer than their source are left alone unless --force
+- gzip output is deterministic (no timestamp), so rebuilding an unchanged
+  tree produces identical bytes
+
+Without the brotli module only .gz siblings are written. Run after
+fingerprint-assets.py so the hashed names get siblings too.
+
+This is for Apache deploys only: the siblings are served solely through
+the .htaccess rules, which GitHub Pages ignores (Pages compresses on its
+own), so the Pages workflow does not run it.
+
+Requirements:
+- Python 3.6+
+- brotli (optional, pip install brotli)
+
+Usage:
+    python3 precompress-assets.py
+    python3 precompress-assets.py --dry-run -j 0
+    python3 precompress-assets.py --clean    # remove siblings and rules
+"""
+
+import argparse
+import gzip
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+HTACCESS = ".htaccess"
+
+# Suffix -> Content-Type the precompressed sibling is served with
+COMPRESSIBLE_TYPES = {
+    '.html': 'text/html; charset=utf-8',
+    '.css': 'text/css; charset=utf-8',
+    '.js': 'text/javascript; charset=utf-8',
+    '.mjs': 'text/javascript; charset=utf-8',
+    '.json': 'application/json',
+    '.webmanifest': 'application/manifest+json',
+    '.map': 'application/json',
+    '.svg': 'image/svg+xml',
+    '.xml': 'application/xml',
+    '.txt': 'text/plain; charset=utf-8',
+    '.ico': 'image/x-icon',
+    '.otf': 'font/otf',
+    '.ttf': 'font/ttf',
+}
+
+# Content negotiation order: preferred encoding first
+ENCODINGS = ('br', 'gzip')
+SIBLING_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+SKIP_DIRS = {'.git', '.github', 'node_modules', '__pycache__', 'bench-results'}
+
+DEFAULT_MIN_SIZE = 1024       # bytes; below this the headers dominate
+DEFAULT_MIN_SAVING = 0.10     # fraction of the original a sibling must save
+
+HTACCESS_BEGIN = "# BEGIN precompress-assets"
+HTACCESS_END = "# END precompress-assets"
+HTACCESS_BLOCK_RE = re.compile(re.escape(HTACCESS_BEGIN) + r'.*?' + re.escape(HTACCESS_END) + r'\n?', re.DOTALL)
+
+
+def available_encodings():
+    return tuple(encoding for encoding in ENCODINGS if encoding != 'br' or brotli is not None)
+
+
+def compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=11, lgwin=24)
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def sibling_path(path, encoding):
+    return path.with_name(path.name + SIBLING_SUFFIXES[encoding])
+
+
+def find_assets(root):
+    """Every compressible file under root, skipping tooling directories"""
+    assets = []
+    for directory, dirs, files in os.walk(root):
+        dirs[:] = sorted(d for d in dirs if d not in SKIP_DIRS and not d.startswith('.'))
+        for name in sorted(files):
+            path = Path(directory) / name
+            if path.suffix.lower() in COMPRESSIBLE_TYPES:
+                assets.append(path)
+    return assets
+
+
+def precompress_file(path, encodings, min_size, min_saving, force=False, dry_run=False):
+    """Write (or remove) the siblings of one file.
+
+    Returns (path, size, {encoding: compressed size or None when skipped}).
+    Runs inside a worker process when --jobs > 1.
+    """
+    size = path.stat().st_size
+    results = {}
+    data = None
+    for encoding in encodings:
+        sibling = sibling_path(path, encoding)
+        if size < min_size:
+            results[encoding] = None
+        elif not force and sibling.exists() and sibling.stat().st_mtime >= path.stat().st_mtime:
+            results[encoding] = sibling.stat().st_size
+            continue
+        else:
+            if data is None:
+                data = path.read_bytes()
+            compressed = compress(data, encoding)
+            if len(compressed) <= size * (1 - min_saving):
+                results[encoding] = len(compressed)
+                if not dry_run:
+                    sibling.write_bytes(compressed)
+                continue
+            results[encoding] = None
+        if sibling.exists() and not dry_run:
+            sibling.unlink()
+    return path, size, results
+
+
+def htaccess_block(encodings):
+    """mod_rewrite rules serving <file>.br / <file>.gz to clients that accept them"""
+    suffixes = "|".join(sorted(suffix.lstrip('.') for suffix in COMPRESSIBLE_TYPES))
+    lines = [
+        HTACCESS_BEGIN,
+        "# Generated by precompress-assets.py: serve precompressed siblings",
+        "<IfModule mod_rewrite.c>",
+        "  RewriteEngine On",
+    ]
+    for encoding in encodings:
+        sibling = SIBLING_SUFFIXES[encoding]
+        lines += [
+            f"  RewriteCond %{{HTTP:Accept-Encoding}} \\b{encoding}\\b",
+            f"  RewriteCond %{{REQUEST_FILENAME}}{sibling} -f",
+            f"  RewriteRule ^(.+\\.({suffixes}))$ $1{sibling} [L]",
+        ]
+    # Keep the original Content-Type and stop mod_deflate compressing twice
+    for encoding in encodings:
+        sibling = SIBLING_SUFFIXES[encoding]
+        for suffix, content_type in sorted(COMPRESSIBLE_TYPES.items()):
+            lines.append(
+                f'  RewriteRule \\{suffix}\\{sibling}$ - [T={content_type.replace(" ", "")},'
+                f'E=no-gzip:1,E=no-brotli:1]')
+    # Originals vary by Accept-Encoding too, or a shared cache could hand
+    # the uncompressed copy it stored to every client
+    lines += [
+        "</IfModule>",
+        "<IfModule mod_headers.c>",
+        f'  <FilesMatch "\\.({suffixes})$">',
+        "    Header append Vary Accept-Encoding",
+        "  </FilesMatch>",
+    ]
+    for encoding in encodings:
+        sibling = SIBLING_SUFFIXES[encoding]
+        lines += [
+            f'  <FilesMatch "\\.({suffixes})\\{sibling}$">',
+            f"    Header set Content-Encoding {encoding}",
+            "    Header append Vary Accept-Encoding",
+            "  </FilesMatch>",
+        ]
+    lines += ["</IfModule>", HTACCESS_END]
+    return "\n".join(lines) + "\n"
+
+
+def update_htaccess(block):
+    """Replace (or append, or with block=None remove) the generated rules"""
+    path = Path(HTACCESS)
+    text = path.read_text(encoding='utf-8') if path.exists() else ""
+    text = HTACCESS_BLOCK_RE.sub("", text).rstrip("\n")
+    if block:
+        text = f"{text}\n\n{block}" if text else block
+    path.write_text(text + "\n" if text and not text.endswith("\n") else text, encoding='utf-8')
+
+
+def format_size(size):
+    return f"{size / 1024:.1f}KB" if size >= 1024 else f"{size}B"
+
+
+def precompress(jobs=1, min_size=DEFAULT_MIN_SIZE, min_saving=DEFAULT_MIN_SAVING, force=False, dry_run=False):
+    """Precompress every asset under the current directory; returns {path: results}"""
+    encodings = available_encodings()
+    if brotli is None:
+        print("⚠️  brotli not installed (pip install brotli): writing .gz siblings only")
+
+    assets = find_assets(".")
+    print(f"📦 {len(assets)} compressible file(s), encodings: {', '.join(encodings)}")
+    args = (assets, [encodings] * len(assets), [min_size] * len(assets),
+            [min_saving] * len(assets), [force] * len(assets), [dry_run] * len(assets))
+    jobs = max(1, min(jobs, len(assets) or 1))
+    if jobs > 1:
+        print(f"⚙️  Using {jobs} worker processes")
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            outcomes = list(executor.map(precompress_file, *args))
+    else:
+        outcomes = [precompress_file(*item) for item in zip(*args)]
+
+    totals = {encoding: 0 for encoding in encodings}
+    original_total = 0
+    skipped = 0
+    for path, size, results in outcomes:
+        if all(result is None for result in results.values()):
+            skipped += 1
+            continue
+        original_total += size
+        sizes = []
+        for encoding, compressed in results.items():
+            totals[encoding] += compressed if compressed is not None else size
+            if compressed is not None:
+                sizes.append(f"{SIBLING_SUFFIXES[encoding]} {format_size(compressed)}")
+        print(f"   ✓ {path.as_posix()} ({format_size(size)}): {', '.join(sizes)}")
+
+    print(f"\n📊 {len(outcomes) - skipped} file(s) precompressed, {skipped} skipped (small or incompressible)")
+    for encoding, total in totals.items():
+        if original_total:
+            print(f"   {encoding}: {format_size(original_total)} → {format_size(total)} "
+                  f"({100 * (1 - total / original_total):.0f}% smaller)")
+
+    if not dry_run:
+        update_htaccess(htaccess_block(encodings))
+        print(f"📁 Wrote the content negotiation rules in {HTACCESS}")
+    return {path: results for path, _, results in outcomes}
+
+
+def clean():
+    """Remove every generated sibling and the .htaccess rules"""
+    removed = 0
+    for path in find_assets("."):
+        for encoding in ENCODINGS:
+            sibling = sibling_path(path, encoding)
+            if sibling.exists():
+                sibling.unlink()
+                removed += 1
+    update_htaccess(None)
+    print(f"🧹 Removed {removed} precompressed file(s) and the rules in {HTACCESS}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write .br/.gz siblings of the site's text assets")
+    parser.add_argument("--root", default=".", help="Site root (default: current directory)")
+    parser.add_argument("-j", "--jobs", type=int, default=0,
+                        help="Number of worker processes (0 = all CPU cores, default: 0)")
+    parser.add_argument("--min-size", type=int, default=DEFAULT_MIN_SIZE,
+                        help=f"Skip files smaller than this many bytes (default: {DEFAULT_MIN_SIZE})")
+    parser.add_argument("--min-saving", type=float, default=DEFAULT_MIN_SAVING,
+                        help=f"Skip siblings saving less than this fraction (default: {DEFAULT_MIN_SAVING})")
+    parser.add_argument("--force", action="store_true", help="Recompress files whose siblings are up to date")
+    parser.add_argument("--dry-run", action="store_true", help="Report the savings without writing anything")
+    parser.add_argument("--clean", action="store_true", help="Remove the siblings and the .htaccess rules")
+    args = parser.parse_args()
+    if args.jobs < 0:
+        parser.error("--jobs must be >= 0")
+    if not 0 <= args.min_saving < 1:
+        parser.error("--min-saving must be between 0 and 1")
+    os.chdir(args.root)
+
+    print("🗜️  Asset Precompression")
+    print("=" * 50)
+    if args.clean:
+        clean()
+    else:
+        precompress(args.jobs or os.cpu_count() or 1, args.min_size, args.min_saving, args.force, args.dry_run)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,694 @@
+#!/usr/bin/env python3
+"""
+Asset Pipeline Runner
+Builds the site's images and videos from one declarative config
+(pipeline.toml) instead of running optimize-images.py, optimize-videos.py
+and generate-ios-videos.py by hand.
+
+The config is turned into a graph of jobs, one per unit of work:
+- images.profile, images.carousel: optimize_profile_image() /
+  optimize_carousel_images() from optimize-images.py
+- images.icons[<dir>]: optimize_icons() for one icon directory
+- html: update_html_references(), after the image jobs it takes mappings from
+- videos.backgrounds[<source>]: generate_source_variants() from
+  generate-ios-videos.py, one job per transparent source
+- videos.crop-offsets: video-crops.json for the background variants
+- videos.optimize: optimize-videos.py's batch encode of a folder
+- videos.posters: extract-posters.py's poster frames and <video> attributes,
+  after the video and html jobs
+- audio: optimize-audio.py's Opus/AAC encodes of the WAV library and the
+  <source> rewrite in the binaural page
+- audio.segments: segment-audio.py's sample-aligned segments and index per loop
+
+Independent jobs run in parallel, each in its own worker process, and print
+their output as one block when they finish. A job is skipped when its
+inputs, settings, dependency results, outputs and the script implementing
+it are unchanged since it last succeeded (recorded in .pipeline-state.json).
+The stages keep their own manifests, so a job that does run still only
+re-encodes what changed.
+
+Requirements:
+- Python 3.11+ (tomllib), or Python 3.6+ with pip install tomli
+- Whatever the enabled stages need (Pillow, FFmpeg, ...)
+
+Usage:
+    python3 run-pipeline.py                   # run every stale job
+    python3 run-pipeline.py --dry-run         # show the graph and what would run
+    python3 run-pipeline.py -j 4              # at most 4 jobs at once
+    python3 run-pipeline.py --only videos     # jobs whose name contains this text, plus their dependencies
+    python3 run-pipeline.py --force           # run every job and ignore the stages' manifests
+"""
+
+import argparse
+import contextlib
+import hashlib
+import importlib.util
+import io
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+try:
+    import tomllib
+except ImportError:
+    try:
+        import tomli as tomllib
+    except ImportError:
+        tomllib = None
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+DEFAULT_CONFIG = "pipeline.toml"
+STATE_NAME = ".pipeline-state.json"
+STATE_VERSION = 1
+
+VIDEO_SUFFIXES = {'.webm', '.mov', '.mp4'}
+
+
+class StageError(Exception):
+    """A stage ran but did not produce what it should have"""
+
+
+class Job:
+    """One node of the pipeline graph.
+
+    stage names the function in STAGES that does the work; config is the
+    JSON-serializable settings it receives. inputs are files or folders
+    whose contents decide whether the job is stale, deps the names of jobs
+    whose results it consumes, and scripts the files implementing the stage.
+    """
+
+    def __init__(self, name, stage, config, inputs=(), deps=(), scripts=()):
+        self.name = name
+        self.stage = stage
+        self.config = config
+        self.inputs = [str(path) for path in inputs]
+        self.deps = list(deps)
+        self.scripts = list(scripts)
+
+
+def load_script(filename):
+    """Import one of the hyphenated build scripts as a module"""
+    name = Path(filename).stem.replace("-", "_")
+    spec = importlib.util.spec_from_file_location(name, SCRIPT_DIR / filename)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# ---------------------------------------------------------------------------
+# Stages: each takes (config, dependency results, options) and returns
+# (result, output files). They run in worker processes; results must be JSON.
+# ---------------------------------------------------------------------------
+
+def image_settings(optimize_images, config, options):
+    """use_manifest/avif/target keyword arguments for the optimize-images stages"""
+    target = None
+    if config.get('target_ssim') is not None:
+        if optimize_images.np is None:
+            raise StageError("NumPy not found (needed for target_ssim). Install with: pip install numpy")
+        target = {'ssim': config['target_ssim']}
+    elif config.get('max_kb') is not None:
+        target = {'max_bytes': config['max_kb'] * 1024}
+    return {
+        'use_manifest': not options['force'],
+        'avif': config.get('avif', True) and optimize_images.avif_supported(),
+        'target': target,
+    }
+
+
+def mapping_outputs(entry):
+    """Files named by one optimize-images mapping entry"""
+    files = [entry.get(key) for key in ('jpeg', 'webp', 'avif')]
+    for variant in entry.get('srcset', []):
+        files += [variant.get(key) for key in ('jpeg', 'webp', 'avif')]
+    return sorted({path for path in files if path})
+
+
+def stage_profile_image(config, deps, options):
+    if not Path(config['input']).exists():
+        print(f"⚠️  Profile image not found, skipping: {config['input']}")
+        return None, []
+    optimize_images = load_script("optimize-images.py")
+    optimize_images.PROFILE_INPUT = Path(config['input'])
+    optimize_images.PROFILE_OUTPUT_DIR = Path(config['output_dir'])
+    optimize_images.PROFILE_OUTPUT_NAME = config['output_name']
+    mapping = optimize_images.optimize_profile_image(**image_settings(optimize_images, config, options))
+    if mapping is None:
+        raise StageError(f"Could not optimize {config['input']}")
+    return mapping, mapping_outputs(mapping)
+
+
+def stage_carousel_images(config, deps, options):
+    optimize_images = load_script("optimize-images.py")
+    optimize_images.CAROUSEL_INPUT_DIR = Path(config['input_dir'])
+    optimize_images.CAROUSEL_OUTPUT_DIR = Path(config['output_dir'])
+    optimize_images.setup_directories()
+    mapping = optimize_images.optimize_carousel_images(jobs=1, **image_settings(optimize_images, config, options))
+    return mapping, sorted({path for entry in mapping.values() for path in mapping_outputs(entry)})
+
+
+def stage_icons(config, deps, options):
+    optimize_images = load_script("optimize-images.py")
+    optimize_images.ICON_DIRS = [Path(config['dir'])]
+    optimize_images.ICON_SETTINGS = {**optimize_images.ICON_SETTINGS, 'png_colors': config['png_colors']}
+    optimize_images.optimize_icons(jobs=1, use_manifest=not options['force'])
+    return None, []  # Icons are optimized in place; they are the job's inputs
+
+
+def stage_html(config, deps, options):
+    carousel_mapping = deps.get('images.carousel') or {}
+    profile_mapping = deps.get('images.profile')
+    if not carousel_mapping and not profile_mapping:
+        print("⏭️  No optimized images to reference")
+        return None, []
+    optimize_images = load_script("optimize-images.py")
+    optimize_images.update_html_references(carousel_mapping, profile_mapping)
+    return None, []  # The documents are the job's inputs
+
+
+def stage_video_backgrounds(config, deps, options):
+    generate = load_script("generate-ios-videos.py")
+    import video_crop
+    import video_probe
+
+    generate.PROFILE = config['profile']
+    input_path = Path(config['input_dir']) / config['source']
+    output_dir = Path(config['output_dir'])
+    output_dir.mkdir(parents=True, exist_ok=True)
+    outputs = [(v['output'], v['background'], v['description']) for v in config['variants']]
+    quality_floor = None
+    if config.get('target_ssim') is not None or config.get('min_psnr') is not None:
+        quality_floor = {'ssim': config.get('target_ssim'), 'psnr': config.get('min_psnr')}
+
+    crop = None
+    if config.get('crop'):
+        if video_crop.np is None:
+            raise StageError("NumPy not found (needed for crop). Install with: pip install numpy")
+        crop = video_crop.find_crop(input_path, config.get('crop_margin', video_crop.CROP_MARGIN))
+
+    try:
+        done = generate.generate_source_variants(input_path, outputs, output_dir, quality_floor, crop)
+        if done < len(outputs):
+            print("⚠️  Falling back to per-variant encodes...")
+            done = generate.generate_source_per_variant(input_path, outputs, output_dir, quality_floor, crop)
+    finally:
+        video_probe.save_cache()
+    if done < len(outputs):
+        raise StageError(f"{len(outputs) - done} of {len(outputs)} variants failed")
+
+    files = [output_dir / name for name, _, _ in outputs]
+    files += [path.with_suffix('.mp4') for path in files]
+    names = [path.name for path in files]
+    return {'crops': {name: crop for name in names}}, [str(path) for path in files]
+
+
+def stage_crop_offsets(config, deps, options):
+    import video_crop
+
+    crops = {}
+    for result in deps.values():
+        crops.update(result['crops'])
+    path = video_crop.write_offsets(config['output_dir'], crops)
+    if path:
+        print(f"✂️  Crop offsets written to {path}")
+    return None, [str(path)] if path else []
+
+
+def stage_optimize_videos(config, deps, options):
+    optimize_videos = load_script("optimize-videos.py")
+    argv = [
+        "-i", config['input_dir'], "-o", config['output_dir'],
+        "--encoder", config['encoder'], "--profile", config['profile'], "--bitrate", config['bitrate'],
+        "-j", str(config.get('jobs', 1)),
+    ]
+    if config.get('crop'):
+        argv += ["--crop", "--crop-margin", str(config.get('crop_margin', 8))]
+    if config.get('target_ssim') is not None:
+        argv += ["--target-ssim", str(config['target_ssim'])]
+    if config.get('min_psnr') is not None:
+        argv += ["--min-psnr", str(config['min_psnr'])]
+    if options['force']:
+        argv.append("--overwrite")
+    try:
+        optimize_videos.main(argv)
+    except SystemExit as e:
+        if e.code:
+            raise StageError(f"optimize-videos.py exited with {e.code}")
+    out_dir = Path(config['output_dir'])
+    return None, sorted(str(p) for p in out_dir.iterdir() if p.suffix.lower() in VIDEO_SUFFIXES)
+
+
+def stage_posters(config, deps, options):
+    extract_posters = load_script("extract-posters.py")
+    posters = extract_posters.extract_posters(config.get('frame', 'auto'), use_manifest=not options['force'],
+                                              update_html=config.get('update_html', True))
+    files = [path for poster in posters.values() for path in (poster['jpeg'], poster['webp']) if path]
+    return posters, sorted(files)
+
+
+def stage_audio(config, deps, options):
+    optimize_audio = load_script("optimize-audio.py")
+    argv = ["-i", config['input_dir'], "--bitrate", config['bitrate'], "-j", str(config.get('jobs', 1))]
+    for fmt in config.get('formats', []):
+        argv += ["--format", fmt]
+    if not config.get('update_references', True):
+        argv.append("--no-references")
+    if options['force']:
+        argv.append("--overwrite")
+    try:
+        optimize_audio.main(argv)
+    except SystemExit as e:
+        if e.code:
+            raise StageError(f"optimize-audio.py exited with {e.code}")
+    suffixes = {suffix for suffix, _, _ in optimize_audio.AUDIO_FORMATS.values()}
+    return None, sorted(str(p) for p in Path(config['input_dir']).rglob('*') if p.suffix.lower() in suffixes)
+
+
+def stage_audio_segments(config, deps, options):
+    segment_audio = load_script("segment-audio.py")
+    argv = ["-i", config['input_dir'], "-o", config['output_dir'], "--bitrate", config['bitrate'],
+            "--segment-seconds", str(config['segment_seconds']), "-j", str(config.get('jobs', 1))]
+    for fmt in config.get('formats', []):
+        argv += ["--format", fmt]
+    if not config.get('wrap', True):
+        argv.append("--no-wrap")
+    if options['force']:
+        argv.append("--overwrite")
+    try:
+        segment_audio.main(argv)
+    except SystemExit as e:
+        if e.code:
+            raise StageError(f"segment-audio.py exited with {e.code}")
+    return None, sorted(str(p) for p in Path(config['output_dir']).rglob('*') if p.is_file())
+
+
+STAGES = {
+    'profile-image': stage_profile_image,
+    'carousel-images': stage_carousel_images,
+    'icons': stage_icons,
+    'html': stage_html,
+    'video-backgrounds': stage_video_backgrounds,
+    'crop-offsets': stage_crop_offsets,
+    'optimize-videos': stage_optimize_videos,
+    'posters': stage_posters,
+    'audio': stage_audio,
+    'audio-segments': stage_audio_segments,
+}
+
+
+def run_stage(stage, config, deps, options):
+    """Run one job in a worker process; returns (ok, log, result, outputs, seconds)"""
+    os.chdir(options['root'])
+    sys.path.insert(0, str(SCRIPT_DIR))
+    buffer = io.StringIO()
+    start = time.perf_counter()
+    result, outputs, ok = None, [], True
+    with contextlib.redirect_stdout(buffer), contextlib.redirect_stderr(buffer):
+        try:
+            result, outputs = STAGES[stage](config, deps, options)
+        except StageError as e:
+            print(f"❌ {e}")
+            ok = False
+        except Exception:
+            traceback.print_exc()
+            ok = False
+    return ok, buffer.getvalue(), result, outputs, time.perf_counter() - start
+
+
+# ---------------------------------------------------------------------------
+# Config -> graph
+# ---------------------------------------------------------------------------
+
+def build_jobs(config):
+    """Turn the pipeline config into {name: Job}"""
+    jobs = {}
+
+    def add(job):
+        jobs[job.name] = job
+
+    images = config.get('images', {})
+    image_defaults = {key: value for key, value in images.items() if not isinstance(value, dict)}
+    image_jobs = []
+
+    profile = images.get('profile', {})
+    if profile.get('enabled', True) and profile:
+        add(Job('images.profile', 'profile-image', {**image_defaults, **profile}, [profile['input']],
+                scripts=["optimize-images.py"]))
+        image_jobs.append('images.profile')
+
+    carousel = images.get('carousel', {})
+    if carousel.get('enabled', True) and carousel:
+        add(Job('images.carousel', 'carousel-images', {**image_defaults, **carousel}, [carousel['input_dir']],
+                scripts=["optimize-images.py"]))
+        image_jobs.append('images.carousel')
+
+    icons = images.get('icons', {})
+    if icons.get('enabled', True):
+        for directory in icons.get('dirs', []):
+            add(Job(f'images.icons[{directory}]', 'icons',
+                    {'dir': directory, 'png_colors': icons.get('png_colors')}, [directory],
+                    scripts=["optimize-images.py"]))
+
+    html = config.get('html', {})
+    if html.get('enabled', True) and image_jobs:
+        from asset_references import SITE_DOCUMENTS
+        add(Job('html', 'html', {}, SITE_DOCUMENTS, deps=image_jobs,
+                scripts=["optimize-images.py", "asset_references.py"]))
+
+    videos = config.get('videos', {})
+    video_jobs = []
+    backgrounds = videos.get('backgrounds', {})
+    if backgrounds.get('enabled', True) and backgrounds.get('variants'):
+        settings = {key: value for key, value in backgrounds.items() if key not in ('enabled', 'variants')}
+        settings.setdefault('profile', 'balanced')
+        sources = {}
+        for variant in backgrounds['variants']:
+            sources.setdefault(variant['source'], []).append(
+                {key: variant[key] for key in ('output', 'background', 'description')})
+        background_jobs = []
+        for source, variants in sources.items():
+            name = f'videos.backgrounds[{source}]'
+            add(Job(name, 'video-backgrounds', {**settings, 'source': source, 'variants': variants},
+                    [Path(settings['input_dir']) / source],
+                    scripts=["generate-ios-videos.py", "encode_profiles.py", "video_crop.py", "video_quality.py"]))
+            background_jobs.append(name)
+        video_jobs += background_jobs
+        add(Job('videos.crop-offsets', 'crop-offsets', {'output_dir': settings['output_dir']},
+                deps=background_jobs, scripts=["video_crop.py"]))
+
+    optimize = videos.get('optimize', {})
+    if optimize.get('enabled', True) and optimize:
+        settings = {key: value for key, value in optimize.items() if key != 'enabled'}
+        settings.setdefault('encoder', 'auto')
+        settings.setdefault('profile', 'balanced')
+        settings.setdefault('bitrate', '8M')
+        add(Job('videos.optimize', 'optimize-videos', settings, [settings['input_dir']],
+                scripts=["optimize-videos.py", "encode_profiles.py", "video_crop.py", "video_quality.py"]))
+        video_jobs.append('videos.optimize')
+
+    posters = videos.get('posters', {})
+    if posters.get('enabled', True) and posters:
+        from asset_references import SITE_DOCUMENTS
+        settings = {key: value for key, value in posters.items() if key != 'enabled'}
+        # Runs after html as both rewrite the same documents
+        deps = video_jobs + (['html'] if 'html' in jobs else [])
+        videos_played = load_script("extract-posters.py").find_videos()
+        # The audio job rewrites its documents after this one: hashing them
+        # here would make every run stale. A video added to one still changes
+        # videos_played, and so the inputs
+        audio_documents = set(load_script("optimize-audio.py").AUDIO_DOCUMENTS)
+        documents = [document for document in SITE_DOCUMENTS if document not in audio_documents]
+        add(Job('videos.posters', 'posters', settings, [*documents, *videos_played], deps=deps,
+                scripts=["extract-posters.py", "optimize-images.py", "asset_references.py"]))
+
+    audio = config.get('audio', {})
+    if audio.get('enabled', True) and 'input_dir' in audio:
+        settings = {key: value for key, value in audio.items() if key != 'enabled' and not isinstance(value, dict)}
+        settings.setdefault('bitrate', '192k')
+        # The documents it rewrites are also rewritten by html and videos.posters
+        deps = [name for name in ('html', 'videos.posters') if name in jobs]
+        documents = load_script("optimize-audio.py").AUDIO_DOCUMENTS
+        add(Job('audio', 'audio', settings, [settings['input_dir'], *documents], deps=deps,
+                scripts=["optimize-audio.py"]))
+
+    segments = audio.get('segments', {})
+    if segments.get('enabled', True) and segments:
+        settings = {key: value for key, value in segments.items() if key != 'enabled'}
+        settings.setdefault('input_dir', audio.get('input_dir'))
+        settings.setdefault('bitrate', audio.get('bitrate', '192k'))
+        settings.setdefault('segment_seconds', 1.0)
+        # Reads the folder the audio job writes into, so it runs after it
+        deps = ['audio'] if 'audio' in jobs else []
+        add(Job('audio.segments', 'audio-segments', settings, [settings['input_dir']], deps=deps,
+                scripts=["segment-audio.py", "optimize-audio.py"]))
+
+    return jobs
+
+
+def topological_order(jobs):
+    """Job names with every job after its dependencies; raises on cycles or unknown deps"""
+    order, visiting, done = [], set(), set()
+
+    def visit(name, path):
+        if name in done:
+            return
+        if name in visiting:
+            raise ValueError(f"dependency cycle: {' -> '.join(path + [name])}")
+        if name not in jobs:
+            raise ValueError(f"unknown dependency {name!r} of {path[-1]}")
+        visiting.add(name)
+        for dep in jobs[name].deps:
+            visit(dep, path + [name])
+        visiting.discard(name)
+        done.add(name)
+        order.append(name)
+
+    for name in jobs:
+        visit(name, [])
+    return order
+
+
+def select_jobs(jobs, patterns):
+    """Jobs whose name contains any pattern, plus everything they depend on"""
+    selected = set()
+
+    def add(name):
+        if name not in selected:
+            selected.add(name)
+            for dep in jobs[name].deps:
+                add(dep)
+
+    for name in jobs:
+        if any(pattern in name for pattern in patterns):
+            add(name)
+    return {name: job for name, job in jobs.items() if name in selected}
+
+
+# ---------------------------------------------------------------------------
+# Up-to-date checks
+# ---------------------------------------------------------------------------
+
+def file_signatures(paths):
+    """{path: [size, mtime_ns]} for files, and every file under folders"""
+    signatures = {}
+    for path in map(Path, paths):
+        if path.is_dir():
+            files = [p for p in path.rglob('*') if p.is_file()]
+        else:
+            files = [path] if path.exists() else []
+        for file in files:
+            stat = file.stat()
+            signatures[file.as_posix()] = [stat.st_size, stat.st_mtime_ns]
+        if not files:
+            signatures[path.as_posix()] = None
+    return signatures
+
+
+def script_digest(filenames):
+    digest = hashlib.sha256()
+    for filename in filenames:
+        digest.update((SCRIPT_DIR / filename).read_bytes())
+    return digest.hexdigest()
+
+
+def fingerprint(job, dep_results):
+    """Hash of everything that decides a job's output, apart from the output files themselves"""
+    data = {
+        'stage': job.stage,
+        'config': job.config,
+        'inputs': file_signatures(job.inputs),
+        'deps': {name: dep_results.get(name) for name in job.deps},
+        'scripts': script_digest(job.scripts),
+    }
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def stale_reason(job, entry, key, force):
+    """Why a job must run, or None if its recorded run is still valid"""
+    if force:
+        return "--force"
+    if entry is None:
+        return "never run"
+    if entry['fingerprint'] != key:
+        return "inputs, settings or dependencies changed"
+    if file_signatures(entry['outputs']) != entry['output_signatures']:
+        return "outputs missing or modified"
+    return None
+
+
+def load_state(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        if state.get('version') == STATE_VERSION:
+            return state.get('jobs', {})
+    except (OSError, ValueError):
+        pass
+    return {}
+
+
+def save_state(path, jobs_state):
+    tmp = Path(path).with_suffix('.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump({'version': STATE_VERSION, 'jobs': jobs_state}, f, indent=1, sort_keys=True)
+        f.write('\n')
+    os.replace(tmp, path)
+
+
+# ---------------------------------------------------------------------------
+# Runner
+# ---------------------------------------------------------------------------
+
+def run_graph(jobs, workers, state, options, state_path):
+    """Run stale jobs, each as soon as its dependencies succeed; returns {name: status}"""
+    order = topological_order(jobs)
+    results = {}
+    status = {}
+    running = {}
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        while len(status) < len(order):
+            for name in order:
+                if name in status or name in running.values():
+                    continue
+                job = jobs[name]
+                if any(status.get(dep) in ('failed', 'blocked') for dep in job.deps):
+                    status[name] = 'blocked'
+                    print(f"⛔ {name}: not run, a dependency failed")
+                    continue
+                if not all(status.get(dep) in ('done', 'skipped') for dep in job.deps):
+                    continue
+                dep_results = {dep: results.get(dep) for dep in job.deps}
+                key = fingerprint(job, dep_results)
+                entry = state.get(name)
+                reason = stale_reason(job, entry, key, options['force'])
+                if reason is None:
+                    status[name] = 'skipped'
+                    results[name] = entry['result']
+                    print(f"⏭️  {name}: up to date")
+                    continue
+                print(f"▶️  {name}: {reason}")
+                future = executor.submit(run_stage, job.stage, job.config, dep_results, options)
+                running[future] = name
+
+            if not running:
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                job = jobs[name]
+                try:
+                    ok, log, result, outputs, seconds = future.result()
+                except Exception as e:  # Worker died
+                    ok, log, result, outputs, seconds = False, f"❌ {e}\n", None, [], 0.0
+                print(f"\n{'=' * 60}\n{'✅' if ok else '❌'} {name} ({seconds:.1f}s)\n{'-' * 60}")
+                print(log.rstrip())
+                status[name] = 'done' if ok else 'failed'
+                if ok:
+                    results[name] = result
+                    # Inputs are re-read now: some stages (icons, html) rewrite them in place
+                    state[name] = {
+                        'fingerprint': fingerprint(job, {dep: results.get(dep) for dep in job.deps}),
+                        'result': result,
+                        'outputs': outputs,
+                        'output_signatures': file_signatures(outputs),
+                    }
+                    save_state(state_path, state)
+                print()
+    return status
+
+
+def dry_run(jobs, state, options):
+    """Print the graph in run order and whether each job would run"""
+    print(f"{'Job':<62} Status")
+    print("-" * 78)
+    will_run = set()
+    for name in topological_order(jobs):
+        job = jobs[name]
+        entry = state.get(name)
+        if any(dep in will_run for dep in job.deps):
+            waiting = [dep for dep in job.deps if dep in will_run]
+            reason = f"after {waiting[0]}" if len(waiting) == 1 else f"after {len(waiting)} dependencies"
+        else:
+            dep_results = {dep: (state.get(dep) or {}).get('result') for dep in job.deps}
+            reason = stale_reason(job, entry, fingerprint(job, dep_results), options['force'])
+        if reason:
+            will_run.add(name)
+        print(f"{name[:62]:<62} {'run: ' + reason if reason else 'up to date'}")
+    print(f"\n{len(will_run)} of {len(jobs)} job(s) would run")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the asset pipeline described in pipeline.toml")
+    parser.add_argument("--config", default=DEFAULT_CONFIG, help=f"Pipeline file (default: {DEFAULT_CONFIG})")
+    parser.add_argument("-j", "--jobs", type=int, default=0, help="Jobs to run at once (0 = all CPU cores, default: 0)")
+    parser.add_argument("--only", action="append", default=[],
+                        help="Run jobs whose name contains this text, plus their dependencies (repeatable)")
+    parser.add_argument("--force", action="store_true", help="Run every job and ignore the stages' own manifests")
+    parser.add_argument("--dry-run", action="store_true", help="Show the job graph and what would run")
+    args = parser.parse_args()
+    if args.jobs < 0:
+        parser.error("--jobs must be >= 0")
+
+    if tomllib is None:
+        print("❌ No TOML parser found. Use Python 3.11+ or install one with: pip install tomli")
+        sys.exit(1)
+    config_path = Path(args.config)
+    if not config_path.is_file():
+        print(f"❌ Pipeline file not found: {config_path}")
+        sys.exit(1)
+    with open(config_path, 'rb') as f:
+        try:
+            config = tomllib.load(f)
+        except tomllib.TOMLDecodeError as e:
+            print(f"❌ Invalid pipeline file {config_path}: {e}")
+            sys.exit(1)
+
+    # Paths in the config are relative to the folder it lives in (the site root)
+    root = config_path.resolve().parent
+    os.chdir(root)
+    sys.path.insert(0, str(SCRIPT_DIR))
+
+    try:
+        jobs = build_jobs(config)
+        topological_order(jobs)
+    except (KeyError, ValueError) as e:
+        print(f"❌ Invalid pipeline file {config_path}: {e}")
+        sys.exit(1)
+    if args.only:
+        jobs = select_jobs(jobs, args.only)
+    if not jobs:
+        print("Nothing to do.")
+        return
+
+    state_path = root / STATE_NAME
+    state = load_state(state_path)
+    options = {'force': args.force, 'root': str(root)}
+    workers = args.jobs or os.cpu_count() or 1
+
+    print("🏗️  Asset Pipeline")
+    print("=" * 60)
+    print(f"📄 {config_path}: {len(jobs)} job(s), up to {workers} at once\n")
+
+    if args.dry_run:
+        dry_run(jobs, state, options)
+        return
+
+    start = time.perf_counter()
+    status = run_graph(jobs, workers, state, options, state_path)
+    counts = {key: sum(1 for value in status.values() if value == key)
+              for key in ('done', 'skipped', 'failed', 'blocked')}
+
+    print("=" * 60)
+    print(f"🏁 Pipeline finished in {time.perf_counter() - start:.1f}s")
+    print(f"   Ran: {counts['done']}, up to date: {counts['skipped']}, "
+          f"failed: {counts['failed']}, not run: {counts['blocked']}")
+    sys.exit(1 if counts['failed'] or counts['blocked'] else 0)
+
+
+if __name__ == "__main__":
+    main()
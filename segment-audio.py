@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Audio Segmenter
+Cuts every variant of a loop (the binaural demo's 000_deg ... 345_deg and
+rotating files, each plain, binaural and externalized) into short segments
+on the same sample-accurate grid, so a player can switch angle by fetching
+just the segment under the playhead instead of a whole file.
+
+Each WAV is decoded once and resampled to 48 kHz (Opus' native rate), so
+segment k of every variant covers exactly samples [k*N, (k+1)*N). Segments
+are encoded on their own but with PREROLL/POSTROLL samples of the
+neighbouring audio around them (wrapping around for loops, silence
+otherwise), so the encoder has context at both edges and the decoded
+segments join without clicks. Encoders use optimize-audio.py's settings
+(joint stereo off).
+
+One JSON index per loop lists the grid and every variant's segments:
+
+    {"sample_rate": 48000, "segment_samples": 48000, "preroll": 3840, ...,
+     "formats": {"opus": {"suffix": ".webm", "mime": "...", "encoder_delay": 312}, ...},
+     "variants": {"090_deg, binaural": {"samples": 232080, "segments": [
+         {"start": 0, "samples": 48000, "files": {"opus": "Tom_s Diner (loop)/090_deg-binaural/000.webm", ...}},
+         ...]}}}
+
+To play segment k, decode it, drop encoder_delay samples if the decoder
+did not (the delay is signalled in the file: Opus pre-skip, the MP4 edit
+list) and then preroll samples, and play the next `samples` samples at
+k * segment_samples. The last segment of a variant may be shorter.
+
+Variants are re-encoded only when their WAV or the settings change.
+
+Requirements:
+- Python 3.6+
+- FFmpeg/FFprobe in PATH (with libopus and aac)
+
+Usage:
+    python3 segment-audio.py
+    python3 segment-audio.py --segment-seconds 0.5 -j 4
+    python3 segment-audio.py --format opus --overwrite
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+DEFAULT_IN = "assets/binaural-externalization/audio"
+DEFAULT_OUT = "assets/binaural-externalization/audio-segments"
+DEFAULT_SEGMENT_SECONDS = 1.0
+INDEX_VERSION = 1
+
+SAMPLE_RATE = 48000
+SAMPLE_BYTES = 4            # f32le
+# Context encoded around every segment and cut off by the player (80 ms, the
+# pre-roll RFC 7845 recommends for Opus)
+PREROLL = 3840
+POSTROLL = 3840
+# Priming samples each encoder adds at 48 kHz; signalled in the file as well
+ENCODER_DELAY = {"opus": 312, "aac": 1024}
+
+VARIANT_RE = re.compile(r"^(?P<loop>.+?) (?P<variant>(?:\d{3}_deg|rotating)(?:, .+)?)$")
+
+
+def load_optimize_audio():
+    """Import optimize-audio.py (hyphenated, so not importable by name)"""
+    spec = importlib.util.spec_from_file_location(
+        "optimize_audio", Path(__file__).resolve().parent / "optimize-audio.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+optimize_audio = load_optimize_audio()
+
+
+def variant_slug(variant: str) -> str:
+    """'090_deg, binaural, externalized' -> '090_deg-binaural-externalized'"""
+    return re.sub(r"[^\w.-]+", "-", variant.replace(", ", "-")).strip("-")
+
+
+def group_sources(sources: list) -> dict:
+    """{(folder, loop name): {variant: wav path}}"""
+    groups = {}
+    for src in sources:
+        match = VARIANT_RE.match(src.stem)
+        loop, variant = (match.group("loop"), match.group("variant")) if match else (src.stem, "main")
+        groups.setdefault((src.parent, loop), {})[variant] = src
+    return groups
+
+
+def decode(ffmpeg: str, src: Path, channels: int) -> bytes:
+    """Whole file as interleaved 48 kHz float samples"""
+    cmd = [ffmpeg, "-hide_banner", "-loglevel", "error", "-i", str(src), "-map", "0:a:0",
+           "-ar", str(SAMPLE_RATE), "-ac", str(channels), "-f", "f32le", "-"]
+    return subprocess.run(cmd, capture_output=True, check=True).stdout
+
+
+def segment_pcm(pcm: bytes, frame_bytes: int, start: int, end: int, wrap: bool) -> bytes:
+    """Samples [start - PREROLL, end + POSTROLL), from the other end of the file (wrap) or silence"""
+    total = len(pcm) // frame_bytes
+
+    def piece(first, last):
+        if first >= 0 and last <= total:
+            return pcm[first * frame_bytes:last * frame_bytes]
+        if wrap:
+            return b"".join(pcm[(i % total) * frame_bytes:(i % total + 1) * frame_bytes] for i in range(first, last))
+        return b"".join(pcm[i * frame_bytes:(i + 1) * frame_bytes] if 0 <= i < total else bytes(frame_bytes)
+                        for i in range(first, last))
+
+    return piece(start - PREROLL, start) + piece(start, end) + piece(end, end + POSTROLL)
+
+
+def encode_segment(ffmpeg: str, pcm: bytes, channels: int, fmt: str, bitrate: str, dst: Path):
+    _, _, options = optimize_audio.AUDIO_FORMATS[fmt]
+    cmd = [ffmpeg, "-hide_banner", "-loglevel", "error", "-y",
+           "-f", "f32le", "-ar", str(SAMPLE_RATE), "-ac", str(channels), "-i", "-",
+           "-map_metadata", "-1", "-fflags", "+bitexact", *options, "-b:a", bitrate, str(dst)]
+    subprocess.run(cmd, input=pcm, capture_output=True, check=True)
+
+
+def segment_variant(ffmpeg: str, src: Path, variant_dir: Path, info: dict, settings: dict, wrap: bool):
+    """Decode one WAV and encode all its segments; returns (variant entry, log lines)"""
+    channels = info["channels"]
+    frame_bytes = channels * SAMPLE_BYTES
+    pcm = decode(ffmpeg, src, channels)
+    total = len(pcm) // frame_bytes
+    step = settings["segment_samples"]
+
+    if variant_dir.exists():
+        shutil.rmtree(variant_dir)
+    variant_dir.mkdir(parents=True)
+    segments = []
+    size = 0
+    for k, start in enumerate(range(0, total, step)):
+        end = min(start + step, total)
+        piece = segment_pcm(pcm, frame_bytes, start, end, wrap)
+        files = {}
+        for fmt in settings["formats"]:
+            dst = variant_dir / f"{k:03d}{optimize_audio.AUDIO_FORMATS[fmt][0]}"
+            encode_segment(ffmpeg, piece, channels, fmt, settings["bitrates"][fmt], dst)
+            files[fmt] = dst
+            size += dst.stat().st_size
+        segments.append({"start": start, "samples": end - start, "files": files})
+    lines = [f"OK: <{src.name}> -> {len(segments)} segment(s) x {len(settings['formats'])} format(s), "
+             f"{size // 1024}KB ({size / src.stat().st_size:.1%} of the WAV)"]
+    return {"source": src.name, "sha256": optimize_audio.file_digest(src), "samples": total,
+            "channels": channels, "segments": segments}, lines
+
+
+def load_index(path: Path) -> dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            index = json.load(f)
+        if index.get("version") == INDEX_VERSION:
+            return index
+    except (OSError, ValueError):
+        pass
+    return {}
+
+
+def variant_fresh(entry: dict, src: Path, index_dir: Path) -> bool:
+    return (
+        entry is not None
+        and entry.get("sha256") == optimize_audio.file_digest(src)
+        and all((index_dir / name).exists() for seg in entry["segments"] for name in seg["files"].values())
+    )
+
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(description="Cut loop variants into sample-aligned, gapless audio segments "
+                                                 "with a JSON index per loop.")
+    parser.add_argument("-i", "--input", default=DEFAULT_IN, help=f"Folder of WAVs, searched recursively (default: {DEFAULT_IN})")
+    parser.add_argument("-o", "--output", default=DEFAULT_OUT, help=f"Folder for segments and indexes (default: {DEFAULT_OUT})")
+    parser.add_argument("--segment-seconds", type=float, default=DEFAULT_SEGMENT_SECONDS,
+                        help=f"Segment length; must be a whole number of 48 kHz samples (default: {DEFAULT_SEGMENT_SECONDS})")
+    parser.add_argument("--bitrate", default=optimize_audio.DEFAULT_BITRATE,
+                        help=f"Audio bitrate (default: {optimize_audio.DEFAULT_BITRATE})")
+    parser.add_argument("--format", action="append", choices=list(optimize_audio.AUDIO_FORMATS),
+                        help="Output format (repeatable; default: all)")
+    parser.add_argument("--no-wrap", action="store_true",
+                        help="Pad the first and last segment with silence even for loops (default: wrap loops around)")
+    parser.add_argument("--overwrite", action="store_true", help="Re-encode every variant, even if its index entry is up to date")
+    parser.add_argument("-j", "--jobs", type=int, default=0, help="Variants to encode at once (0 = all CPU cores, default: 0)")
+    args = parser.parse_args(argv)
+    if args.jobs < 0:
+        parser.error("--jobs must be >= 0")
+    segment_samples = args.segment_seconds * SAMPLE_RATE
+    if segment_samples <= 0 or segment_samples != int(segment_samples):
+        parser.error(f"--segment-seconds must be a positive whole number of samples at {SAMPLE_RATE} Hz")
+    try:
+        optimize_audio.parse_bitrate(args.bitrate)
+    except ValueError:
+        parser.error(f"invalid --bitrate: {args.bitrate}")
+    formats = args.format or list(optimize_audio.AUDIO_FORMATS)
+
+    in_dir = Path(args.input).expanduser().resolve()
+    out_dir = Path(args.output).expanduser().resolve()
+    if not in_dir.is_dir():
+        sys.stderr.write(f"Error: input directory not found: {in_dir}\n")
+        sys.exit(1)
+    ffmpeg = optimize_audio.which("ffmpeg")
+    ffprobe = optimize_audio.which("ffprobe")
+    workers = args.jobs or os.cpu_count() or 1
+
+    sources = sorted(p for p in in_dir.rglob("*") if p.is_file() and p.suffix.lower() in optimize_audio.AUDIO_EXTS)
+    print(f"Input dir:  {in_dir}")
+    print(f"Output dir: {out_dir}")
+    print(f"Segments:   {args.segment_seconds:g}s ({int(segment_samples)} samples at {SAMPLE_RATE} Hz)")
+    print(f"Formats:    {', '.join(formats)} at {args.bitrate}")
+    print(f"Jobs:       {workers}")
+    print()
+    if not sources:
+        print("No WAV files found. Nothing to do.")
+        return
+
+    done = skipped = failed = 0
+    for (folder, loop), variants in sorted(group_sources(sources).items()):
+        index_dir = out_dir / folder.relative_to(in_dir)
+        index_path = index_dir / f"{loop}.json"
+        infos = {variant: optimize_audio.probe_audio(ffprobe, src) for variant, src in variants.items()}
+        unreadable = [variants[v].name for v, info in infos.items() if info is None]
+        channel_counts = {info["channels"] for info in infos.values() if info}
+        if unreadable or len(channel_counts) != 1:
+            problem = f"unreadable: {', '.join(unreadable)}" if unreadable else f"mixed channel counts {sorted(channel_counts)}"
+            print(f"Skipping loop <{loop}> ({problem})")
+            failed += len(variants)
+            continue
+        channels = channel_counts.pop()
+        info = {"channels": channels}
+        wrap = not args.no_wrap and "loop" in loop.lower()
+        settings = {
+            "segment_samples": int(segment_samples),
+            "formats": formats,
+            "bitrates": {fmt: optimize_audio.encoder_bitrate(fmt, info, args.bitrate) for fmt in formats},
+            "options": {fmt: optimize_audio.AUDIO_FORMATS[fmt][2] for fmt in formats},
+            "preroll": PREROLL,
+            "postroll": POSTROLL,
+            "wrap": wrap,
+        }
+
+        old = load_index(index_path)
+        old_variants = old.get("variants", {}) if old.get("settings") == settings and not args.overwrite else {}
+        entries = {}
+        pending = []
+        for variant, src in sorted(variants.items()):
+            if variant_fresh(old_variants.get(variant), src, index_dir):
+                entries[variant] = old_variants[variant]
+                skipped += 1
+            else:
+                pending.append((variant, src))
+        print(f"Loop <{loop}>: {len(variants)} variant(s), {len(pending)} to encode")
+
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(pending) or 1))) as executor:
+            futures = {
+                executor.submit(segment_variant, ffmpeg, src, index_dir / loop / variant_slug(variant),
+                                infos[variant], settings, wrap): (variant, src)
+                for variant, src in pending
+            }
+            for future in as_completed(futures):
+                variant, src = futures[future]
+                try:
+                    entry, lines = future.result()
+                except subprocess.CalledProcessError as e:
+                    stderr = e.stderr.decode(errors="replace") if isinstance(e.stderr, bytes) else (e.stderr or "")
+                    print(f"FAILED: <{src.name}>: {stderr.strip()[-300:]}")
+                    failed += 1
+                    continue
+                for segment in entry["segments"]:
+                    segment["files"] = {fmt: path.relative_to(index_dir).as_posix()
+                                        for fmt, path in segment["files"].items()}
+                entries[variant] = entry
+                print("\n".join(lines), flush=True)
+                done += 1
+
+        if not entries:
+            continue
+        # Variants whose WAV is gone lose their segments too
+        for variant in set(old.get("variants", {})) - set(variants):
+            shutil.rmtree(index_dir / loop / variant_slug(variant), ignore_errors=True)
+        index = {
+            "version": INDEX_VERSION,
+            "loop": loop,
+            "sample_rate": SAMPLE_RATE,
+            "channels": channels,
+            "segment_samples": settings["segment_samples"],
+            "preroll": PREROLL,
+            "postroll": POSTROLL,
+            "formats": {
+                fmt: {"suffix": optimize_audio.AUDIO_FORMATS[fmt][0], "mime": optimize_audio.AUDIO_FORMATS[fmt][1],
+                      "bitrate": settings["bitrates"][fmt], "encoder_delay": ENCODER_DELAY[fmt]}
+                for fmt in formats
+            },
+            "settings": settings,
+            "variants": dict(sorted(entries.items())),
+        }
+        index_dir.mkdir(parents=True, exist_ok=True)
+        with open(index_path, "w", encoding="utf-8") as f:
+            json.dump(index, f, indent=1)
+            f.write("\n")
+        print(f"Index: {index_path}")
+
+    print()
+    print("Done.")
+    print(f"Encoded: {done} variant(s)")
+    print(f"Skipped: {skipped}")
+    print(f"Failed:  {failed}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
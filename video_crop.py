@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Video Alpha Crop
+Finds the part of a transparent video that is ever visible, so encodes can
+drop the empty border around it.
+
+The clip is decoded once with ffmpeg, which streams only its alpha plane
+(alphaextract, 8-bit gray) to a pipe. Frames are read in batches and
+reduced with NumPy to a running per-pixel maximum; after the last frame the
+union bounding box of every pixel above the threshold is the area that is
+ever non-transparent. crop_box() grows it by a margin and aligns it to even
+coordinates for yuv420p.
+
+Boxes are cached in .video-crop-cache.json by path, size and modification
+time. Crops applied to outputs are recorded in video-crops.json next to
+them, with the offsets as pixels and as percentages of the original frame
+so the page can position the cropped video where the full frame had it:
+
+    "06 - Circle - Blue-BG.webm": {"x": 96, "y": 32, "width": 448, "height": 296,
+                                   "frame_width": 640, "frame_height": 360,
+                                   "css": {"left": "15%", "top": "8.889%", ...}}
+
+Used by optimize-videos.py and generate-ios-videos.py.
+
+Usage:
+    python3 video_crop.py "assets/binaural-externalization/06 - Circle - Transparent (Sun).webm"
+    python3 video_crop.py --margin 16 assets/binaural-externalization/*.webm
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+from pathlib import Path
+
+import video_probe
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+CACHE_PATH = Path(__file__).resolve().parent / ".video-crop-cache.json"
+OFFSETS_NAME = "video-crops.json"
+
+# Alpha values at or below this count as transparent (0-255)
+ALPHA_THRESHOLD = 8
+# Pixels kept around the visible area
+CROP_MARGIN = 8
+# Frames reduced per NumPy call
+BATCH_FRAMES = 32
+
+_lock = threading.Lock()
+
+
+def load_cache():
+    try:
+        with open(CACHE_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def alpha_bbox(path, info=None, threshold=ALPHA_THRESHOLD, ffmpeg='ffmpeg'):
+    """Union bounding box (x0, y0, x1, y1), exclusive end, of alpha > threshold over all frames.
+
+    Returns None if the video has no alpha or is transparent throughout.
+    """
+    info = info or video_probe.probe(path)
+    if not info or not info.get('has_alpha'):
+        return None
+    width, height = info['width'], info['height']
+    frame_size = width * height
+
+    cmd = [
+        ffmpeg, "-hide_banner", "-loglevel", "error",
+        *video_probe.decoder_args(info), "-i", str(path),
+        "-vf", "format=yuva420p,alphaextract",
+        "-f", "rawvideo", "-pix_fmt", "gray", "-",
+    ]
+    proc = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    peak = np.zeros((height, width), dtype=np.uint8)
+    while True:
+        data = proc.stdout.read(frame_size * BATCH_FRAMES)
+        frames = len(data) // frame_size
+        if frames:
+            batch = np.frombuffer(data, dtype=np.uint8, count=frames * frame_size).reshape(frames, height, width)
+            np.maximum(peak, batch.max(axis=0), out=peak)
+        if len(data) < frame_size * BATCH_FRAMES:
+            break
+    stderr = proc.stderr.read().decode(errors='replace')
+    if proc.wait() != 0:
+        raise subprocess.CalledProcessError(proc.returncode, cmd, stderr=stderr)
+
+    visible = peak > threshold
+    rows = np.flatnonzero(visible.any(axis=1))
+    cols = np.flatnonzero(visible.any(axis=0))
+    if not len(rows):
+        return None
+    return int(cols[0]), int(rows[0]), int(cols[-1]) + 1, int(rows[-1]) + 1
+
+
+def crop_box(bbox, width, height, margin=CROP_MARGIN):
+    """Grow bbox by margin, clamp it to the frame and align it to even pixels.
+
+    Returns {'x', 'y', 'width', 'height', 'frame_width', 'frame_height'}.
+    """
+    x0, y0, x1, y1 = bbox
+    x0 = max(0, x0 - margin) // 2 * 2
+    y0 = max(0, y0 - margin) // 2 * 2
+    x1 = min(width, x1 + margin)
+    y1 = min(height, y1 + margin)
+    # Even size, shrinking only where the frame edge leaves no room to grow
+    crop_width = min(x1 - x0 + (x1 - x0) % 2, (width - x0) // 2 * 2)
+    crop_height = min(y1 - y0 + (y1 - y0) % 2, (height - y0) // 2 * 2)
+    return {'x': x0, 'y': y0, 'width': crop_width, 'height': crop_height,
+            'frame_width': width, 'frame_height': height}
+
+
+def find_crop(path, margin=CROP_MARGIN, threshold=ALPHA_THRESHOLD, ffmpeg='ffmpeg'):
+    """Crop box for a transparent video, from cache when the file is unchanged.
+
+    Returns None when there is nothing to crop: no NumPy, no alpha, nothing
+    visible, or a box that already covers the whole frame.
+    """
+    if np is None:
+        return None
+    info = video_probe.probe(path)
+    if not info or not info.get('has_alpha'):
+        return None
+
+    key, signature = video_probe.cache_key(path)
+    key = f"{key}@{threshold}"
+    with _lock:
+        entry = load_cache().get(key)
+    if entry is not None and entry['signature'] == signature:
+        bbox = entry['bbox']
+    else:
+        bbox = alpha_bbox(path, info, threshold, ffmpeg)
+        with _lock:
+            cache = load_cache()
+            cache[key] = {'signature': signature, 'bbox': bbox}
+            cache = {k: v for k, v in cache.items() if Path(k.rpartition('@')[0]).exists()}
+            tmp = CACHE_PATH.with_suffix('.tmp')
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(cache, f, indent=1, sort_keys=True)
+                f.write('\n')
+            os.replace(tmp, CACHE_PATH)
+
+    if bbox is None:
+        return None
+    box = crop_box(bbox, info['width'], info['height'], margin)
+    if (box['width'], box['height']) == (info['width'], info['height']):
+        return None
+    return box
+
+
+def crop_filter(box):
+    """ffmpeg crop filter for a box ('' for no crop)"""
+    if not box:
+        return ""
+    return f"crop={box['width']}:{box['height']}:{box['x']}:{box['y']}"
+
+
+def css_offsets(box):
+    """Box position and size as percentages of the original frame"""
+    def percent(value, total):
+        return f"{round(100 * value / total, 3):g}%"
+    return {
+        'left': percent(box['x'], box['frame_width']),
+        'top': percent(box['y'], box['frame_height']),
+        'width': percent(box['width'], box['frame_width']),
+        'height': percent(box['height'], box['frame_height']),
+    }
+
+
+def write_offsets(directory, crops):
+    """Merge {output name: box or None} into directory/video-crops.json.
+
+    Outputs encoded without a crop are removed from the file.
+    """
+    path = Path(directory) / OFFSETS_NAME
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            offsets = json.load(f)
+    except (OSError, ValueError):
+        offsets = {}
+    for name, box in crops.items():
+        if box:
+            offsets[name] = {**box, 'css': css_offsets(box)}
+        else:
+            offsets.pop(name, None)
+    if not offsets:
+        path.unlink(missing_ok=True)
+        return None
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(offsets, f, indent=2, sort_keys=True)
+        f.write('\n')
+    return path
+
+
+def describe_crop(box):
+    saved = 1 - (box['width'] * box['height']) / (box['frame_width'] * box['frame_height'])
+    return (f"{box['frame_width']}x{box['frame_height']} -> {box['width']}x{box['height']} "
+            f"at +{box['x']}+{box['y']} ({saved:.0%} fewer pixels)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find the visible area of transparent videos")
+    parser.add_argument("files", nargs="+", help="Video files to analyze")
+    parser.add_argument("--margin", type=int, default=CROP_MARGIN, help=f"Pixels kept around the visible area (default: {CROP_MARGIN})")
+    parser.add_argument("--threshold", type=int, default=ALPHA_THRESHOLD,
+                        help=f"Alpha values up to this count as transparent (default: {ALPHA_THRESHOLD})")
+    args = parser.parse_args()
+
+    if np is None:
+        print("❌ NumPy not found. Install with: pip install numpy")
+        sys.exit(1)
+
+    failed = False
+    for path in args.files:
+        try:
+            box = find_crop(path, args.margin, args.threshold)
+        except subprocess.CalledProcessError as e:
+            print(f"❌ {path}: {e.stderr.strip()[-200:]}")
+            failed = True
+            continue
+        if box is None:
+            print(f"⏭️  {path}: nothing to crop")
+        else:
+            print(f"✂️  {path}: {describe_crop(box)} [{crop_filter(box)}]")
+    video_probe.save_cache()
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Video Probe Cache
+Shared ffprobe metadata layer for the video scripts.
+
+Each file is probed once: results are kept in memory for the run and in an
+on-disk cache keyed by path, size and modification time, so unchanged
+sources are never probed again across runs. One probe returns everything
+the scripts need:
+
+    {'width', 'height', 'fps', 'duration', 'pix_fmt', 'codec', 'has_alpha'}
+
+Alpha is detected both from the pixel format (yuva420p, rgba, ...) and from
+the WebM alpha_mode tag, which is how VP8/VP9 store transparency; their
+pix_fmt reads yuv420p. Note that ffmpeg's built-in VP8/VP9 decoders drop the
+alpha plane, so pass decoder_args(info) before -i to keep it.
+
+Usage:
+    python3 video_probe.py "assets/binaural-externalization/06 - Circle - Transparent (Sun).webm"
+    python3 video_probe.py --clear-cache
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+CACHE_PATH = Path(__file__).resolve().parent / ".video-probe-cache.json"
+CACHE_VERSION = 1
+
+# Decoders that keep the alpha plane of VP8/VP9 WebM files
+ALPHA_DECODERS = {'vp8': 'libvpx', 'vp9': 'libvpx-vp9'}
+
+_memory = {}
+_disk = None
+_lock = threading.Lock()
+_dirty = False
+
+
+def cache_key(path):
+    """(key, signature) for a file; the entry is valid while the signature matches"""
+    path = Path(path).resolve()
+    stat = path.stat()
+    return path.as_posix(), [stat.st_size, stat.st_mtime_ns]
+
+
+def _load_disk_cache():
+    global _disk
+    if _disk is None:
+        _disk = {}
+        try:
+            with open(CACHE_PATH, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == CACHE_VERSION:
+                _disk = data.get('entries', {})
+        except (OSError, ValueError):
+            pass
+    return _disk
+
+
+def save_cache():
+    """Write new probe results to the on-disk cache (no-op if nothing changed)"""
+    global _dirty
+    with _lock:
+        if not _dirty:
+            return
+        entries = {key: entry for key, entry in _load_disk_cache().items() if Path(key).exists()}
+        tmp = CACHE_PATH.with_suffix('.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'version': CACHE_VERSION, 'entries': entries}, f, indent=1, sort_keys=True)
+            f.write('\n')
+        os.replace(tmp, CACHE_PATH)
+        _dirty = False
+
+
+def clear_cache():
+    """Forget every cached result, in memory and on disk"""
+    global _disk, _dirty
+    with _lock:
+        _memory.clear()
+        _disk = {}
+        _dirty = False
+        CACHE_PATH.unlink(missing_ok=True)
+
+
+def parse_rate(text):
+    """'30000/1001' -> 29.97; None for missing or 0/0 rates"""
+    if not text or text == '0/0':
+        return None
+    num, _, den = text.partition('/')
+    try:
+        return float(num) / float(den or 1)
+    except (ValueError, ZeroDivisionError):
+        return None
+
+
+def parse_probe(data):
+    """Reduce raw ffprobe JSON to the shared metadata structure (None if no video)"""
+    stream = next((s for s in data.get('streams', []) if s.get('codec_type') == 'video'), None)
+    if stream is None:
+        return None
+    fmt = data.get('format', {})
+    tags = {key.lower(): value for key, value in stream.get('tags', {}).items()}
+
+    duration = stream.get('duration') or fmt.get('duration')
+    pix_fmt = stream.get('pix_fmt')
+    alpha_mode = tags.get('alpha_mode')
+    has_alpha = bool(pix_fmt) and (pix_fmt.startswith(('yuva', 'rgba', 'bgra', 'argb', 'abgr', 'gbrap', 'ya'))
+                                   or pix_fmt.endswith('a'))
+    has_alpha = has_alpha or str(alpha_mode) == '1'
+
+    return {
+        'width': stream.get('width'),
+        'height': stream.get('height'),
+        'fps': parse_rate(stream.get('avg_frame_rate')) or parse_rate(stream.get('r_frame_rate')),
+        'duration': float(duration) if duration not in (None, 'N/A') else None,
+        'pix_fmt': pix_fmt,
+        'codec': stream.get('codec_name'),
+        'has_alpha': has_alpha,
+    }
+
+
+def run_ffprobe(path, ffprobe='ffprobe'):
+    """Run ffprobe once and return the parsed metadata, or None on failure"""
+    cmd = [ffprobe, '-v', 'error', '-of', 'json', '-show_format', '-show_streams', str(path)]
+    proc = subprocess.run(cmd, capture_output=True, text=True)
+    if proc.returncode != 0:
+        return None
+    try:
+        return parse_probe(json.loads(proc.stdout))
+    except ValueError:
+        return None
+
+
+def probe(path, ffprobe='ffprobe'):
+    """Metadata for one video file, from cache when its size and mtime are unchanged.
+
+    Returns None if the file is missing or has no video stream.
+    """
+    global _dirty
+    try:
+        key, signature = cache_key(path)
+    except OSError:
+        return None
+
+    with _lock:
+        entry = _memory.get(key) or _load_disk_cache().get(key)
+        if entry is not None and entry['signature'] == signature:
+            _memory[key] = entry
+            return dict(entry['info'])
+
+    info = run_ffprobe(path, ffprobe)
+    if info is None:
+        return None
+    with _lock:
+        entry = {'signature': signature, 'info': info}
+        _memory[key] = entry
+        _load_disk_cache()[key] = entry
+        _dirty = True
+    return dict(info)
+
+
+def probe_many(paths, ffprobe='ffprobe', workers=4):
+    """Probe several files at once (cache misses run concurrently); returns {path: info}"""
+    paths = list(paths)
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(paths)))) as executor:
+        results = dict(zip(paths, executor.map(lambda p: probe(p, ffprobe), paths)))
+    save_cache()
+    return results
+
+
+def decoder_args(info):
+    """Input options (before -i) that keep a VP8/VP9 alpha plane when decoding"""
+    if info and info.get('has_alpha') and info.get('codec') in ALPHA_DECODERS:
+        return ['-c:v', ALPHA_DECODERS[info['codec']]]
+    return []
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Probe video files through the shared ffprobe cache")
+    parser.add_argument("files", nargs="*", help="Video files to probe")
+    parser.add_argument("--clear-cache", action="store_true", help=f"Delete {CACHE_PATH.name} first")
+    args = parser.parse_args()
+
+    if args.clear_cache:
+        clear_cache()
+        print(f"🧹 Cleared {CACHE_PATH.name}")
+
+    failed = False
+    for path, info in probe_many(args.files).items():
+        if info is None:
+            print(f"❌ {path}: no video stream or not readable")
+            failed = True
+            continue
+        fps = f"{info['fps']:.2f}fps" if info['fps'] else "?fps"
+        duration = f"{info['duration']:.2f}s" if info['duration'] is not None else "?s"
+        print(f"🎞️  {path}: {info['width']}x{info['height']}, {fps}, {duration}, "
+              f"{info['codec']}/{info['pix_fmt']}, alpha: {info['has_alpha']}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Video Quality Search
+Finds the smallest encode of a clip that still meets a quality floor.
+
+Instead of encoding the whole clip at every setting, a few short sample
+segments are rendered once, losslessly (FFV1), through the same filter
+graph the real encode uses. Each candidate CRF or bitrate then encodes only
+those samples, and ffmpeg's own ssim/psnr filters score them against the
+lossless references. The candidates are binary-searched from smallest to
+largest output; the first one whose worst sample meets the floor wins.
+
+Chosen settings are stored in .video-rate-cache.json, keyed by the source's
+content hash, the encode it is for and the floor, so later runs reuse them
+without searching.
+
+Used by optimize-videos.py and generate-ios-videos.py.
+"""
+
+import hashlib
+import json
+import re
+import subprocess
+import tempfile
+import threading
+from pathlib import Path
+
+import video_probe
+
+CACHE_PATH = Path(__file__).resolve().parent / ".video-rate-cache.json"
+
+# Sample segments per clip; clips shorter than SAMPLE_COUNT * SAMPLE_SECONDS are used whole
+SAMPLE_COUNT = 3
+SAMPLE_SECONDS = 1.0
+
+# CRF ranges searched per encoder (higher CRF = smaller file)
+CRF_RANGES = {
+    'libvpx-vp9': (15, 50),
+    'libx264': (16, 35),
+    'libx265': (18, 38),
+}
+
+# Bitrates searched for encoders without a CRF mode (e.g. hevc_videotoolbox)
+BITRATE_LADDER = ['500k', '750k', '1M', '1500k', '2M', '3M', '4M', '6M', '8M', '12M', '16M']
+
+_cache_lock = threading.Lock()
+
+SSIM_RE = re.compile(r'SSIM .*?All:([\d.]+)')
+PSNR_RE = re.compile(r'PSNR .*?average:([\d.]+|inf)')
+
+
+def crf_candidates(encoder):
+    """CRF values for an encoder, ordered from smallest output to largest"""
+    low, high = CRF_RANGES[encoder]
+    return [str(crf) for crf in range(high, low - 1, -1)]
+
+
+def bitrate_candidates(max_bitrate=None):
+    """Bitrate ladder (smallest first), capped at max_bitrate"""
+    if max_bitrate is None:
+        return list(BITRATE_LADDER)
+    cap = parse_bitrate(max_bitrate)
+    ladder = [rate for rate in BITRATE_LADDER if parse_bitrate(rate) <= cap]
+    return ladder if ladder and ladder[-1] == max_bitrate else ladder + [max_bitrate]
+
+
+def parse_bitrate(text):
+    """'1500k' -> 1500000"""
+    text = str(text).strip()
+    multiplier = {'k': 1e3, 'K': 1e3, 'm': 1e6, 'M': 1e6}.get(text[-1:], 1)
+    return float(text[:-1] if multiplier != 1 else text) * multiplier
+
+
+def describe_floor(floor):
+    parts = []
+    if floor.get('ssim') is not None:
+        parts.append(f"SSIM ≥ {floor['ssim']}")
+    if floor.get('psnr') is not None:
+        parts.append(f"PSNR ≥ {floor['psnr']}dB")
+    return " and ".join(parts)
+
+
+def meets_floor(scores, floor):
+    return all(scores.get(key) is not None and scores[key] >= value
+               for key, value in floor.items() if value is not None)
+
+
+def sample_windows(duration):
+    """(start, length) of each sample segment, spread evenly over the clip"""
+    if not duration or duration <= SAMPLE_COUNT * SAMPLE_SECONDS:
+        return [(0.0, duration or SAMPLE_SECONDS)]
+    step = (duration - SAMPLE_SECONDS) / (SAMPLE_COUNT - 1)
+    return [(round(i * step, 3), SAMPLE_SECONDS) for i in range(SAMPLE_COUNT)]
+
+
+def make_reference_samples(input_args, filter_args, duration, workdir, pix_fmt='yuv420p'):
+    """Render each sample window losslessly through the real encode's inputs and filters.
+
+    input_args holds everything up to and including the inputs (e.g. a lavfi
+    colour source plus '-i', source); filter_args is the '-vf' or
+    '-filter_complex' part. Returns the FFV1 sample paths.
+    """
+    samples = []
+    for i, (start, length) in enumerate(sample_windows(duration)):
+        path = Path(workdir) / f"reference-{i}.mkv"
+        cmd = [
+            "ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+            *input_args, *filter_args,
+            "-ss", str(start), "-t", str(length),
+            "-c:v", "ffv1", "-pix_fmt", pix_fmt, "-an",
+            str(path),
+        ]
+        subprocess.run(cmd, capture_output=True, text=True, check=True)
+        samples.append(path)
+    return samples
+
+
+def measure(candidate, reference):
+    """{'ssim', 'psnr'} of a candidate against its reference, via ffmpeg's filters"""
+    cmd = [
+        "ffmpeg", "-hide_banner", "-nostats",
+        *video_probe.decoder_args(video_probe.probe(candidate)),
+        "-i", str(candidate), "-i", str(reference),
+        "-lavfi",
+        "[0:v]format=yuv420p,split[a1][a2];[1:v]format=yuv420p,split[b1][b2];"
+        "[a1][b1]ssim;[a2][b2]psnr",
+        "-f", "null", "-",
+    ]
+    proc = subprocess.run(cmd, capture_output=True, text=True)
+    ssim = SSIM_RE.search(proc.stderr)
+    psnr = PSNR_RE.search(proc.stderr)
+    return {
+        'ssim': float(ssim.group(1)) if ssim else None,
+        'psnr': (float('inf') if psnr.group(1) == 'inf' else float(psnr.group(1))) if psnr else None,
+    }
+
+
+def search(samples, encoder_args, candidates, floor, suffix, workdir):
+    """Binary-search candidates (smallest output first) for the first that meets floor.
+
+    encoder_args(value) returns the ffmpeg output options for one candidate.
+    Returns (value, scores, sample_bytes); falls back to the largest
+    candidate if none meets the floor.
+    """
+    results = {}
+
+    def probe(index):
+        if index not in results:
+            value = candidates[index]
+            worst = {'ssim': None, 'psnr': None}
+            total = 0
+            for i, reference in enumerate(samples):
+                output = Path(workdir) / f"candidate-{index}-{i}{suffix}"
+                cmd = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-y", "-i", str(reference),
+                       *encoder_args(value), "-an", str(output)]
+                subprocess.run(cmd, capture_output=True, text=True, check=True)
+                total += output.stat().st_size
+                scores = measure(output, reference)
+                for key, score in scores.items():
+                    if score is not None and (worst[key] is None or score < worst[key]):
+                        worst[key] = score
+            results[index] = (value, worst, total)
+        return results[index]
+
+    low, high = 0, len(candidates) - 1
+    best = high
+    while low <= high:
+        mid = (low + high) // 2
+        if meets_floor(probe(mid)[1], floor):
+            best, high = mid, mid - 1
+        else:
+            low = mid + 1
+    return probe(best)
+
+
+def load_cache():
+    try:
+        with open(CACHE_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_key(source, encode, floor):
+    """Key for one search: source content, the encode it configures and the floor.
+
+    Keyed by content rather than mtime so a regenerated but identical
+    intermediate (e.g. the WebM an MP4 fallback is made from) still hits.
+    """
+    return json.dumps([file_digest(source), encode, floor], sort_keys=True)
+
+
+def choose_setting(source, encode, floor, input_args, filter_args, duration, encoder_args, candidates, suffix,
+                   pix_fmt='yuv420p'):
+    """Return the cached or newly searched setting for one encode of source.
+
+    encode is a JSON-serializable description of the output (encoder,
+    filters, background...) so different variants of the same source get
+    their own entries. Returns (value, info) where info holds the sample
+    scores and whether the value came from the cache.
+    """
+    key = cache_key(source, encode, floor)
+    cache = load_cache()
+    if key in cache:
+        return cache[key]['value'], {**cache[key], 'cached': True}
+
+    with tempfile.TemporaryDirectory(prefix="rate-search-") as workdir:
+        samples = make_reference_samples(input_args, filter_args, duration, workdir, pix_fmt)
+        value, scores, sample_bytes = search(samples, encoder_args, candidates, floor, suffix, workdir)
+
+    entry = {'value': value, 'scores': scores, 'sample_bytes': sample_bytes, 'met_floor': meets_floor(scores, floor)}
+    with _cache_lock:
+        cache = load_cache()  # Re-read: another job may have added entries meanwhile
+        cache[key] = entry
+        with open(CACHE_PATH, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, indent=1, sort_keys=True)
+            f.write('\n')
+    return value, {**entry, 'cached': False}